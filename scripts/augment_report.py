@@ -2,9 +2,8 @@
 import argparse
 import math
 import csv
-from tc.smooth import primes_upto, generate_friables
-from tc.cover import coverage_bitset
-from tc.diagnose import uncovered_indices
+from tc.smooth import lpf_sieve, friables, friables_in_band
+from tc.cover import coverage_bitset, extend_coverage
 from tc.augment import greedy_augment_to_cover
 
 def run_one(n: int, C: float, Cbump: float, start: int = 2):
@@ -12,19 +11,19 @@ def run_one(n: int, C: float, Cbump: float, start: int = 2):
     yH = int((math.log(n)) ** (C + Cbump))
 
     # base set A and uncovered
-    A = generate_friables(n, primes_upto(yA))
+    lpf = lpf_sieve(n)
+    A = friables(n, yA, lpf)
     B = coverage_bitset(A, n)
-    unc = uncovered_indices(B, start=start)
+    unc = B.uncovered(start=start)
 
-    # halo candidates H
-    Aset = set(A)
-    H_all = generate_friables(n, primes_upto(yH))
-    H = [h for h in H_all if h not in Aset]
+    # halo candidates H (yA < P+ <= yH)
+    H = friables_in_band(n, yA, yH, lpf)
 
-    added, remaining = greedy_augment_to_cover(n=n, A=A, uncovered=unc, halo=H, max_add=None, start=start)
-    A_prime = sorted(A + added) if added else A
-    Bp = coverage_bitset(A_prime, n)
-    uncp = uncovered_indices(Bp, start=start)
+    added, remaining = greedy_augment_to_cover(
+        n=n, A=A.tolist(), uncovered=unc, halo=H.tolist(), max_add=None, start=start
+    )
+    Bp = extend_coverage(B, A, added, n)
+    uncp = Bp.count_uncovered(start=start)
 
     return {
         "n": n,
@@ -33,21 +32,21 @@ def run_one(n: int, C: float, Cbump: float, start: int = 2):
         "yA": yA,
         "yH": yH,
         "|A|": len(A),
-        "uncovered_base": len(unc),
+        "uncovered_base": int(unc.size),
         "halo_candidates": len(H),
         "added": len(added),
-        "uncovered_after": len(uncp),
+        "uncovered_after": uncp,
         "added_first10": added[:10],
     }
 
-def main():
+def main(argv=None):
     ap = argparse.ArgumentParser()
     ap.add_argument("--n", type=int, default=2_000_000)
     ap.add_argument("--C", type=float, default=1.40)
     ap.add_argument("--Cbump", type=float, default=0.05)
     ap.add_argument("--start", type=int, default=2)
     ap.add_argument("--out", default="augment_report.csv")
-    args = ap.parse_args()
+    args = ap.parse_args(argv)
 
     res = run_one(args.n, args.C, args.Cbump, start=args.start)
 
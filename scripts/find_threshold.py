@@ -1,16 +1,25 @@
 # scripts/find_threshold.py
 import argparse
 import math
-from tc.smooth import primes_upto, generate_friables
-from tc.cover import coverage_bitset
-from tc.diagnose import uncovered_indices
 
-def zero_uncovered(n: int, C: float, start: int = 2) -> tuple[int, int]:
+import numpy as np
+
+from tc.cache import cached_first_cover, default_cache
+from tc.ymin import uncovered_count_at
+
+def first_cover(n: int, C: float) -> tuple[np.ndarray, np.ndarray]:
+    """
+    P+ of the friables at y=(log n)^C and their first-cover map (valid for all C' <= C).
+    Served from the on-disk cache when this (n, y) was mapped before.
+    """
+    y = int((math.log(n)) ** C)
+    return cached_first_cover(n, y, cache=default_cache())
+
+def zero_uncovered(n: int, C: float, fc: tuple[np.ndarray, np.ndarray], start: int = 2) -> tuple[int, int]:
+    """Probe one C as an array scan over the first-cover map `fc` (built at some C' >= C)."""
     y = int((math.log(n)) ** C)
-    A = generate_friables(n, primes_upto(y))
-    B = coverage_bitset(A, n)
-    unc = uncovered_indices(B, start=start)
-    return len(A), len(unc)
+    P, ymin = fc
+    return int(np.count_nonzero(P <= y)), uncovered_count_at(ymin, y, start=start)
 
 def main():
     ap = argparse.ArgumentParser()
@@ -23,9 +32,10 @@ def main():
 
     lo, hi = args.Cmin, args.Cmax
     best = None
+    fc = first_cover(args.n, hi)  # every probe lies below Cmax
     while hi - lo > args.tol:
         mid = 0.5 * (lo + hi)
-        Asize, unc = zero_uncovered(args.n, mid, start=args.start)
+        Asize, unc = zero_uncovered(args.n, mid, fc, start=args.start)
         print(f"[probe] C={mid:.4f}  |A|={Asize:,}  uncovered={unc}")
         if unc == 0:
             best = mid
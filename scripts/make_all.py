@@ -13,29 +13,85 @@ Usage:
   python -m scripts.make_all
   python -m scripts.make_all --coverage-plots
   python -m scripts.make_all --engine tiled
+  python -m scripts.make_all --cache-dir /tmp/tc_cache   # or --no-cache
+  python -m scripts.make_all --cores 4                   # overlap independent steps
+  python -m scripts.make_all --force                     # rebuild everything
+
+Friable sets, first-cover maps and coverages are cached on disk (see tc/cache.py),
+so the threshold refinement in step 2 reloads the maps step 1 built.
+
+The steps run in this process as a DAG (see tc/pipeline.py): a step whose
+parameters, code and input files are unchanged since its last build, and whose
+outputs are still as it left them, is skipped (state in .tc_pipeline.json).
+With --cores above one, independent steps (the grid and the augmentation
+runs) overlap within that budget.  Each step runs the same script with the same
+arguments as the former subprocess chain, so a step that runs regenerates its
+artifact as before (the grid CSV is rewritten from scratch).  augment_report
+appends one row per run, so it is never skipped: every build appends its row,
+as the former chain did, and augment_report.csv matches it.
 """
 
 import argparse
 import os
 import sys
-import subprocess
-from shutil import which
 
-
-def run(cmd: list[str]) -> None:
-    """Run a command, stream output, fail fast on non-zero return."""
-    print("\n>>", " ".join(cmd), flush=True)
-    rc = subprocess.call(cmd)
-    if rc != 0:
-        print(f"[make_all] ERROR: Command failed with exit code {rc}", file=sys.stderr)
-        sys.exit(rc)
+from tc.grid import thread_budget
+from tc.pipeline import DEFAULT_STATE, Step, run_pipeline
+
+GRID_CSV = "results_1e6_2e6_5e6.csv"
+
+
+def build_steps(args: argparse.Namespace, cores: int) -> list[Step]:
+    """The make_all DAG; steps are listed in the order a sequential run takes them."""
+    # The grid parallelizes internally; leave room for the augmentation steps
+    grid_cores = max(1, cores // 2)
+    steps = [
+        # 0) Compile and cache every Numba kernel once, so no later step pays the JIT
+        Step("warmup", "tc.warmup"),
+        # 1) Grid over (n, C) and CSV
+        #    This uses run_grid.py which internally calls the fast coverage path;
+        #    no plotting here (keeps the run quick).
+        Step(
+            "grid", "scripts.run_grid", ["--out", GRID_CSV, "--fresh"],
+            outputs=[GRID_CSV], deps=["warmup"], cores=grid_cores,
+        ),
+        # 2) Annotated thresholds (reads the CSV + refines C* with small binary searches)
+        Step(
+            "thresholds", "scripts.plot_grid_with_thresholds", ["--csv", GRID_CSV, "--tol", "0.01"],
+            inputs=[GRID_CSV], outputs=["plots/uncovered_vs_C_annotated.png"], deps=["grid"],
+        ),
+        # 3) Augmentation report at a representative failing point
+        #    Writes/append a row to augment_report.csv and prints a LaTeX row to console;
+        #    runs on every build, like the append it always was.
+        Step(
+            "augment_report", "scripts.augment_report",
+            ["--n", args.n_augment, "--C", args.C_augment, "--Cbump", args.Cbump],
+            outputs=["augment_report.csv"], deps=["warmup"], always=True,
+        ),
+        # 4) Augmentation cost curve (calls augment API directly for robust numbers)
+        Step(
+            "augment_curve", "scripts.plot_augment_curve",
+            ["--n", args.n_augment, "--C", args.C_augment, "--bumps", "0.02,0.03,0.04,0.05,0.06"],
+            outputs=["plots/augment_cost.png"], deps=["warmup"],
+        ),
+    ]
+    # 5) (Optional) Two illustrative coverage plots:
+    #    - Figure 1: n=1e6, C=2.00 (flat coverage = 1 from 2..n)
+    #    - A pre-threshold example: n=5e6, C=1.40 (a few uncovered)
+    if args.coverage_plots:
+        for name, n, C in (("coverage_figure1", "1000000", "2.0"), ("coverage_prethreshold", "5000000", "1.40")):
+            steps.append(Step(
+                name, "scripts.run_experiment", ["--n", n, "--C", C, "--plot", "--engine", args.engine],
+                outputs=[f"plots/coverage_n{n}_C{float(C):.2f}_A*_U*.png"], deps=["warmup"],
+            ))
+    return steps
 
 
 def main() -> None:
     ap = argparse.ArgumentParser()
     ap.add_argument(
         "--engine",
-        choices=["njit", "tiled"],
+        choices=["njit", "tiled", "fft"],
         default="njit",
         help="Coverage engine to use for illustrative coverage plots (njit fastest on Windows).",
     )
@@ -62,64 +118,32 @@ def main() -> None:
         default=0.05,
         help="ΔC bump for augmentation demo.",
     )
+    ap.add_argument("--cache-dir", default=None, help="On-disk cache directory (default: .tc_cache).")
+    ap.add_argument("--no-cache", action="store_true", help="Disable the on-disk cache.")
+    ap.add_argument("--cores", type=int, default=None, help="Core budget (default: TC_THREADS or cpu count).")
+    ap.add_argument("--force", action="store_true", help="Rebuild every step, even if up to date.")
+    ap.add_argument("--state", default=DEFAULT_STATE, help="Build state file (default: .tc_pipeline.json).")
     args = ap.parse_args()
 
-    # Resolve Python being used (inside venv)
-    py = sys.executable
-    print(f"[info] Using Python: {py}")
+    # Steps (and spawned step workers) read the cache settings from the environment
+    if args.cache_dir:
+        os.environ["TC_CACHE_DIR"] = args.cache_dir
+    if args.no_cache:
+        os.environ["TC_CACHE"] = "0"
 
     # Ensure output folders exist
     os.makedirs("plots", exist_ok=True)
 
-    # 1) Grid over (n, C) and CSV
-    #    This uses run_grid.py which internally calls the fast coverage path;
-    #    no plotting here (keeps the run quick).
-    run([py, "-m", "scripts.run_grid", "--out", "results_1e6_2e6_5e6.csv"])
-
-    # 2) Annotated thresholds (reads the CSV + refines C* with small binary searches)
-    run([py, "-m", "scripts.plot_grid_with_thresholds", "--csv", "results_1e6_2e6_5e6.csv", "--tol", "0.01"])
-
-    # 3) Augmentation report at a representative failing point
-    #    Writes/append a row to augment_report.csv and prints a LaTeX row to console.
-    run([
-        py, "-m", "scripts.augment_report",
-        "--n", str(args.n_augment),
-        "--C", str(args.C_augment),
-        "--Cbump", str(args.Cbump),
-    ])
-
-    # 4) Augmentation cost curve (calls augment API directly for robust numbers)
-    run([
-        py, "-m", "scripts.plot_augment_curve",
-        "--n", str(args.n_augment),
-        "--C", str(args.C_augment),
-        "--bumps", "0.02,0.03,0.04,0.05,0.06",
-    ])
-
-    # 5) (Optional) Two illustrative coverage plots:
-    #    - Figure 1: n=1e6, C=2.00 (flat coverage = 1 from 2..n)
-    #    - A pre-threshold example: n=5e6, C=1.40 (a few uncovered)
-    if args.coverage_plots:
-        # Ensure matplotlib is available (it should be from earlier steps)
-        if which("python") is None:
-            print("[warn] Could not resolve python for coverage plots; skipping.", file=sys.stderr)
-        else:
-            # Figure 1 (showcase, full coverage)
-            run([
-                py, "-m", "scripts.run_experiment",
-                "--n", "1000000",
-                "--C", "2.0",
-                "--plot",
-                "--engine", args.engine,
-            ])
-            # Pre-threshold illustrative case
-            run([
-                py, "-m", "scripts.run_experiment",
-                "--n", "5000000",
-                "--C", "1.40",
-                "--plot",
-                "--engine", args.engine,
-            ])
+    cores = thread_budget(args.cores)
+    print(f"[info] Using Python: {sys.executable} (core budget {cores})")
+    try:
+        status = run_pipeline(build_steps(args, cores), cores=cores, state_path=args.state, force=args.force)
+    except RuntimeError as e:
+        print(f"[make_all] ERROR: {e}", file=sys.stderr)
+        sys.exit(1)
+    skipped = [name for name, st in status.items() if st == "skipped"]
+    if skipped:
+        print(f"\n[make_all] up to date, skipped: {', '.join(skipped)}")
 
     print("\n[done] All artifacts generated:")
     print(" - results_1e6_2e6_5e6.csv")
@@ -1,12 +1,10 @@
 import argparse
 import math
 import time
-import numpy as np
-import matplotlib.pyplot as plt
 
 from tc.smooth import primes_upto, generate_friables
 from tc.cover import coverage_bitset, coverage_bitset_parallel
-from tc.diagnose import uncovered_indices, residue_hist, longest_uncovered_run
+from tc.diagnose import residue_hist, longest_uncovered_run
 from tc.thin import residue_balanced_thin
 
 
@@ -16,7 +14,7 @@ def main():
     ap.add_argument("--C", type=float, default=2.0, help="Smoothness exponent: y=(log n)^C (natural log)")
     ap.add_argument("--start", type=int, default=2, help="Lower bound of coverage range for uncovered reporting")
     ap.add_argument("--qmax", type=int, default=64, help="Residue histogram up to modulus qmax")
-    ap.add_argument("--plot", action="store_true", help="Save a sampled coverage plot")
+    ap.add_argument("--plot", action="store_true", help="Save a coverage plot (exact min/max per pixel)")
     ap.add_argument("--include-zero", action="store_true", help="Include 0 in A (treat 0 as smooth)")
     ap.add_argument("--thin", action="store_true", help="Apply residue-balanced thinning before coverage")
     ap.add_argument("--qmax-thin", type=int, default=64, help="Max modulus for thinning balances (2..qmax_thin)")
@@ -70,10 +68,10 @@ def main():
     t3 = time.time()
     print(f"[stage] coverage computed (A+A) (t={t3-t2:.2f}s)")
 
-    unc = uncovered_indices(B, start=args.start)
-    print(f"[result] uncovered count: {len(unc):,} / {n:,}")
-    if unc:
-        print(f"         first 10 uncovered: {unc[:10]}")
+    unc = B.uncovered(start=args.start)
+    print(f"[result] uncovered count: {unc.size:,} / {n:,}")
+    if unc.size:
+        print(f"         first 10 uncovered: {unc[:10].tolist()}")
         print(f"         longest uncovered run: {longest_uncovered_run(unc)}")
         rh = residue_hist(unc, qmax=args.qmax)
         for q in (8, 12):
@@ -83,40 +81,17 @@ def main():
                 print(f"         residue hist mod {q}: {ordered}")
 
     if args.plot:
-        # --- improved plotting block ---
-        stride = max(1, n // 10000)
-        xs = np.arange(2, n + 1, stride)  # sample from 2 upward
-        ys = [1 if B[i] else 0 for i in xs]
-
         import os
-        os.makedirs("plots", exist_ok=True)
-
-        plt.figure(figsize=(10, 2.6))
-        plt.plot(xs, ys, lw=0.8, color="#206eff", label="sampled coverage")
-
-        unc_all = uncovered_indices(B, start=args.start)
-        if unc_all:
-            plt.scatter(unc_all, [0]*len(unc_all), s=8, color="#d62728", alpha=0.85, label="uncovered")
-
-        plt.ylim(-0.1, 1.1)
-        plt.xlim(0, n)
-        plt.yticks([0, 1], ["no", "yes"])
-        plt.xlabel("k")
-        plt.ylabel("covered?")
+        from tc.plotting import plot_coverage
 
+        os.makedirs("plots", exist_ok=True)
         title = (
-            f"Coverage (sampled) — n={n:,}, C={C:.2f}, y={(math.log(n))**C:.0f}, "
-            f"|A|={len(A_used):,}, uncovered[{args.start}..n]={len(unc_all)}"
+            f"Coverage (min/max per pixel) — n={n:,}, C={C:.2f}, y={(math.log(n))**C:.0f}, "
+            f"|A|={len(A_used):,}, uncovered[{args.start}..n]={unc.size}"
         )
-        plt.title(title)
-        plt.grid(alpha=0.25, linewidth=0.6)
-        plt.legend(loc="lower right", frameon=False)
-
-        out = f"plots/coverage_n{n}_C{C:.2f}_A{len(A_used)}_U{len(unc_all)}.png"
-        plt.tight_layout()
-        plt.savefig(out, dpi=150)
+        out = f"plots/coverage_n{n}_C{C:.2f}_A{len(A_used)}_U{unc.size}.png"
+        plot_coverage(B, out, title, start=args.start, uncovered=unc)
         print(f"[plot] saved {out}")
-        # --- end block ---
 
 
 if __name__ == "__main__":
@@ -0,0 +1,78 @@
+# scripts/perf_friables.py
+"""
+Benchmark the friable enumerators against each other:
+  heap   = generate_friables        (heapq BFS over Python ints + seen set)
+  njit   = generate_friables_njit   (Numba DFS: count pass, fill pass, sort)
+  sieve  = friables via lpf_sieve   (dense regimes only; needs O(n) memory)
+
+Usage:
+  python -m scripts.perf_friables
+  python -m scripts.perf_friables --n 1e6,1e8,1e10 --C 1.2,1.6,2.0 --no-sieve
+"""
+import argparse
+import math
+import time
+
+from tc.smooth import primes_upto, generate_friables, generate_friables_njit, lpf_sieve, friables
+
+
+def best_time(fn, repeat: int) -> tuple[float, object]:
+    """Best wall time over `repeat` calls, plus the last result."""
+    best = float("inf")
+    out = None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        out = fn()
+        best = min(best, time.perf_counter() - t0)
+    return best, out
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--n", default="1e6,5e6,1e8", help="Comma-separated n values (floats allowed, e.g. 1e8)")
+    ap.add_argument("--C", default="1.2,1.6,2.0", help="Comma-separated C values: y=(log n)^C")
+    ap.add_argument("--repeat", type=int, default=3, help="Timed repetitions per engine (best is reported)")
+    ap.add_argument("--no-sieve", action="store_true", help="Skip the lpf sieve column (large n)")
+    ap.add_argument("--skip-heap-above", type=float, default=2e8, help="Skip the heap engine for n above this")
+    args = ap.parse_args()
+
+    Ns = [int(float(x)) for x in args.n.split(",")]
+    Cs = [float(x) for x in args.C.split(",")]
+
+    # Compile outside the timed region
+    generate_friables_njit(100, primes_upto(7))
+
+    print(f"{'n':>14} {'C':>5} {'y':>7} {'|A|':>12} {'heap s':>9} {'njit s':>9} {'sieve s':>9} {'speedup':>8}")
+    for n in Ns:
+        lpf = None
+        t_sieve_build = 0.0
+        if not args.no_sieve:
+            t_sieve_build, lpf = best_time(lambda: lpf_sieve(n), 1)
+        for C in Cs:
+            y = int((math.log(n)) ** C)
+            P = primes_upto(y)
+
+            t_njit, A_njit = best_time(lambda: generate_friables_njit(n, P), args.repeat)
+
+            t_heap = float("nan")
+            if n <= args.skip_heap_above:
+                t_heap, A_heap = best_time(lambda: generate_friables(n, P), 1)
+                if A_njit.tolist() != A_heap:
+                    raise SystemExit(f"[error] njit and heap outputs differ at n={n}, C={C}")
+
+            t_sieve = float("nan")
+            if lpf is not None:
+                t_scan, A_sieve = best_time(lambda: friables(n, y, lpf), args.repeat)
+                t_sieve = t_sieve_build + t_scan
+                if A_sieve.tolist() != A_njit.tolist():
+                    raise SystemExit(f"[error] sieve and njit outputs differ at n={n}, C={C}")
+
+            speedup = t_heap / t_njit if t_njit > 0 else float("nan")
+            print(
+                f"{n:>14,} {C:>5.2f} {y:>7} {A_njit.size:>12,} "
+                f"{t_heap:>9.3f} {t_njit:>9.3f} {t_sieve:>9.3f} {speedup:>7.1f}x"
+            )
+
+
+if __name__ == "__main__":
+    main()
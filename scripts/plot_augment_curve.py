@@ -2,22 +2,24 @@
 import argparse
 import matplotlib.pyplot as plt
 from tc.augment_api import run_augment_once
+from tc.smooth import lpf_sieve
 
-def main():
+def main(argv=None):
     ap = argparse.ArgumentParser()
     ap.add_argument("--n", type=int, default=2_000_000)
     ap.add_argument("--C", type=float, default=1.40)
     ap.add_argument("--bumps", default="0.02,0.03,0.04,0.05,0.06")
     ap.add_argument("--out", default="plots/augment_cost.png")
-    args = ap.parse_args()
+    args = ap.parse_args(argv)
 
     bumps = [float(x) for x in args.bumps.split(",")]
     added = []
     remain = []
 
     print(f"[config] n={args.n:,} C={args.C} bumps={bumps}")
+    lpf = lpf_sieve(args.n)  # shared by every bump
     for b in bumps:
-        res = run_augment_once(args.n, args.C, b, start=2)
+        res = run_augment_once(args.n, args.C, b, start=2, lpf=lpf)
         print(f"  Cbump={b:.3f} -> added={res['added']} remaining={res['unc_after']}")
         added.append(res["added"])
         remain.append(res["unc_after"])
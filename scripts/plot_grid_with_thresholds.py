@@ -6,23 +6,37 @@ from collections import defaultdict
 import matplotlib.pyplot as plt
 
 # Lightweight probe used to refine C* lines (calls your core pipeline)
-from tc.smooth import primes_upto, generate_friables
-from tc.cover import coverage_bitset
-from tc.diagnose import uncovered_indices
+from tc.cache import cached_first_cover, default_cache
+from tc.ymin import uncovered_count_at
 
-def uncovered_count(n: int, C: float, start: int = 2) -> int:
+def first_cover(n: int, C: float):
+    """
+    First-cover map over the friables at y=(log n)^C; answers any probe C' <= C.
+    Served from the on-disk cache when run_grid (or an earlier run) mapped this (n, y).
+    """
     y = int((math.log(n)) ** C)
-    A = generate_friables(n, primes_upto(y))
-    B = coverage_bitset(A, n)
-    return len(uncovered_indices(B, start=start))
+    return cached_first_cover(n, y, cache=default_cache())[1]
 
-def refine_threshold(n: int, Cmin: float, Cmax: float, tol: float = 0.01, start: int = 2) -> float | None:
-    """Binary search smallest C in [Cmin, Cmax] with 0 uncovered; None if none."""
+def uncovered_count(n: int, C: float, start: int = 2, ymin=None) -> int:
+    """Uncovered count at C, scanned from `ymin` (built here at C if not given)."""
+    if ymin is None:
+        ymin = first_cover(n, C)
+    return uncovered_count_at(ymin, int((math.log(n)) ** C), start=start)
+
+def refine_threshold(
+    n: int, Cmin: float, Cmax: float, tol: float = 0.01, start: int = 2, Cmap: float | None = None
+) -> float | None:
+    """
+    Binary search smallest C in [Cmin, Cmax] with 0 uncovered; None if none.
+    The first-cover map is taken at Cmap >= Cmax (default Cmax); passing the grid's
+    largest C reuses the map run_grid already cached for this n.
+    """
     lo, hi = Cmin, Cmax
     best = None
+    ymin = first_cover(n, max(Cmax, Cmap or Cmax))  # one map; each probe below is an array scan
     while hi - lo > tol:
         mid = 0.5 * (lo + hi)
-        u = uncovered_count(n, mid, start=start)
+        u = uncovered_count(n, mid, start=start, ymin=ymin)
         print(f"[refine] n={n:,} C={mid:.4f} -> uncovered={u}")
         if u == 0:
             best = mid
@@ -31,13 +45,13 @@ def refine_threshold(n: int, Cmin: float, Cmax: float, tol: float = 0.01, start:
             lo = mid
     return best
 
-def main():
+def main(argv=None):
     ap = argparse.ArgumentParser()
     ap.add_argument("--csv", default="results_1e6_2e6_5e6.csv", help="grid CSV from run_grid.py")
     ap.add_argument("--out", default="plots/uncovered_vs_C_annotated.png")
     ap.add_argument("--start", type=int, default=2)
     ap.add_argument("--tol", type=float, default=0.01)
-    args = ap.parse_args()
+    args = ap.parse_args(argv)
 
     rows = []
     with open(args.csv, newline="") as f:
@@ -73,7 +87,7 @@ def main():
             continue
         # refine between previous sampled point and C0
         left = max([c for c, u in series if c < C0], default=C0 - 0.1)
-        Cstar = refine_threshold(n, left, C0, tol=args.tol, start=args.start)
+        Cstar = refine_threshold(n, left, C0, tol=args.tol, start=args.start, Cmap=series[-1][0])
         if Cstar is not None:
             plt.axvline(Cstar, color="#888", alpha=0.35, linestyle="--")
             plt.text(Cstar + 0.005, max(1, min(plt.ylim()[1]/15, 50)), f"C*≈{Cstar:.3f}\n(n={n:,})",
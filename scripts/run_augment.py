@@ -1,9 +1,8 @@
 # scripts/run_augment.py
 import argparse
 import math
-from tc.smooth import primes_upto, generate_friables
-from tc.cover import coverage_bitset
-from tc.diagnose import uncovered_indices
+from tc.smooth import lpf_sieve, friables, friables_in_band
+from tc.cover import coverage_bitset, extend_coverage
 from tc.augment import greedy_augment_to_cover
 
 def main():
@@ -20,27 +19,24 @@ def main():
     yH = int((math.log(n)) ** (C + Cbump))
     print(f"[config] n={n:,}  C={C:.3f}  yA={yA}  C'={C+Cbump:.3f}  yH={yH}  start={args.start}")
 
-    # Base A (y-smooth)
-    P_A = primes_upto(yA)
-    A = generate_friables(n, P_A)
+    # Base A (y-smooth); one sieve serves both A and the halo
+    lpf = lpf_sieve(n)
+    A = friables(n, yA, lpf)
     B = coverage_bitset(A, n)
-    unc = uncovered_indices(B, start=args.start)
-    print(f"[base] |A|={len(A):,} uncovered={len(unc)}")
-    if not unc:
+    unc = B.uncovered(start=args.start)
+    print(f"[base] |A|={len(A):,} uncovered={unc.size}")
+    if unc.size == 0:
         print("[base] Already fully covered. Nothing to augment.")
         return
 
-    # Halo candidates H = yH-smooth minus yA-smooth (new elements permitted to add)
-    P_H = primes_upto(yH)
-    H_all = generate_friables(n, P_H)
-    # remove A (i.e., only candidates that are new)
-    A_set = set(A)
-    H = [h for h in H_all if h not in A_set]
-    print(f"[halo] |H_all|={len(H_all):,}  new_candidates=|H|={len(H):,}")
+    # Halo candidates H = yH-smooth minus yA-smooth (new elements permitted to add),
+    # i.e. yA < P+ <= yH straight from the sieve
+    H = friables_in_band(n, yA, yH, lpf)
+    print(f"[halo] |H_all|={len(A) + len(H):,}  new_candidates=|H|={len(H):,}")
 
     # Greedy augment
     added, remaining = greedy_augment_to_cover(
-        n=n, A=A, uncovered=unc, halo=H, max_add=args.max_add, start=args.start
+        n=n, A=A.tolist(), uncovered=unc, halo=H.tolist(), max_add=args.max_add, start=args.start
     )
     print(f"[augment] added={len(added)} remaining_uncovered={len(remaining)}")
     if added:
@@ -48,11 +44,10 @@ def main():
 
     # Verify coverage after adding
     if added:
-        # Conceptually, we form A' = A ∪ added and re-check
-        A_prime = sorted(A + added)
-        Bp = coverage_bitset(A_prime, n)
-        uncp = uncovered_indices(Bp, start=args.start)
-        print(f"[verify] uncovered after augmentation: {len(uncp)}")
+        # Conceptually, we form A' = A ∪ added and re-check; only sums involving
+        # an added element are new, so the existing coverage is extended in place
+        Bp = extend_coverage(B, A, added, n)
+        print(f"[verify] uncovered after augmentation: {Bp.count_uncovered(start=args.start)}")
 
 if __name__ == "__main__":
     main()
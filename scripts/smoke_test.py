@@ -1,20 +1,341 @@
 import math
-from tc.smooth import primes_upto, generate_friables
+import os
+import sys
+import tempfile
+
+import numpy as np
+
+from tc.smooth import lpf_sieve, primes_upto, generate_friables
+from tc import augment, cover, reps, segment, shards, ymin
+from tc.cache import Cache, cached_coverage, cached_friables
 from tc.cover import coverage_bitset
-from tc.diagnose import uncovered_indices, longest_uncovered_run
+from tc.diagnose import uncovered_bins
+from tc.pipeline import Step, run_pipeline
+from tc.result import CoverageResult, open_coverage
+
+
+def brute_coverage(A, n):
+    # hit bytes of A + A over [0, n], one shifted copy of A per element
+    A = np.unique(np.asarray(A, dtype=np.int64))
+    A = A[(A >= 0) & (A <= n)]
+    hits = np.zeros(n + 1, dtype=np.uint8)
+    for a in A.tolist():
+        hits[a + A[A <= n - a]] = 1
+    return hits
+
+
+def random_sets(seed, count=40, nmax=3000):
+    # (A, n) with duplicates, 0, values past n, unsorted, dense and sparse
+    rng = np.random.default_rng(seed)
+    for _ in range(count):
+        n = int(rng.integers(1, nmax))
+        size = int(rng.integers(1, max(2, int(n * rng.random()))))
+        yield rng.integers(0, n + 40, size), n
+
+
+def check_fft_engine():
+    # the FFT engine against the brute force and the pair kernels
+    for A, n in random_sets(1):
+        ref = brute_coverage(A, n)
+        assert np.array_equal(cover.coverage_bitset_fft(A, n).covered_mask(), ref != 0)
+        if cover._NUMBA_AVAILABLE:
+            for tiled in (False, True):
+                assert np.array_equal(cover.coverage_bitset_njit(A, n, tiled).covered_mask(), ref != 0)
+    print("fft engine: ok")
+
+
+def check_uncovered_bins():
+    # per-bin aggregates against a brute-force scan, around the word boundaries
+    # and (with tiny chunks) across the chunked scan's seams
+    rng = np.random.default_rng(0)
+    for n in (1, 62, 63, 64, 65, 127, 128, 1000, 4097):
+        for density in (0.0, 0.02, 0.5, 1.0):
+            hits = (rng.random(n + 1) >= density).astype(np.uint8)
+            byte = CoverageResult(hits, n, "bytes")
+            packed = CoverageResult(byte.to_packed(), n, "packed")
+            for start in (2, 63, 64, 65, n):
+                unc = byte.uncovered(start)
+                for bins in (1, 3, 7, 1500):
+                    for R, given, chunk in (
+                        (byte, None, 1 << 22), (packed, None, 1), (packed, None, 3), (packed, unc, 1 << 22)
+                    ):
+                        edges, counts, first, last = uncovered_bins(R, bins, start, given, chunk=chunk)
+                        assert edges[-1] == n + 1 and counts.sum() == unc.size
+                        for i in range(counts.size):
+                            k = unc[(unc >= edges[i]) & (unc < edges[i + 1])]
+                            assert counts[i] == k.size
+                            assert first[i] == (k[0] if k.size else -1)
+                            assert last[i] == (k[-1] if k.size else -1)
+    print("uncovered_bins: ok")
+
+
+def check_extend_coverage():
+    # A grown in three steps, in both layouts, against the brute force of the union
+    for A, n in random_sets(2):
+        parts = np.array_split(A, 3)
+        for layout in ("bytes", "packed"):
+            R = CoverageResult(brute_coverage(parts[0], n), n, "bytes")
+            if layout == "packed":
+                R = CoverageResult(R.to_packed(), n, "packed")
+            seen = parts[0]
+            for part in parts[1:]:
+                assert cover.extend_coverage(R, seen, part, n) is R
+                seen = np.concatenate([seen, part])
+                assert np.array_equal(R.covered_mask(), brute_coverage(seen, n) != 0)
+    print("extend_coverage: ok")
+
+
+def check_covered_targets():
+    # membership and the smallest witness against a scan of the pairs
+    rng = np.random.default_rng(3)
+    for A, n in random_sets(3):
+        S = set(A.tolist())
+        T = rng.integers(0, 2 * n + 50, 80)
+        covered, witness = cover.covered_targets(A, T)
+        for t, k in enumerate(T.tolist()):
+            a = next((a for a in sorted(S) if a <= k - a and k - a in S), -1)
+            assert covered[t] == (a >= 0)
+            assert witness[t].tolist() == ([a, k - a] if a >= 0 else [-1, -1])
+    print("covered_targets: ok")
+
+
+def baseline_greedy(n, A, uncovered, halo, max_add=None):
+    # the original greedy: rescan every candidate each step, first one wins ties
+    A_set = set(A)
+    rem = set(uncovered)
+    cover_map = []
+    for a in halo:
+        hits = [k for k in uncovered if 1 <= k - a <= n and k - a in A_set]
+        if hits:
+            cover_map.append((a, hits))
+    added = []
+    while rem:
+        gains = [sum(1 for k in hits if k in rem) for _, hits in cover_map]
+        if not gains or max(gains) == 0:
+            break
+        a, hits = cover_map[gains.index(max(gains))]
+        added.append(a)
+        rem.difference_update(hits)
+        if max_add is not None and len(added) >= max_add:
+            break
+    return added, sorted(rem)
+
+
+def check_greedy():
+    # lazy greedy over the CSR candidates against the baseline on tie-heavy
+    # inputs: a sparse A and a halo with repeats, so most gains are 1 or 2
+    rng = np.random.default_rng(4)
+    for _ in range(40):
+        n = int(rng.integers(50, 600))
+        A = sorted(set(rng.integers(1, n, int(rng.integers(2, 30))).tolist()))
+        hits = brute_coverage(A, n)
+        unc = [k for k in range(2, n + 1) if not hits[k]]
+        halo = rng.integers(1, n, int(rng.integers(1, 3 * n))).tolist()
+        for max_add in (None, 3):
+            got = augment.greedy_augment_to_cover(n, A, unc, halo, max_add)
+            assert got == baseline_greedy(n, A, unc, halo, max_add)
+    print("greedy augmentation: ok")
+
+
+def check_candidate_csr():
+    # CSR rows against a direct scan: distinct candidates in halo order, each
+    # with the ascending positions of the targets k it covers (k - a in A)
+    rng = np.random.default_rng(5)
+    for A, n in random_sets(5, nmax=1500):
+        A_set = set(A[(A >= 1) & (A <= n)].tolist())
+        T = np.unique(rng.integers(2, n + 1, int(rng.integers(1, 200))))
+        halo = rng.integers(1, n + 20, int(rng.integers(1, 300)))
+        rows = {}
+        for a in halo.tolist():
+            if a not in rows:
+                rows[a] = [t for t, k in enumerate(T.tolist()) if 1 <= k - a <= n and k - a in A_set]
+        rows = {a: r for a, r in rows.items() if r}
+        cand, indptr, indices = augment.candidate_targets_csr(n, A, T, halo)
+        assert cand.tolist() == list(rows)
+        for i, a in enumerate(rows):
+            assert indices[indptr[i] : indptr[i + 1]].tolist() == rows[a]
+    print("candidate_targets_csr: ok")
+
+
+def longest_zero_run_brute(hits):
+    best = run = 0
+    for h in hits.tolist():
+        run = 0 if h else run + 1
+        best = max(best, run)
+    return best
+
+
+def check_shards():
+    # a sharded job in a temp dir, stopped after two shards and resumed, against
+    # the brute force: coverage, uncovered count and longest run (from start=2)
+    for A, n in random_sets(6, count=10):
+        ref = brute_coverage(A, n)
+        with tempfile.TemporaryDirectory() as d:
+            job = os.path.join(d, "job")
+            shards.init_job(job, A, n, shard_size=256)
+            shards.work(job, max_shards=2)
+            R = shards.coverage_sharded(A, n, job_dir=job, shard_size=256)
+            assert np.array_equal(R.covered_mask(), ref != 0)
+            summary = shards.merge_shards(job)[1]
+            assert summary["uncovered"] == int(np.count_nonzero(ref[2:] == 0))
+            assert summary["longest_run"] == longest_zero_run_brute(ref[2:])
+    print("shards: ok")
+
+
+def check_cache():
+    # a cache in a temp dir: miss, hit, then corrupted entries, which must be
+    # dropped and recomputed; a caller's lpf table gives the same entries
+    n, y = 20_000, 30
+    A_ref = generate_friables(n, primes_upto(y))
+    B_ref = brute_coverage(A_ref, n) != 0
+    with tempfile.TemporaryDirectory() as d:
+        c = Cache(d)
+        for lpf in (None, lpf_sieve(n), None):
+            for _ in range(2):  # computed and stored, then loaded
+                A = cached_friables(n, y, cache=c, lpf=lpf)
+                assert A.dtype == np.int64 and A.tolist() == A_ref
+                assert np.array_equal(cached_coverage(n, y, cache=c, lpf=lpf).covered_mask(), B_ref)
+            assert len(os.listdir(d)) == 2
+            for name in os.listdir(d):
+                with open(os.path.join(d, name), "r+b") as f:
+                    f.truncate(20)
+    print("cache: ok")
+
+
+def check_pipeline():
+    # a two-step build in a temp dir: a rerun skips the current step but runs
+    # the `always` one, and a changed input rebuilds both, also with a pool
+    step_src = (
+        "def main(argv):\n"
+        "    src, dst, mode = argv\n"
+        "    with open(src) as f, open(dst, mode) as g:\n"
+        "        g.write(f.read())\n"
+    )
+    with tempfile.TemporaryDirectory() as d:
+        with open(os.path.join(d, "tc_smoke_step.py"), "w") as f:
+            f.write(step_src)
+        src, copy, log = (os.path.join(d, name) for name in ("src.txt", "copy.txt", "log.txt"))
+        steps = [
+            Step("copy", "tc_smoke_step", [src, copy, "w"], inputs=[src], outputs=[copy]),
+            Step("log", "tc_smoke_step", [copy, log, "a"], inputs=[copy], outputs=[log], deps=["copy"], always=True),
+        ]
+        state = os.path.join(d, "state.json")
+        sys.path.insert(0, d)
+        try:
+            with open(src, "w") as f:
+                f.write("a\n")
+            assert run_pipeline(steps, state_path=state, verbose=False) == {"copy": "ran", "log": "ran"}
+            assert run_pipeline(steps, state_path=state, verbose=False) == {"copy": "skipped", "log": "ran"}
+            with open(src, "w") as f:
+                f.write("b\n")
+            assert run_pipeline(steps, state_path=state, verbose=False) == {"copy": "ran", "log": "ran"}
+            with open(src, "w") as f:
+                f.write("c\n")
+            assert run_pipeline(steps, cores=2, state_path=state, verbose=False) == {"copy": "ran", "log": "ran"}
+        finally:
+            sys.path.remove(d)
+            sys.modules.pop("tc_smoke_step", None)
+        with open(log) as f:
+            assert f.read() == "a\na\nb\nc\n"
+    print("pipeline: ok")
+
+
+def check_segmented():
+    # windowed coverage (in memory and to a file) and the streamed summary
+    # against the brute force, with windows that do and do not align to words
+    for A, n in random_sets(7):
+        ref = brute_coverage(A, n)
+        for window in (64, 100, 1000):
+            assert np.array_equal(segment.coverage_segmented(A, n, window=window).covered_mask(), ref != 0)
+            summary = segment.segmented_coverage_summary(A, n, start=2, window=window, max_indices=5)
+            unc = np.flatnonzero(ref[2:] == 0) + 2
+            assert summary["uncovered"] == unc.size and summary["first_uncovered"] == unc[:5].tolist()
+            assert summary["longest_run"] == longest_zero_run_brute(ref[2:])
+        with tempfile.TemporaryDirectory() as d:
+            path = os.path.join(d, "cov.bin")
+            segment.coverage_segmented(A, n, window=128, out=path)
+            assert np.array_equal(open_coverage(path).covered_mask(), ref != 0)
+    print("segmented: ok")
+
+
+def check_packed_engine():
+    # shift-OR words, serial and threaded, against the brute force
+    for A, n in random_sets(8):
+        ref = brute_coverage(A, n) != 0
+        for parallel in (False, cover._NUMBA_AVAILABLE):
+            words = cover.coverage_packed(A, n, parallel=parallel)
+            assert np.array_equal(CoverageResult(words, n, "packed").covered_mask(), ref)
+    print("packed engine: ok")
+
+
+def check_mp_engine():
+    # the shared-memory worker pool, with more blocks than words at small n
+    try:
+        for blocks in (1, 3):  # one pool per block count
+            for A, n in random_sets(9, count=12):
+                ref = brute_coverage(A, n) != 0
+                assert np.array_equal(cover.coverage_bitset_parallel(A, n, blocks=blocks).covered_mask(), ref)
+    finally:
+        cover.shutdown_pool()
+    print("mp engine: ok")
+
+
+def check_first_cover():
+    # ymin over every pair against a direct minimum, across window seams
+    rng = np.random.default_rng(10)
+    for A, n in random_sets(10, count=20, nmax=800):
+        A = np.unique(A)
+        P = rng.integers(2, 100, A.size)
+        ref = np.full(n + 1, ymin.UNCOVERED, dtype=np.uint32)
+        for i in range(A.size):
+            for j in range(i, A.size):
+                s = A[i] + A[j]
+                if s <= n:
+                    ref[s] = min(ref[s], max(P[i], P[j]))
+        assert np.array_equal(ymin.first_cover_map(A, P, n, window=97), ref)
+    print("first_cover_map: ok")
+
+
+def check_representation_counts():
+    # ordered-pair counts from a full convolution, saturated at the cap, for
+    # both engines (uncapped 255 and a cap small enough to saturate often)
+    for A, n in random_sets(11, count=20):
+        A = np.unique(A[A <= n])
+        x = np.zeros(n + 1, dtype=np.int64)
+        x[A] = 1
+        r = np.convolve(x, x)[: n + 1]
+        for cap in (3, 255):
+            for engine in ("pairs", "fft"):
+                got = reps.representation_counts(A, n, cap=cap, engine=engine, window=97)
+                assert np.array_equal(got, np.minimum(r, cap))
+    print("representation_counts: ok")
+
 
 def main():
     n = 200_000
     C = 2.0
     y = int((math.log(n))**C)
 
-    print(f\"n={n:,}  C={C}  y=(log n)^C ≈ {y}\")
+    print(f"n={n:,}  C={C}  y=(log n)^C ≈ {y}")
     P = primes_upto(y)
     A = generate_friables(n, P)
-    print(f\"|A|={len(A):,}  first={A[:10]}  last={A[-1]}\")
+    print(f"|A|={len(A):,}  first={A[:10]}  last={A[-1]}")
     B = coverage_bitset(A, n)
-    unc = uncovered_indices(B)
-    print(f\"Uncovered={len(unc):,}  Longest run={longest_uncovered_run(unc)}\")
+    print(f"Uncovered={B.count_uncovered():,}  Longest run={B.longest_run()}")
+    check_uncovered_bins()
+    check_fft_engine()
+    check_extend_coverage()
+    check_covered_targets()
+    check_greedy()
+    check_candidate_csr()
+    check_shards()
+    check_cache()
+    check_pipeline()
+    check_segmented()
+    check_packed_engine()
+    check_mp_engine()
+    check_first_cover()
+    check_representation_counts()
 
-if __name__ == \"__main__\":
+if __name__ == "__main__":
     main()
@@ -2,20 +2,61 @@
 tc — Threshold Completeness core package.
 
 Exports:
-- primes_upto, generate_friables          (tc.smooth)
-- coverage_bitset                         (tc.cover)
+- primes_upto, generate_friables,
+  generate_friables_njit,
+  lpf_sieve, friables                     (tc.smooth)
+- coverage_bitset, covered_targets        (tc.cover)
+- CoverageResult                          (tc.result)
 - uncovered_indices, residue_hist,
   longest_uncovered_run                   (tc.diagnose)
+
+uncovered_indices returns a sorted int64 ndarray (it used to return a list);
+use .size rather than truthiness and .tolist() for a list.
+
+Exports are resolved lazily on first attribute access, so `import tc` does not
+load numpy, numba, bitarray or multiprocessing until a name is actually used.
+Run `python -m tc.warmup` once to compile and cache the Numba kernels.
 """
 
-from .smooth import primes_upto, generate_friables
-from .cover import coverage_bitset
-from .diagnose import uncovered_indices, residue_hist, longest_uncovered_run
+from importlib import import_module
+
+_EXPORTS = {
+    "primes_upto": ".smooth",
+    "generate_friables": ".smooth",
+    "generate_friables_njit": ".smooth",
+    "lpf_sieve": ".smooth",
+    "friables": ".smooth",
+    "coverage_bitset": ".cover",
+    "covered_targets": ".cover",
+    "CoverageResult": ".result",
+    "uncovered_indices": ".diagnose",
+    "residue_hist": ".diagnose",
+    "longest_uncovered_run": ".diagnose",
+}
+
+
+def __getattr__(name: str):
+    module = _EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(import_module(module, __name__), name)
+    globals()[name] = value  # later lookups skip __getattr__
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_EXPORTS))
+
 
 __all__ = [
     "primes_upto",
     "generate_friables",
+    "generate_friables_njit",
+    "lpf_sieve",
+    "friables",
     "coverage_bitset",
+    "covered_targets",
+    "CoverageResult",
     "uncovered_indices",
     "residue_hist",
     "longest_uncovered_run",
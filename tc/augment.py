@@ -1,15 +1,163 @@
 # tc/augment.py
 from __future__ import annotations
+import heapq
 from typing import List, Set, Tuple
 
+import numpy as np
+
+from .cover import _pack_bits
+from .diagnose import as_coverage_result
+from .telemetry import span
+
+# Optional Numba path for candidate discovery (blocked numpy fallback below)
+_NUMBA_AVAILABLE = False
+try:
+    import numba as nb  # type: ignore
+    _NUMBA_AVAILABLE = True
+except Exception:
+    _NUMBA_AVAILABLE = False
+
+# Max entries of one (targets x scan set) block in the numpy fallback
+_BLOCK = 1 << 22
+
 def build_A_set(A: List[int]) -> Set[int]:
     """Hash set of A for O(1) membership."""
     return set(A)
 
-def uncovered_list_from_coverage(B, start: int = 2) -> List[int]:
-    """Extract uncovered indices from coverage bitset B, starting at `start`."""
-    start = max(1, start)
-    return [k for k in range(start, len(B)) if not B[k]]
+def uncovered_list_from_coverage(B, start: int = 2) -> np.ndarray:
+    """
+    Extract uncovered indices (sorted int64 array) from coverage B, starting at
+    `start`.  Returns an ndarray, not a list: see diagnose.uncovered_indices.
+    """
+    return as_coverage_result(B).uncovered(start)
+
+
+if _NUMBA_AVAILABLE:
+    @nb.njit(cache=True)
+    def _pair_hits(
+        targets: np.ndarray, scan: np.ndarray, scan_is_A: bool,
+        A_bits: np.ndarray, H_bits: np.ndarray, H_sorted: np.ndarray, H_rank: np.ndarray,
+        cidx: np.ndarray, tpos: np.ndarray, fill: bool,
+    ) -> int:
+        """
+        For each target k (position t) walk the sorted scan set s < k (A, or
+        H_sorted) and test the complement k - s in the other packed bitset.  A
+        hit's candidate is the halo-order index H_rank of its H element, found
+        by binary search in H_sorted when scanning A.  Returns the number of
+        (candidate, target) hits; with fill=True also writes them to cidx/tpos.
+        """
+        n = A_bits.size * 64 - 1
+        kmax = H_bits.size * 64 - 1
+        one = np.uint64(1)
+        count = 0
+        for t in range(targets.size):
+            k = targets[t]
+            for j in range(scan.size):
+                s = scan[j]
+                if s >= k:
+                    break
+                d = k - s
+                c = -1
+                if scan_is_A:
+                    if d <= kmax and (H_bits[d >> 6] >> np.uint64(d & 63)) & one:
+                        c = H_rank[np.searchsorted(H_sorted, d)]
+                elif d <= n and (A_bits[d >> 6] >> np.uint64(d & 63)) & one:
+                    c = H_rank[j]
+                if c >= 0:
+                    if fill:
+                        cidx[count] = c
+                        tpos[count] = t
+                    count += 1
+        return count
+
+
+def _test_bits(words: np.ndarray, x: np.ndarray) -> np.ndarray:
+    """Membership of each x (0 <= x < 64 * words.size) in a packed bitset."""
+    return ((words[x >> 6] >> (x & 63).astype(np.uint64)) & np.uint64(1)).astype(bool)
+
+
+def _pair_hits_numpy(
+    targets: np.ndarray, scan: np.ndarray, scan_is_A: bool,
+    A_bits: np.ndarray, H_bits: np.ndarray, H_sorted: np.ndarray, H_rank: np.ndarray,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Pure-numpy fallback for _pair_hits: (targets x scan) differences in bounded blocks."""
+    n = A_bits.size * 64 - 1
+    kmax = H_bits.size * 64 - 1
+    rows = max(1, _BLOCK // max(scan.size, 1))
+    cs, ts = [], []
+    for lo in range(0, targets.size, rows):
+        k = targets[lo : lo + rows]
+        d = k[:, None] - scan[None, :]
+        c = np.full(d.shape, -1, dtype=np.int32)
+        if scan_is_A:
+            ok = (d >= 1) & (d <= kmax)
+            ok[ok] = _test_bits(H_bits, d[ok])
+            c[ok] = H_rank[np.searchsorted(H_sorted, d[ok])]
+        else:
+            ok = (d >= 1) & (d <= n)
+            ok[ok] = _test_bits(A_bits, d[ok])
+            c = np.where(ok, H_rank[None, :], -1)
+        t, j = np.nonzero(c >= 0)
+        cs.append(c[t, j].astype(np.int32))
+        ts.append((t + lo).astype(np.int32))
+    if not cs:
+        return np.zeros(0, dtype=np.int32), np.zeros(0, dtype=np.int32)
+    return np.concatenate(cs), np.concatenate(ts)
+
+
+def candidate_targets_csr(
+    n: int, A, targets, halo
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Which halo candidates a cover which targets k (k - a in A, 1 <= k - a <= n),
+    found target-first over packed bitsets of A and H (n/8 bytes each, plus
+    O(|A| + |H|)): each sorted target scans the smaller of A and H below k and
+    looks its complement up in the other one.
+
+    Returns (cand, indptr, indices) in CSR form: candidate cand[i] covers the
+    target positions indices[indptr[i]:indptr[i+1]] (ascending, int32).
+    Candidates with no hits (and halo values < 1, which are not candidates)
+    are dropped; the rest keep their first-occurrence order in `halo`, which is
+    what the greedy tie-break relies on.
+    """
+    T = np.asarray(targets, dtype=np.int64)
+    A_arr = np.asarray(A, dtype=np.int64)
+    H_arr = np.asarray(halo, dtype=np.int64)
+    kmax = int(T[-1]) if T.size else 0
+
+    A_arr = np.unique(A_arr[(A_arr >= 1) & (A_arr <= n)])
+    A_bits = _pack_bits(A_arr, n)
+    H_arr = H_arr[(H_arr >= 1) & (H_arr < kmax)]
+    H_sorted, first = np.unique(H_arr, return_index=True)
+    H_order = H_arr[np.sort(first)]  # distinct halo values, halo order
+    # halo-order index of each sorted H value
+    H_rank = np.empty(H_sorted.size, dtype=np.int32)
+    H_rank[np.argsort(first, kind="stable")] = np.arange(H_sorted.size, dtype=np.int32)
+    H_bits = _pack_bits(H_sorted, kmax)
+
+    A_scan = A_arr[: int(np.searchsorted(A_arr, kmax))]
+    scan_is_A = A_scan.size <= H_sorted.size
+    scan = A_scan if scan_is_A else H_sorted
+    bits = (A_bits, H_bits, H_sorted, H_rank)
+
+    if _NUMBA_AVAILABLE:
+        empty = np.zeros(0, dtype=np.int32)
+        total = _pair_hits(T, scan, scan_is_A, *bits, empty, empty, False)
+        cidx = np.empty(total, dtype=np.int32)
+        tpos = np.empty(total, dtype=np.int32)
+        _pair_hits(T, scan, scan_is_A, *bits, cidx, tpos, True)
+    else:
+        cidx, tpos = _pair_hits_numpy(T, scan, scan_is_A, *bits)
+
+    # Hits come out target-major; a stable sort by candidate keeps targets ascending
+    order = np.argsort(cidx, kind="stable")
+    indices = tpos[order]
+    counts = np.bincount(cidx, minlength=H_order.size)
+    keep = counts > 0
+    indptr = np.zeros(int(keep.sum()) + 1, dtype=np.int64 if indices.size >= 2**31 else np.int32)
+    np.cumsum(counts[keep], out=indptr[1:])
+    return H_order[keep], indptr, indices
+
 
 def greedy_augment_to_cover(
     n: int,
@@ -28,49 +176,72 @@ def greedy_augment_to_cover(
 
     Returns (added, remaining_uncovered).
     """
-    A_set = build_A_set(A)
-    remaining = list(uncovered)
+    remaining = [int(k) for k in uncovered]
     added: List[int] = []
-    if not remaining or not halo:
+    if not remaining or len(halo) == 0:
         return added, remaining
 
-    # Precompute for speed: map candidate a -> indices of k it can cover
-    cover_map: List[Tuple[int, List[int]]] = []  # (a, k_list)
-    rem_set = set(remaining)
-    for a in halo:
-        hits = []
-        for k in remaining:
-            b = k - a
-            if 1 <= b <= n and b in A_set:
-                hits.append(k)
-        if hits:
-            cover_map.append((a, hits))
-
-    # Greedy loop: pick candidate covering the most remaining k at each step
-    # Simple O(|halo| * |uncovered|) works fine for your scales
-    picks = 0
-    while rem_set:
-        best_idx = -1
-        best_gain = 0
-        # recompute effective gains w.r.t. current rem_set
-        for i, (a, hits) in enumerate(cover_map):
-            gain = sum(1 for k in hits if k in rem_set)
-            if gain > best_gain:
-                best_gain = gain
-                best_idx = i
-        if best_idx == -1 or best_gain == 0:
-            break  # no candidate helps further
-
-        a, hits = cover_map[best_idx]
-        added.append(a)
-        picks += 1
-        # remove covered k from rem_set
-        for k in hits:
-            if k in rem_set:
-                rem_set.remove(k)
+    with span("augment", n=n, A_size=len(A), uncovered=len(remaining), halo=len(halo)) as s:
+        # Precompute for speed: candidate a -> positions (in `targets`) of the k it can cover
+        targets = np.unique(np.asarray(remaining, dtype=np.int64))
+        cand, indptr, indices = candidate_targets_csr(n, A, targets, halo)
+
+        picks, covered = _lazy_greedy(indptr, indices, targets.size, max_add)
+        added = cand[picks].tolist()
+        rest = targets[~covered].tolist()
+        if s:
+            s.set(candidates=int(cand.size), hits=int(indices.size), added=len(added), remaining=len(rest))
+    return added, rest
+
+
+def _lazy_greedy(
+    indptr: np.ndarray, indices: np.ndarray, n_targets: int, max_add: int | None = None
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Lazy greedy max-coverage over candidates i covering target positions
+    indices[indptr[i]:indptr[i+1]].
+
+    Gains live in a max-heap keyed (-gain, i) and are only refreshed when popped;
+    an inverted index (target -> candidates) decrements the true gains as targets
+    get covered, so the total update work is O(sum |hits|).  Gains only shrink, so a
+    popped entry whose key is still current is the argmax, and ties go to the
+    smallest i -- the same picks as rescanning every candidate each step.
+
+    Returns (picked candidate indices in order, covered flag per target).
+    """
+    sizes = np.diff(indptr)
+    owner = np.repeat(np.arange(sizes.size), sizes)
+    order = np.argsort(indices, kind="stable")
+    inv_ptr = np.zeros(n_targets + 1, dtype=np.int64)
+    np.cumsum(np.bincount(indices, minlength=n_targets), out=inv_ptr[1:])
+
+    # Plain lists: the loop below is scalar and list indexing beats numpy item access
+    gain = sizes.tolist()
+    ptr, hits = indptr.tolist(), indices.tolist()
+    iptr, inverted = inv_ptr.tolist(), owner[order].tolist()
+
+    covered = [False] * n_targets
+    heap = [(-g, i) for i, g in enumerate(gain) if g > 0]
+    heapq.heapify(heap)
+    picks: List[int] = []
+    while heap:
+        neg, i = heapq.heappop(heap)
+        g = gain[i]
+        if g == 0:
+            continue  # no longer helps
+        if g != -neg:
+            heapq.heappush(heap, (-g, i))  # stale: reinsert with the current gain
+            continue
+
+        picks.append(i)
+        for t in hits[ptr[i] : ptr[i + 1]]:
+            if not covered[t]:
+                covered[t] = True
+                for j in inverted[iptr[t] : iptr[t + 1]]:
+                    gain[j] -= 1
 
         # Optional stop condition
-        if max_add is not None and picks >= max_add:
+        if max_add is not None and len(picks) >= max_add:
             break
 
-    return added, sorted(rem_set)
+    return np.asarray(picks, dtype=np.int64), np.asarray(covered, dtype=bool)
@@ -1,27 +1,39 @@
 # tc/augment_api.py
 import math
-from typing import Dict, Any
-from tc.smooth import primes_upto, generate_friables
-from tc.cover import coverage_bitset
-from tc.diagnose import uncovered_indices
+from typing import Dict, Any, Optional
+
+import numpy as np
+
+from tc.smooth import lpf_sieve, friables, friables_in_band
+from tc.cache import cached_coverage, default_cache
+from tc.cover import extend_coverage
 from tc.augment import greedy_augment_to_cover
 
-def run_augment_once(n: int, C: float, Cbump: float, start: int = 2) -> Dict[str, Any]:
+def run_augment_once(
+    n: int, C: float, Cbump: float, start: int = 2, lpf: Optional[np.ndarray] = None
+) -> Dict[str, Any]:
+    """
+    One augmentation run.  Pass a precomputed lpf_sieve(n) as `lpf` to share it
+    across calls at the same n.
+    """
     yA = int((math.log(n)) ** C)
     yH = int((math.log(n)) ** (C + Cbump))
-    A = generate_friables(n, primes_upto(yA))
-    B = coverage_bitset(A, n)
-    unc = uncovered_indices(B, start=start)
-    Aset = set(A)
-    H_all = generate_friables(n, primes_upto(yH))
-    H = [h for h in H_all if h not in Aset]
-    added, remaining = greedy_augment_to_cover(n=n, A=A, uncovered=unc, halo=H, max_add=None, start=start)
-    A_prime = A if not added else sorted(A + added)
-    Bp = coverage_bitset(A_prime, n)
-    uncp = uncovered_indices(Bp, start=start)
+    if lpf is None:
+        lpf = lpf_sieve(n)
+    A = friables(n, yA, lpf)
+    B = cached_coverage(n, yA, cache=default_cache(), lpf=lpf)  # fresh copy; extended in place below
+    unc = B.uncovered(start=start)
+    # Halo: yH-smooth but not yA-smooth, read straight off the sieve
+    H = friables_in_band(n, yA, yH, lpf)
+    added, remaining = greedy_augment_to_cover(
+        n=n, A=A.tolist(), uncovered=unc, halo=H.tolist(), max_add=None, start=start
+    )
+    # Verify A' = A ∪ added by marking only the sums that involve an added element
+    Bp = extend_coverage(B, A, added, n)
+    uncp = Bp.count_uncovered(start=start)
     return {
         "n": n, "C": C, "Cbump": Cbump, "yA": yA, "yH": yH,
-        "A_size": len(A), "unc_base": len(unc), "H_candidates": len(H),
-        "added": len(added), "unc_after": len(uncp),
+        "A_size": len(A), "unc_base": int(unc.size), "H_candidates": len(H),
+        "added": len(added), "unc_after": uncp,
         "added_list": added[:10],
     }
@@ -0,0 +1,283 @@
+# tc/bench.py
+"""
+Coverage engine benchmark suite.
+
+Runs every engine over an n × C matrix, records wall time (best of --repeat),
+peak memory and pairs per second, where pairs = #{(a, b) ∈ A × A : a + b <= n}
+is the same work unit for every engine.  Each cell also checks that all engines
+produce identical coverage.
+
+Every (engine, cell) runs in a fresh spawned process, and its peak memory is
+the rise of the kernel-maintained high-water mark (ru_maxrss; peak_wset on
+Windows) across the timed runs, so allocations inside GIL-holding kernels are
+counted.  On Linux the mark is first reset to the current RSS (clear_refs), so
+this is the runs' peak above the starting level; elsewhere it is the rise above
+the process's earlier peak, a lower bound.  RSS cannot see buffers placed in
+freed memory that is still resident, so one extra untimed run under tracemalloc
+also records the peak of numpy/Python allocations (peak_alloc_mb; arrays a
+Numba kernel allocates internally are not traced).  The mp engine's workers are reported separately as the largest
+worker's high-water mark (RUSAGE_CHILDREN, after the pool is shut down).
+
+Runs are appended to a JSON history file; each cell is compared with the
+stored baseline and flagged when its wall time exceeds the baseline by more
+than --threshold.  Exit status is 1 on a coverage mismatch or a regression.
+
+Usage:
+  python -m tc.bench
+  python -m tc.bench --n 1e6,5e6 --C 1.4,2.0 --engines twoptr,packed,fft
+  python -m tc.bench --save-baseline
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import math
+import os
+import platform
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from .cover import pair_count
+from .result import CoverageResult
+from .shm import pool_context
+
+DEFAULT_HISTORY = "bench_history.json"
+DEFAULT_BASELINE = "bench_baseline.json"
+DEFAULT_THRESHOLD = 0.20
+
+
+def _engines() -> Dict[str, Callable[[np.ndarray, int], CoverageResult]]:
+    """name -> engine(A, n) for every coverage engine usable in this environment."""
+    from . import cover
+    from .reps import covered_from_counts, representation_counts
+
+    def mark_pairs(A: np.ndarray, n: int) -> CoverageResult:
+        hits = np.zeros(n + 1, dtype=np.uint8)
+        cover._mark_pairs(A.astype(np.int32), n, hits)
+        return CoverageResult(hits, n)
+
+    engines: Dict[str, Callable[[np.ndarray, int], CoverageResult]] = {}
+    if cover._NUMBA_AVAILABLE:
+        engines["pairs"] = mark_pairs
+        engines["twoptr"] = lambda A, n: cover.coverage_bitset_njit(A, n, tiled=False)
+        engines["tiled"] = lambda A, n: cover.coverage_bitset_njit(A, n, tiled=True)
+        engines["packed_parallel"] = lambda A, n: CoverageResult(cover.coverage_packed(A, n, parallel=True), n)
+    engines["packed"] = lambda A, n: CoverageResult(cover.coverage_packed(A, n), n)
+    engines["mp"] = lambda A, n: cover.coverage_bitset_parallel(A, n)
+    engines["fft"] = lambda A, n: cover.coverage_bitset_fft(A, n)
+    engines["reps"] = lambda A, n: covered_from_counts(representation_counts(A, n, cap=1))
+    return engines
+
+
+def _peak_rss(children: bool = False) -> int:
+    """
+    High-water RSS in bytes of this process (or of its largest waited-for
+    child), as tracked by the kernel; 0 where it cannot be read.
+    """
+    try:
+        import resource
+
+        who = resource.RUSAGE_CHILDREN if children else resource.RUSAGE_SELF
+        return resource.getrusage(who).ru_maxrss * (1 if sys.platform == "darwin" else 1024)
+    except ImportError:  # Windows
+        if children:
+            return 0
+        import psutil
+
+        return int(getattr(psutil.Process().memory_info(), "peak_wset", 0))
+
+
+def _reset_peak() -> None:
+    """Reset this process's high-water RSS to its current RSS (Linux only; no-op elsewhere)."""
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+    except OSError:
+        pass
+
+
+def _measure_cell(engine: str, A: np.ndarray, n: int, repeat: int) -> Tuple[float, int, int, int, np.ndarray, int]:
+    """
+    Worker: run `engine` `repeat` times on (A, n) in this fresh process, then once
+    more under tracemalloc.  Returns (best wall, peak RSS rise, peak traced
+    allocation, largest worker peak, packed coverage, uncovered).
+    """
+    import tracemalloc
+
+    from . import cover
+
+    fn = _engines()[engine]
+    fn(np.array([1, 2, 3, 5], dtype=np.int64), 16)  # load compiled code before the baseline
+    _reset_peak()
+    base = _peak_rss()
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        B = fn(A, n)
+        best = min(best, time.perf_counter() - t0)
+    peak = max(0, _peak_rss() - base)
+    words, uncovered = np.asarray(B.to_packed()), B.count_uncovered()
+    del B
+    tracemalloc.start()
+    fn(A, n)
+    alloc = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    cover.shutdown_pool()  # reap the mp workers so RUSAGE_CHILDREN sees them
+    return best, peak, alloc, _peak_rss(children=True), words, uncovered
+
+
+def measure(engine: str, A: np.ndarray, n: int, repeat: int = 1) -> Tuple[float, int, int, int, np.ndarray, int]:
+    """
+    (best wall seconds, peak RSS rise, peak traced allocation, largest worker
+    peak (bytes), packed coverage, uncovered count) of `engine` on (A, n), run
+    `repeat` times in a fresh spawned process.
+    """
+    # An executor worker, unlike a Pool's daemonic one, may start the mp engine's pool
+    with ProcessPoolExecutor(max_workers=1, mp_context=pool_context(fresh=True)) as ex:
+        return ex.submit(_measure_cell, engine, A, n, repeat).result()
+
+
+def run_matrix(
+    Ns: List[int], Cs: List[float], engines: List[str], repeat: int = 3, verbose: bool = True
+) -> Tuple[List[Dict[str, Any]], List[str]]:
+    """
+    Benchmark `engines` on every (n, C); returns (records, mismatches), where
+    mismatches names the cells whose engines disagree on the coverage.
+    """
+    from .smooth import friables, lpf_sieve
+
+    available = _engines()
+    unknown = [e for e in engines if e not in available]
+    if unknown:
+        raise ValueError(f"unknown or unavailable engines: {unknown}; choose from {sorted(available)}")
+
+    # Compile (and cache) outside the measured processes
+    tiny = np.array([1, 2, 3, 5], dtype=np.int64)
+    for e in engines:
+        available[e](tiny, 16)
+
+    records: List[Dict[str, Any]] = []
+    mismatches: List[str] = []
+    for n in Ns:
+        lpf = lpf_sieve(n)
+        for C in Cs:
+            y = int((math.log(n)) ** C)
+            A = friables(n, y, lpf)
+            pairs = pair_count(A, n)
+            ref: Optional[np.ndarray] = None
+            ref_engine = ""
+            for e in engines:
+                best_wall, peak, alloc, worker_peak, words, uncovered = measure(e, A, n, repeat)
+                if ref is None:
+                    ref, ref_engine = words, e
+                elif not np.array_equal(words, ref):
+                    mismatches.append(f"n={n} C={C}: {e} != {ref_engine}")
+                rec = {
+                    "engine": e, "n": n, "C": C, "y": y, "A_size": int(A.size), "pairs": pairs,
+                    "wall_sec": round(best_wall, 6), "peak_rss_mb": round(peak / 2**20, 2),
+                    "peak_alloc_mb": round(alloc / 2**20, 2),
+                    "worker_peak_rss_mb": round(worker_peak / 2**20, 2),
+                    "pairs_per_sec": pairs / best_wall if best_wall > 0 else float("inf"),
+                    "uncovered": uncovered,
+                }
+                records.append(rec)
+                if verbose:
+                    print(
+                        f"{e:>16} {n:>12,} {C:>5.2f} {A.size:>10,} {best_wall:>9.3f}s "
+                        f"{rec['peak_rss_mb']:>9.1f}MB {rec['peak_alloc_mb']:>9.1f}MB "
+                        f"{rec['pairs_per_sec']:>11.3g} pairs/s"
+                    )
+    return records, mismatches
+
+
+def _key(rec: Dict[str, Any]) -> str:
+    return f"{rec['engine']}|{rec['n']}|{rec['C']}"
+
+
+def compare(records: List[Dict[str, Any]], baseline: Dict[str, Any], threshold: float) -> List[str]:
+    """Cells whose wall time exceeds the baseline's by more than `threshold` (fraction)."""
+    base = {_key(r): r for r in baseline.get("records", [])}
+    flagged = []
+    for rec in records:
+        b = base.get(_key(rec))
+        if b is None or b["wall_sec"] <= 0:
+            continue
+        ratio = rec["wall_sec"] / b["wall_sec"]
+        rec["vs_baseline"] = round(ratio, 3)
+        if ratio > 1.0 + threshold:
+            flagged.append(
+                f"{rec['engine']} n={rec['n']} C={rec['C']}: {rec['wall_sec']:.3f}s vs "
+                f"baseline {b['wall_sec']:.3f}s ({(ratio - 1) * 100:+.0f}%)"
+            )
+    return flagged
+
+
+def _load_json(path: str, default):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return default
+
+
+def _write_json(path: str, data) -> None:
+    tmp = path + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump(data, f, indent=1)
+    os.replace(tmp, path)
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="Benchmark tc coverage engines.")
+    ap.add_argument("--n", default="1e6,2e6", help="Comma-separated n values (floats allowed, e.g. 1e7)")
+    ap.add_argument("--C", default="1.4,2.0", help="Comma-separated C values: y=(log n)^C")
+    ap.add_argument("--engines", default=None, help="Comma-separated engines (default: all available)")
+    ap.add_argument("--repeat", type=int, default=3, help="Timed repetitions per cell (best is kept)")
+    ap.add_argument("--history", default=DEFAULT_HISTORY, help="JSON history file the run is appended to")
+    ap.add_argument("--baseline", default=DEFAULT_BASELINE, help="Baseline JSON to compare against")
+    ap.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD, help="Regression threshold (0.2 = 20%% slower)")
+    ap.add_argument("--save-baseline", action="store_true", help="Store this run as the new baseline")
+    args = ap.parse_args()
+
+    Ns = [int(float(x)) for x in args.n.split(",")]
+    Cs = [float(x) for x in args.C.split(",")]
+    engines = args.engines.split(",") if args.engines else list(_engines())
+
+    print(f"{'engine':>16} {'n':>12} {'C':>5} {'|A|':>10} {'wall':>10} {'peak RSS':>11} {'peak alloc':>11} {'throughput':>17}")
+    records, mismatches = run_matrix(Ns, Cs, engines, repeat=args.repeat)
+
+    baseline = _load_json(args.baseline, None)
+    regressions = compare(records, baseline, args.threshold) if baseline else []
+
+    run = {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "machine": {"node": platform.node(), "cpus": os.cpu_count(), "python": platform.python_version()},
+        "records": records,
+        "mismatches": mismatches,
+        "regressions": regressions,
+    }
+    history = _load_json(args.history, [])
+    history.append(run)
+    _write_json(args.history, history)
+    print(f"[bench] appended run to {args.history}")
+    if args.save_baseline:
+        _write_json(args.baseline, run)
+        print(f"[bench] saved baseline to {args.baseline}")
+    elif baseline is None:
+        print(f"[bench] no baseline at {args.baseline}; rerun with --save-baseline to store one")
+
+    for m in mismatches:
+        print(f"[mismatch] {m}")
+    for r in regressions:
+        print(f"[regression] {r}")
+    if mismatches or regressions:
+        raise SystemExit(1)
+    print("[bench] all engines agree" + ("; no regressions" if baseline else ""))
+
+
+if __name__ == "__main__":
+    main()
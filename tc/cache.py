@@ -0,0 +1,250 @@
+# tc/cache.py
+"""
+Content-addressed on-disk cache for friable sets, first-cover maps and packed
+coverage.
+
+Nearby C values often map to the same integer y = int((log n)^C), and the grid,
+threshold and plotting scripts re-probe the same (n, y) points, so each entry is
+keyed on its parameters (n, y, include_zero, thinning, ...) plus CACHE_VERSION
+and a hash of the sources that compute that kind of entry (so editing an engine
+retires its old entries), and stored as one uncompressed .npz file.  An entry
+that fails to load (truncated or corrupted) counts as a miss and is deleted.  Total size is capped; the least
+recently used entries are evicted first (access time is tracked via mtime).
+
+Environment:
+  TC_CACHE=0            disable the cache (every call recomputes)
+  TC_CACHE_DIR          cache directory (default: .tc_cache in the working dir)
+  TC_CACHE_MAX_BYTES    size cap in bytes (default: 2 GiB)
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import tempfile
+import zipfile
+from functools import lru_cache
+from typing import Any, Callable, Dict, Optional
+
+import numpy as np
+
+# Bump when a kernel's output for the same key changes
+CACHE_VERSION = 2  # 2: thinning draws from numpy.random.Generator
+
+DEFAULT_CACHE_DIR = ".tc_cache"
+DEFAULT_MAX_BYTES = 2 * 1024**3
+
+# tc modules whose code determines each kind of entry
+_SOURCES = {
+    "friables": ("smooth.py", "thin.py", "diagnose.py"),
+    "first_cover": ("smooth.py", "ymin.py"),
+    "coverage": ("smooth.py", "thin.py", "diagnose.py", "cover.py", "segment.py", "result.py"),
+}
+
+
+@lru_cache(maxsize=None)
+def code_fingerprint(kind: str) -> str:
+    """Hash of the tc sources that compute entries of `kind` (all of tc/ if unlisted)."""
+    tc_dir = os.path.dirname(os.path.abspath(__file__))
+    names = _SOURCES.get(kind) or sorted(f for f in os.listdir(tc_dir) if f.endswith(".py"))
+    h = hashlib.sha256()
+    for name in names:
+        h.update(name.encode())
+        with open(os.path.join(tc_dir, name), "rb") as f:
+            h.update(f.read())
+    return h.hexdigest()[:16]
+
+
+class Cache:
+    """
+    Directory of .npz entries named by the hash of their key, with an LRU size cap.
+    """
+
+    def __init__(self, root: Optional[str] = None, max_bytes: Optional[int] = None) -> None:
+        self.root = root or os.environ.get("TC_CACHE_DIR", DEFAULT_CACHE_DIR)
+        if max_bytes is None:
+            max_bytes = int(os.environ.get("TC_CACHE_MAX_BYTES", DEFAULT_MAX_BYTES))
+        self.max_bytes = max_bytes
+        os.makedirs(self.root, exist_ok=True)
+
+    @staticmethod
+    def key(kind: str, **params: Any) -> str:
+        """Stable hash of (kind, params, CACHE_VERSION, code_fingerprint(kind))."""
+        blob = json.dumps(
+            {"kind": kind, "version": CACHE_VERSION, "code": code_fingerprint(kind), **params}, sort_keys=True
+        )
+        return f"{kind}-{hashlib.sha256(blob.encode()).hexdigest()[:32]}"
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.root, key + ".npz")
+
+    def get(self, key: str) -> Optional[Dict[str, np.ndarray]]:
+        """Arrays stored under `key`, or None on a miss (an unreadable entry is deleted)."""
+        path = self._path(key)
+        try:
+            with np.load(path) as z:
+                arrays = {name: z[name] for name in z.files}
+        except FileNotFoundError:
+            return None
+        except (zipfile.BadZipFile, EOFError, KeyError, OSError, ValueError):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            return None
+        try:
+            os.utime(path)  # mark as recently used
+        except OSError:
+            pass
+        return arrays
+
+    def put(self, key: str, **arrays: np.ndarray) -> None:
+        """Store arrays under `key` atomically, then enforce the size cap."""
+        fd, tmp = tempfile.mkstemp(dir=self.root, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                np.savez(f, **arrays)
+            os.replace(tmp, self._path(key))
+        except BaseException:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            raise
+        self.evict()
+
+    def evict(self) -> None:
+        """Remove least recently used entries until the cache fits max_bytes."""
+        entries = []
+        for name in os.listdir(self.root):
+            if not name.endswith(".npz"):
+                continue
+            path = os.path.join(self.root, name)
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            entries.append((st.st_mtime, st.st_size, path))
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+                total -= size
+            except OSError:
+                pass
+
+    def get_or_compute(
+        self, kind: str, params: Dict[str, Any], compute: Callable[[], Dict[str, np.ndarray]]
+    ) -> Dict[str, np.ndarray]:
+        """Load the entry for (kind, params), computing and storing it on a miss."""
+        key = self.key(kind, **params)
+        hit = self.get(key)
+        if hit is not None:
+            return hit
+        arrays = compute()
+        self.put(key, **arrays)
+        return arrays
+
+
+def default_cache() -> Optional[Cache]:
+    """The cache configured by the environment, or None when TC_CACHE=0."""
+    if os.environ.get("TC_CACHE", "1").strip() == "0":
+        return None
+    return Cache()
+
+
+def _through(cache: Optional[Cache], kind: str, params: Dict[str, Any], compute):
+    if cache is None:
+        return compute()
+    return cache.get_or_compute(kind, params, compute)
+
+
+def cached_friables(
+    n: int,
+    y: int,
+    include_zero: bool = False,
+    thin: Optional[Dict[str, Any]] = None,
+    cache: Optional[Cache] = None,
+    lpf: Optional[np.ndarray] = None,
+) -> np.ndarray:
+    """
+    y-smooth integers <= n (0 prepended if include_zero), optionally thinned with
+    residue_balanced_thin(**thin); loaded from `cache` when present.  Pass a
+    precomputed lpf_sieve (covering at least n) to skip the sieve on a miss.
+    """
+    from .smooth import friables
+    from .thin import residue_balanced_thin
+
+    def compute():
+        A = friables(n, y, lpf)
+        if include_zero:
+            A = np.concatenate(([0], A))
+        if thin:
+            A = np.asarray(residue_balanced_thin(A.tolist(), **thin), dtype=np.int64)
+        return {"A": A}
+
+    params = {"n": n, "y": y, "include_zero": include_zero, "thin": thin or {}}
+    return _through(cache, "friables", params, compute)["A"]
+
+
+def cached_first_cover(
+    n: int,
+    Y: int,
+    include_zero: bool = False,
+    cache: Optional[Cache] = None,
+    lpf: Optional[np.ndarray] = None,
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    (P, ymin) for the friables at Y: P+ of each friable and the first-cover map,
+    which answers every probe y <= Y.  Loaded from `cache` when present; pass a
+    precomputed lpf_sieve (covering at least n) to skip the sieve on a miss.
+    """
+    from .smooth import lpf_sieve, friables
+    from .ymin import first_cover_map
+
+    def compute():
+        tab = lpf_sieve(n) if lpf is None else lpf[: n + 1]
+        A = friables(n, Y, tab)
+        if include_zero:
+            A = np.concatenate(([0], A))
+        P = tab[A]  # lpf[0] = 0 keeps 0 present at every y
+        return {"P": P, "ymin": first_cover_map(A, P, n)}
+
+    arrays = _through(cache, "first_cover", {"n": n, "Y": Y, "include_zero": include_zero}, compute)
+    return arrays["P"], arrays["ymin"]
+
+
+def cached_coverage(
+    n: int,
+    y: int,
+    include_zero: bool = False,
+    thin: Optional[Dict[str, Any]] = None,
+    cache: Optional[Cache] = None,
+    lpf: Optional[np.ndarray] = None,
+):
+    """
+    Packed coverage of A + A for the (possibly thinned) friables at y, as a
+    CoverageResult; loaded from `cache` when present.  `lpf` is passed on to
+    cached_friables for a miss.
+    """
+    from .cover import coverage_bitset
+    from .result import CoverageResult
+
+    def compute():
+        A = cached_friables(n, y, include_zero, thin, cache, lpf)
+        return {"words": coverage_bitset(A, n).to_packed()}
+
+    params = {"n": n, "y": y, "include_zero": include_zero, "thin": thin or {}}
+    words = _through(cache, "coverage", params, compute)["words"]
+    return CoverageResult(np.asarray(words, dtype=np.uint64), n, "packed")
+
+
+__all__ = [
+    "CACHE_VERSION",
+    "code_fingerprint",
+    "Cache",
+    "default_cache",
+    "cached_friables",
+    "cached_first_cover",
+    "cached_coverage",
+]
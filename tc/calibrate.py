@@ -0,0 +1,388 @@
+# tc/calibrate.py
+"""
+Per-machine calibration and automatic engine selection for coverage_bitset.
+
+Each engine's wall time is modelled as
+
+    wall ≈ overhead_sec + sec_per_unit * work(engine, n, A)
+
+with a work unit that tracks what the engine actually touches:
+
+  pairs, twoptr, tiled   pairs = #{(a, b) ∈ A × A : a + b <= n} (+ |A| row setups)
+  packed, packed_parallel, mp
+                         uint64 words shift-OR'ed: Σ_a (W - a/64), W = (n+1)/64
+  fft                    L log2 L, L the transform length (~ max(n, 2 max A))
+
+Running
+
+    python -m tc.calibrate
+
+once times every available engine on a small (n, C) grid of friable sets,
+fits the two coefficients per engine by least squares and writes them to the
+profile (TC_CALIBRATION, default ~/.tc/calibration.json).  choose_engine()
+then predicts every engine's time for the (n, |A|, density) at hand, drops
+engines whose memory estimate does not fit in the free memory, and picks the
+fastest; without a profile it uses built-in coefficients.  Every choice is
+logged on the "tc.cover" logger and, with telemetry on, as an
+"engine_choice" span.
+
+Environment:
+  TC_CALIBRATION    calibration profile path (default: ~/.tc/calibration.json)
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import math
+import os
+import platform
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from .cover import _NUMBA_AVAILABLE, _PYFFTW_AVAILABLE, _next_fast_len, _n_words
+
+PROFILE_VERSION = 1
+DEFAULT_PROFILE = os.path.join("~", ".tc", "calibration.json")
+# Engines whose working set is above this share of the free memory are skipped
+_MEMORY_HEADROOM = 0.8
+# Pair counts are estimated from at most this many evenly spaced elements of A
+_PAIR_SAMPLE = 4096
+# Resident memory of one spawned mp worker (interpreter, numpy and the kernels);
+# tc.bench measured ~141 MiB worker peak RSS.  Forked workers share most of it
+# with the parent, so this is an upper bound.
+_MP_WORKER_BYTES = 140 << 20
+
+PAIR_ENGINES = ("pairs", "twoptr", "tiled")
+WORD_ENGINES = ("packed", "packed_parallel", "mp")
+ENGINES = PAIR_ENGINES + WORD_ENGINES + ("fft",)
+
+# Fallback coefficients (sec_per_unit, overhead_sec) when no profile exists:
+# the fit of calibrate([1e5, 1e6, 4e6], [1.0, 1.2, 1.4, 1.6, 2.0]) on a
+# single-core x86-64 machine, with Numba and (False) with the numpy fallbacks.
+# They reproduce that machine's measured winners: a pair kernel for sparse A,
+# fft from C ~ 1.4 up at n = 1e6.  mp's overhead is its cold pool startup, not
+# the fit's (warm) zero: a first call started the workers in ~0.35 s forked and
+# ~0.9 s spawned there, and auto often makes one call per process.
+_DEFAULT_COSTS: Dict[bool, Dict[str, Tuple[float, float]]] = {
+    True: {
+        "pairs": (2.84e-9, 0.0),
+        "twoptr": (2.16e-9, 0.037),
+        "tiled": (3.68e-9, 0.0008),
+        "packed": (4.15e-9, 0.13),
+        "packed_parallel": (5.33e-9, 0.0),
+        "mp": (5.99e-9, 0.9),
+        "fft": (1.02e-8, 0.0),
+    },
+    # numpy fallbacks only (the pair kernels need Numba)
+    False: {
+        "packed": (5.47e-9, 0.05),
+        "mp": (1.38e-8, 0.12),
+        "fft": (7.93e-9, 0.05),
+    },
+}
+
+
+def profile_path(path: Optional[str] = None) -> str:
+    """Profile location: `path`, else TC_CALIBRATION, else ~/.tc/calibration.json."""
+    return os.path.expanduser(path or os.environ.get("TC_CALIBRATION") or DEFAULT_PROFILE)
+
+
+def available_engines() -> List[str]:
+    """Engines coverage_bitset can dispatch to in this environment."""
+    if _NUMBA_AVAILABLE:
+        return list(ENGINES)
+    return [e for e in ENGINES if e in _DEFAULT_COSTS[False]]
+
+
+# --- Cost and memory model ---------------------------------------------------
+
+def estimate_pairs(A: np.ndarray, n: int) -> int:
+    """
+    #{(a, b) ∈ A × A : a + b <= n} for sorted A, from an evenly spaced sample of
+    at most _PAIR_SAMPLE rows (exact when |A| is at most that).
+    """
+    m = A.size
+    if m == 0:
+        return 0
+    step = max(1, m // _PAIR_SAMPLE)
+    rows = A[::step]
+    return int(np.searchsorted(A, n - rows, side="right").sum() * (m / rows.size))
+
+
+def features(A: np.ndarray, n: int) -> Dict[str, Any]:
+    """Inputs of the cost model for sorted A (entries in [0, n])."""
+    m = int(A.size)
+    max_a = int(A[-1]) if m else 0
+    return {
+        "n": int(n),
+        "A_size": m,
+        "density": m / (n + 1),
+        "pairs": estimate_pairs(A, n),
+        "sum_a": float(A.sum(dtype=np.float64)) if m else 0.0,
+        "fft_len": _next_fast_len(max(n + 1, 2 * max_a + 1)),
+    }
+
+
+def work(engine: str, f: Dict[str, Any]) -> float:
+    """Work units of `engine` for features `f` (see the module docstring)."""
+    if engine in PAIR_ENGINES:
+        return float(f["pairs"] + f["A_size"])
+    if engine in WORD_ENGINES:
+        W = _n_words(f["n"])
+        return max(f["A_size"] * W - f["sum_a"] / 64.0, float(W))
+    if engine == "fft":
+        L = f["fft_len"]
+        return L * math.log2(max(L, 2))
+    raise ValueError(f"unknown engine: {engine!r}")
+
+
+def memory_bytes(engine: str, f: Dict[str, Any]) -> int:
+    """Peak working set of `engine` beyond A itself, in bytes."""
+    n = f["n"]
+    if engine in PAIR_ENGINES:
+        return n + 1  # uint8 hit vector
+    if engine == "mp":
+        # shared source and result words plus the returned copy, and the
+        # worker processes
+        workers = min(os.cpu_count() or 1, 8)
+        return 24 * _n_words(n) + workers * _MP_WORKER_BYTES
+    if engine in WORD_ENGINES:
+        # source and result words (_pack_bits sets A's bits in place)
+        return 16 * _n_words(n)
+    if engine == "fft":
+        # float64 input and output plus the complex half spectrum, and the hits
+        return 32 * f["fft_len"] + n + 1
+    raise ValueError(f"unknown engine: {engine!r}")
+
+
+def free_memory() -> Optional[int]:
+    """Available physical memory in bytes, or None when psutil is missing."""
+    try:
+        import psutil
+
+        return int(psutil.virtual_memory().available)
+    except Exception:
+        return None
+
+
+# --- Profiles ----------------------------------------------------------------
+
+_LOADED: Dict[str, Tuple[float, Optional[Dict[str, Any]]]] = {}
+
+
+def load_profile(path: Optional[str] = None) -> Optional[Dict[str, Any]]:
+    """The calibration profile at profile_path(path), or None (re-read when the file changes)."""
+    p = profile_path(path)
+    try:
+        mtime = os.stat(p).st_mtime
+    except OSError:
+        return None
+    hit = _LOADED.get(p)
+    if hit is not None and hit[0] == mtime:
+        return hit[1]
+    try:
+        with open(p) as fh:
+            prof = json.load(fh)
+        if prof.get("version") != PROFILE_VERSION:
+            prof = None
+    except (OSError, ValueError):
+        prof = None
+    _LOADED[p] = (mtime, prof)
+    return prof
+
+
+def _costs(profile: Optional[Dict[str, Any]]) -> Dict[str, Tuple[float, float]]:
+    """engine -> (sec_per_unit, overhead_sec) for the engines usable here."""
+    usable = available_engines()
+    costs = {e: c for e, c in _DEFAULT_COSTS[_NUMBA_AVAILABLE].items() if e in usable}
+    if profile is not None and bool(profile.get("machine", {}).get("numba")) == _NUMBA_AVAILABLE:
+        for e, c in profile.get("engines", {}).items():
+            if e in usable:
+                costs[e] = (float(c["sec_per_unit"]), float(c["overhead_sec"]))
+    return costs
+
+
+def choose_engine(
+    A: np.ndarray, n: int, profile: Optional[Dict[str, Any]] = None, free: Optional[int] = None
+) -> Tuple[str, Dict[str, Any]]:
+    """
+    Pick the engine with the lowest predicted wall time for sorted A on [0, n]
+    among those whose memory estimate fits in `free` bytes (default: the
+    currently available memory).  `profile` defaults to load_profile().
+
+    Returns (engine, info) where info holds the features, the source of the
+    coefficients and every engine's prediction, for the audit log.
+    """
+    source = "argument"
+    if profile is None:
+        profile = load_profile()
+        source = "defaults" if profile is None else profile_path()
+    if free is None:
+        free = free_memory()
+
+    f = features(A, n)
+    predicted: Dict[str, float] = {}
+    skipped: List[str] = []
+    for e, (per_unit, overhead) in _costs(profile).items():
+        if free is not None and memory_bytes(e, f) > _MEMORY_HEADROOM * free:
+            skipped.append(e)
+            continue
+        predicted[e] = overhead + per_unit * work(e, f)
+    if predicted:
+        engine = min(predicted, key=predicted.__getitem__)
+    else:
+        # Nothing fits: take the smallest working set and let the OS page
+        engine = min(skipped, key=lambda e: memory_bytes(e, f))
+    info = {
+        **f,
+        "source": source,
+        "free_mb": None if free is None else round(free / 2**20, 1),
+        "predicted_sec": {e: round(t, 6) for e, t in sorted(predicted.items(), key=lambda kv: kv[1])},
+        "skipped_memory": skipped,
+    }
+    return engine, info
+
+
+# --- Calibration run ---------------------------------------------------------
+
+def fit(samples: List[Tuple[float, float]]) -> Tuple[float, float]:
+    """
+    Least-squares (sec_per_unit, overhead_sec) for (work, wall) samples, with
+    both coefficients kept non-negative.
+    """
+    w = np.array([s[0] for s in samples], dtype=np.float64)
+    t = np.array([s[1] for s in samples], dtype=np.float64)
+    if w.size >= 2 and np.ptp(w) > 0:
+        per_unit, overhead = np.polyfit(w, t, 1)
+        if per_unit > 0 and overhead >= 0:
+            return float(per_unit), float(overhead)
+    # Through the origin
+    return float(max((w @ t) / (w @ w), 1e-15)), 0.0
+
+
+def calibrate(
+    Ns: List[int], Cs: List[float], engines: Optional[List[str]] = None,
+    repeat: int = 2, max_sec: float = 20.0, verbose: bool = True,
+) -> Dict[str, Any]:
+    """
+    Time `engines` (default: all available) on friables over the n × C grid and
+    return the fitted profile.  Once an engine takes longer than `max_sec` on a
+    cell it is not run on larger n.
+    """
+    from . import bench, cover
+    from .smooth import friables, lpf_sieve
+
+    runners = bench._engines()
+    engines = [e for e in (engines or available_engines()) if e in runners]
+    tiny = np.array([1, 2, 3, 5], dtype=np.int64)
+    cold: Dict[str, float] = {}
+    cover.shutdown_pool()
+    for e in engines:
+        t0 = time.perf_counter()
+        runners[e](tiny, 16)  # compile (and start mp's pool) outside the timed region
+        cold[e] = time.perf_counter() - t0
+
+    samples: Dict[str, List[Tuple[float, float]]] = {e: [] for e in engines}
+    records: List[Dict[str, Any]] = []
+    slow: set = set()
+    for n in sorted(Ns):
+        lpf = lpf_sieve(n)
+        for C in Cs:
+            A = friables(n, int((math.log(n)) ** C), lpf)
+            f = features(A, n)
+            for e in engines:
+                if e in slow:
+                    continue
+                best = float("inf")
+                for _ in range(repeat):
+                    t0 = time.perf_counter()
+                    runners[e](A, n)
+                    best = min(best, time.perf_counter() - t0)
+                u = work(e, f)
+                samples[e].append((u, best))
+                records.append({"engine": e, "n": n, "C": C, "A_size": f["A_size"], "work": u, "wall_sec": round(best, 6)})
+                if verbose:
+                    print(f"{e:>16} {n:>12,} {C:>5.2f} {f['A_size']:>10,} {best:>9.3f}s {best / u:>10.3g} s/unit")
+                if best > max_sec:
+                    slow.add(e)
+
+    fitted = {}
+    for e, s in samples.items():
+        if s:
+            per_unit, overhead = fit(s)
+            if e == "mp":
+                # the timed runs reuse a warm pool; charge the cold start
+                overhead = max(overhead, cold[e])
+            fitted[e] = {"sec_per_unit": per_unit, "overhead_sec": overhead, "samples": len(s)}
+    machine: Dict[str, Any] = {
+        "node": platform.node(), "cpus": os.cpu_count(), "python": platform.python_version(),
+        "numba": _NUMBA_AVAILABLE, "pyfftw": _PYFFTW_AVAILABLE,
+    }
+    if _NUMBA_AVAILABLE:
+        import numba as nb  # type: ignore
+
+        machine["numba_threads"] = nb.get_num_threads()
+    return {
+        "version": PROFILE_VERSION,
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "machine": machine,
+        "engines": fitted,
+        "records": records,
+    }
+
+
+def save_profile(profile: Dict[str, Any], path: Optional[str] = None) -> str:
+    """Atomically write `profile` to profile_path(path); returns the path."""
+    p = profile_path(path)
+    os.makedirs(os.path.dirname(p) or ".", exist_ok=True)
+    tmp = p + ".tmp"
+    with open(tmp, "w") as fh:
+        json.dump(profile, fh, indent=1)
+    os.replace(tmp, p)
+    return p
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="Calibrate the coverage engine selector for this machine.")
+    ap.add_argument("--n", default="1e5,5e5", help="Comma-separated n values (floats allowed, e.g. 1e7)")
+    ap.add_argument("--C", default="1.3,1.7,2.1", help="Comma-separated C values: y=(log n)^C")
+    ap.add_argument("--engines", default=None, help="Comma-separated engines (default: all available)")
+    ap.add_argument("--repeat", type=int, default=2, help="Timed repetitions per cell (best is kept)")
+    ap.add_argument("--max-sec", type=float, default=20.0, help="Stop timing an engine on larger n past this")
+    ap.add_argument("--out", default=None, help="Profile path (default: TC_CALIBRATION or ~/.tc/calibration.json)")
+    args = ap.parse_args()
+
+    print(f"{'engine':>16} {'n':>12} {'C':>5} {'|A|':>10} {'wall':>10} {'cost':>16}")
+    prof = calibrate(
+        [int(float(x)) for x in args.n.split(",")],
+        [float(x) for x in args.C.split(",")],
+        args.engines.split(",") if args.engines else None,
+        repeat=args.repeat,
+        max_sec=args.max_sec,
+    )
+    for e, c in prof["engines"].items():
+        print(f"[calibrate] {e:>16}: {c['sec_per_unit']:.3g} s/unit + {c['overhead_sec']:.3g} s")
+    print(f"[calibrate] wrote {save_profile(prof, args.out)}")
+
+
+__all__ = [
+    "ENGINES",
+    "profile_path",
+    "available_engines",
+    "estimate_pairs",
+    "features",
+    "work",
+    "memory_bytes",
+    "free_memory",
+    "load_profile",
+    "choose_engine",
+    "fit",
+    "calibrate",
+    "save_profile",
+]
+
+
+if __name__ == "__main__":
+    main()
@@ -2,10 +2,23 @@
 from __future__ import annotations
 
 from typing import List, Optional, Tuple
+import atexit
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+import functools
+import logging
+import math
 import os
 
 import numpy as np
-from bitarray import bitarray
+
+from .result import (
+    _HEADER_BYTES, CoverageResult, PathLike, create_coverage_file, open_coverage, save_coverage,
+)
+from .shm import ShmSpec, attach_array, pool_context, share_array
+from .telemetry import current, enabled, span
+
+_log = logging.getLogger("tc.cover")
 
 # --- Optional: Numba path ----------------------------------------------------
 # We prefer the Numba-accelerated implementation if available;
@@ -17,68 +30,208 @@ try:
 except Exception:
     _NUMBA_AVAILABLE = False
 
+# --- Optional: pyFFTW for the convolution engine -----------------------------
+# numpy.fft is always available; pyFFTW (multi-threaded FFTW) is used when installed.
+_PYFFTW_AVAILABLE = False
+try:
+    import pyfftw  # type: ignore
+    import pyfftw.interfaces.numpy_fft as _fftw  # type: ignore
+    pyfftw.interfaces.cache.enable()
+    _PYFFTW_AVAILABLE = True
+except Exception:
+    _PYFFTW_AVAILABLE = False
+
 # --- Multiprocessing fallback implementation (your original idea, cleaned) ----
-from multiprocessing import Pool, cpu_count
+from multiprocessing import cpu_count
+
 
+def pair_count(A: np.ndarray, n: int) -> int:
+    """Ordered pairs (a, b) from sorted A with a + b <= n, i.e. the pairs a kernel visits."""
+    return int(np.searchsorted(A, n - A, side="right").sum())
 
-def _cover_block(args: Tuple[np.ndarray, int, int, int]) -> np.ndarray:
+
+def _traced(engine: str):
     """
-    Worker: mark sums s = A[i] + A[j] <= n for i in [lo, hi).
-    Returns a uint8 vector 'hits' of length n+1.
+    Run a coverage engine inside a "coverage" telemetry span; |A|, pairs and
+    the uncovered count are only computed when telemetry is on.  An engine
+    called from inside another "coverage" span (coverage_bitset dispatching to
+    it) runs without one, so each call records a single span.
     """
-    A, n, lo, hi = args
-    m = A.size
-    hits = np.zeros(n + 1, dtype=np.uint8)
-    for i in range(lo, hi):
-        ai = A[i]
-        # j-loop early break relies on A being sorted ascending
-        for j in range(m):
-            s = ai + A[j]
-            if s > n:
-                break
-            hits[s] = 1
-    return hits
+    def deco(fn):
+        @functools.wraps(fn)
+        def wrapper(A_list, n, *args, **kwargs):
+            if not enabled() or getattr(current(), "name", None) == "coverage":
+                return fn(A_list, n, *args, **kwargs)
+            with span("coverage", engine=engine, n=n) as s:
+                B = fn(A_list, n, *args, **kwargs)
+                if s:
+                    A = np.sort(np.asarray(A_list, dtype=np.int64))
+                    R = B if isinstance(B, CoverageResult) else CoverageResult(B, max(n, 0))
+                    s.set(A_size=int(A.size), pairs=pair_count(A, n), uncovered=R.count_uncovered())
+            return B
+        return wrapper
+    return deco
+
+
+def _empty_result(n: int, out: Optional[PathLike] = None) -> CoverageResult:
+    """Coverage with nothing covered on [0, max(n, 0)]."""
+    n = max(n, 0)
+    if out is not None:
+        return create_coverage_file(out, n)
+    return CoverageResult(np.zeros(n + 1, dtype=np.uint8), n)
 
 
-def coverage_bitset_parallel(A_list: List[int], n: int, blocks: Optional[int] = None) -> bitarray:
+def _finish(hits: np.ndarray, n: int, out: Optional[PathLike]) -> CoverageResult:
+    """
+    Wrap a kernel's hit vector; with an output path, pack it into a
+    memory-mapped coverage file and return the mapped result instead.
+    """
+    result = CoverageResult(hits, n)
+    if out is None:
+        return result
+    return save_coverage(result, out)
+
+
+# Persistent pool: repeated probes reuse the worker processes instead of paying
+# for process startup on every call.  Workers attach to the packed A bitset, the shift
+# list and the output words by name; each task owns a disjoint range of output
+# words, so there are no per-worker result arrays and no final reduction.
+# A ProcessPoolExecutor rather than a Pool: a worker that dies (e.g. a spawned
+# one re-importing an unguarded script) breaks it with an error instead of
+# being respawned forever.
+_POOL: Optional[ProcessPoolExecutor] = None
+_POOL_SIZE = 0
+
+
+def _get_pool(processes: int) -> ProcessPoolExecutor:
+    """The shared worker pool, (re)created when a different size is requested."""
+    global _POOL, _POOL_SIZE
+    if _POOL is None or _POOL_SIZE != processes:
+        shutdown_pool()
+        _POOL = ProcessPoolExecutor(max_workers=processes, mp_context=pool_context())
+        _POOL_SIZE = processes
+    return _POOL
+
+
+def shutdown_pool() -> None:
+    """Stop the persistent coverage pool (also run at interpreter exit)."""
+    global _POOL, _POOL_SIZE
+    if _POOL is not None:
+        _POOL.shutdown(wait=True, cancel_futures=True)
+    _POOL, _POOL_SIZE = None, 0
+
+
+atexit.register(shutdown_pool)
+
+
+def _shift_or_range_numpy(src: np.ndarray, shifts: np.ndarray, out: np.ndarray, lo: int, hi: int) -> None:
+    """Pure-numpy counterpart of _shift_or_range: out[lo:hi] |= (src << a)[lo:hi]."""
+    for a in shifts.tolist():
+        w, s = a >> 6, a & 63
+        if w >= hi:
+            break
+        i0 = max(lo, w)
+        out[i0:hi] |= src[i0 - w : hi - w] << np.uint64(s)
+        i1 = max(lo, w + 1)
+        if s and i1 < hi:
+            out[i1:hi] |= src[i1 - w - 1 : hi - w - 1] >> np.uint64(_WORD_BITS - s)
+
+
+def _cover_words(args: Tuple[ShmSpec, ShmSpec, Tuple[str, str, int], int, int]) -> None:
+    """
+    Worker: shift-OR the words [lo, hi) of the output, attached by name, either a
+    shared memory block ("shm", name, W) or a packed coverage file ("file", path, W).
     """
-    Parallel coverage using multiprocessing.Pool.
-    Returns bitset B of length n+1 where B[k] == 1 iff k in (A + A) and 0 <= k <= n.
+    src_spec, shifts_spec, (kind, ref, W), lo, hi = args
+    src_shm, src = attach_array(src_spec)
+    shifts_shm, shifts = attach_array(shifts_spec)
+    if kind == "shm":
+        out_shm, out = attach_array((ref, (W,), "<u8"))
+    else:
+        out_shm = None
+        out = np.memmap(ref, dtype="<u8", mode="r+", offset=_HEADER_BYTES, shape=(W,))
+    try:
+        if _NUMBA_AVAILABLE:
+            _shift_or_range(src, shifts, out, lo, hi)
+        else:
+            _shift_or_range_numpy(src, shifts, out, lo, hi)
+        if out_shm is None:
+            out.flush()
+    finally:
+        del src, shifts, out  # release the buffers before closing the mappings
+        src_shm.close()
+        shifts_shm.close()
+        if out_shm is not None:
+            out_shm.close()
+
+
+@_traced("mp")
+def coverage_bitset_parallel(
+    A_list: List[int], n: int, blocks: Optional[int] = None, out: Optional[PathLike] = None
+) -> CoverageResult:
+    """
+    Parallel coverage using a persistent worker pool over shared memory.
+    Returns a packed CoverageResult B where B[k] is True iff k in (A + A) and 0 <= k <= n.
+    With `out`, workers write straight into that packed-bit file and the mapped
+    result is returned.  Peak memory in this process is about 3n/8 bytes (the
+    shared A bitset, the shared output and the returned copy of it); A is
+    packed without a byte mask and workers add no per-worker arrays.
     """
     if n < 1:
-        B = bitarray(1)
-        B.setall(False)
-        return B
-
-    # Ensure sorted array for early-break behavior and better locality
-    A = np.asarray(sorted(A_list), dtype=np.int32)
-    m = A.size
-    if m == 0:
-        B = bitarray(n + 1)
-        B.setall(False)
-        return B
+        return _empty_result(n, out)
+
+    # Sorted shifts: each worker stops at the first a past its word range
+    A = np.sort(np.asarray(A_list, dtype=np.int64))
+    A = A[(A >= 0) & (A <= n)]
+    if A.size == 0:
+        return _empty_result(n, out)
 
     if blocks is None:
         # Good default on mixed P/E-core mobile CPUs
         blocks = min(cpu_count(), 8)
 
-    # Evenly split the i-index across blocks
-    splits = np.linspace(0, m, blocks + 1, dtype=int)
-    tasks = [(A, n, int(splits[k]), int(splits[k + 1])) for k in range(blocks)]
-
-    # Pool-Map and OR-reduce the hit vectors
-    with Pool(processes=blocks) as p:
-        parts = p.map(_cover_block, tasks)
-
-    hits = np.bitwise_or.reduce(parts)
-
-    # Convert to bitarray
-    B = bitarray(n + 1)
-    B.setall(False)
-    idx = np.nonzero(hits)[0]
-    for k in idx:
-        B[k] = True
-    return B
+    W = _n_words(n)
+    src_shm, src_spec = share_array(_pack_bits(A, n))
+    shifts_shm, shifts_spec = share_array(A)
+    out_shm = None
+    if out is None:
+        out_shm, _ = share_array(shape=(W,), dtype="<u8")
+        target = ("shm", out_shm.name, W)
+    else:
+        create_coverage_file(out, n).flush()
+        target = ("file", os.fspath(out), W)
+    try:
+        # Later word ranges see more shifts, so oversplit for load balance
+        nchunks = max(1, min(blocks * 8, W // 1024))
+        splits = np.linspace(0, W, nchunks + 1, dtype=np.int64)
+        tasks = [
+            (src_spec, shifts_spec, target, int(splits[k]), int(splits[k + 1])) for k in range(nchunks)
+        ]
+        try:
+            list(_get_pool(blocks).map(_cover_words, tasks))
+        except BrokenProcessPool as e:
+            shutdown_pool()
+            raise RuntimeError(
+                "mp engine: a worker process died or failed to start; spawned workers "
+                "re-import __main__, so guard the script with `if __name__ == \"__main__\":`"
+            ) from e
+
+        if out_shm is not None:
+            words = np.ndarray((W,), dtype="<u8", buffer=out_shm.buf).astype(np.uint64)
+            _mask_tail(words, n)
+            return CoverageResult(words, n, "packed")
+        result = open_coverage(out, mode="r+")
+        _mask_tail(result.data, n)
+        result.flush()
+        return result
+    finally:
+        src_shm.close()
+        src_shm.unlink()
+        shifts_shm.close()
+        shifts_shm.unlink()
+        if out_shm is not None:
+            out_shm.close()
+            out_shm.unlink()
 
 
 # --- Numba-accelerated implementation (preferred path) -----------------------
@@ -98,6 +251,32 @@ if _NUMBA_AVAILABLE:
                 hi = mid
         return lo
 
+    @nb.njit(fastmath=True, cache=True)
+    def _lower_bound(A: np.ndarray, x: int) -> int:
+        """
+        Return the smallest index j such that A[j] >= x; len(A) if there is none.
+        """
+        lo, hi = 0, A.size
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if A[mid] < x:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    @nb.njit(fastmath=True, cache=True)
+    def _window_span(A: np.ndarray, i: int, L: int, R: int) -> Tuple[int, int]:
+        """
+        [j0, j1): the j >= i with L <= A[i] + A[j] < R, for sorted A.  The row
+        range every target-window kernel (segment, ymin, reps) walks.
+        """
+        a = A[i]
+        j0 = _lower_bound(A, L - a)
+        if j0 < i:
+            j0 = i
+        return j0, _upper_bound(A, R - 1 - a)
+
     @nb.njit(parallel=True, fastmath=True, cache=True)
     def _mark_pairs_twoptr(A: np.ndarray, n: int, hits: np.ndarray) -> None:
         """
@@ -148,95 +327,546 @@ if _NUMBA_AVAILABLE:
                 hits[s] = 1
 
 
-def coverage_bitset_njit(A_list: List[int], n: int, tiled: bool = False) -> bitarray:
+@_traced("njit")
+def coverage_bitset_njit(
+    A_list: List[int], n: int, tiled: bool = False, out: Optional[PathLike] = None
+) -> CoverageResult:
     """
     Single-process Numba coverage with two-pointer upper-bound pruning.
     Set tiled=True to use the tiled kernel for better cache locality.
+    With `out`, the coverage is written to that packed-bit file and returned memory-mapped.
     """
     if not _NUMBA_AVAILABLE:
         raise ImportError("Numba is not available; install numba or use coverage_bitset/coverage_bitset_parallel.")
     if n < 1:
-        B = bitarray(1)
-        B.setall(False)
-        return B
-    A = np.asarray(sorted(A_list), dtype=np.int32)
+        return _empty_result(n, out)
+    A = np.sort(np.asarray(A_list, dtype=np.int32))
     hits = np.zeros(n + 1, dtype=np.uint8)
     if tiled:
         _mark_pairs_twoptr_tiled(A, n, hits)
     else:
         _mark_pairs_twoptr(A, n, hits)
-    B = bitarray(n + 1)
-    B.setall(False)
-    idx = np.nonzero(hits)[0]
-    for k in idx:
-        B[k] = True
-    return B
+    return _finish(hits, n, out)
+
+
+# --- FFT / convolution engine -------------------------------------------------
+# A+A is the support of the self-convolution of the 0/1 indicator of A, so the
+# cost is O(L log L) with L ~ 2n, independent of |A|.  Each convolution value is
+# an integer pair count.  A floating-point FFT convolution of a 0/1 vector errs
+# by at most about c * eps * log2(L) * |A| in every entry (the FFT error bound,
+# e.g. Higham, Accuracy and Stability of Numerical Algorithms, sec. 24.1, with
+# ||1_A||_2^2 = |A|); _fft_error_bound takes c = _FFT_ERR_C, about 100x the
+# largest error measured up to n = 4e6.  While that bound is below
+# _FFT_MAX_ERR, rounding is exact and any value further than the bound from an
+# integer is re-checked exactly; past it the exact packed engine is used, so
+# the result matches the pair kernels bit for bit.
+_FFT_ERR_C = 16.0
+_FFT_MAX_ERR = 0.25
+
 
+def _fft_error_bound(L: int, A_size: int) -> float:
+    """Bound on |conv - exact| for the self-convolution of a 0/1 vector with A_size ones."""
+    return _FFT_ERR_C * float(np.finfo(np.float64).eps) * math.log2(max(L, 2)) * A_size
 
-def coverage_bitset(A_list: List[int], n: int) -> bitarray:
+
+def _next_fast_len(m: int) -> int:
+    """
+    Smallest 5-smooth integer >= m (FFT sizes with small prime factors are fastest).
+    """
+    if m <= 1:
+        return 1
+    best = 1 << (m - 1).bit_length()
+    p5 = 1
+    while p5 < best:
+        p35 = p5
+        while p35 < best:
+            # smallest power-of-two multiple of p35 that is >= m
+            q = -(-m // p35)
+            cand = p35 * (1 << (q - 1).bit_length())
+            if cand < best:
+                best = cand
+            p35 *= 3
+        p5 *= 5
+    return best
+
+
+def _self_convolve(x: np.ndarray) -> np.ndarray:
     """
-    Return bitset B of length n+1, where B[k] == 1 iff k ∈ (A + A) and 0 <= k <= n.
+    Circular self-convolution of a real vector via rFFT (pyFFTW if available).
+    """
+    L = x.size
+    if _PYFFTW_AVAILABLE:
+        threads = cpu_count()
+        X = _fftw.rfft(x, threads=threads)
+        X *= X
+        return _fftw.irfft(X, n=L, threads=threads)
+    X = np.fft.rfft(x)
+    X *= X
+    return np.fft.irfft(X, n=L)
+
+
+def _mark_pairs_fft(A: np.ndarray, n: int, hits: np.ndarray) -> None:
+    """
+    Mark sums s = A[i] + A[j] <= n by thresholding the self-convolution of 1_A.
+    A must be sorted non-decreasing; entries > n are ignored.
+    """
+    A = A[: np.searchsorted(A, n, side="right")]
+    if A.size == 0:
+        return
+    # L > 2*max(A) keeps wrap-around sums out of [0, n]
+    L = _next_fast_len(max(n + 1, 2 * int(A[-1]) + 1))
+    tol = _fft_error_bound(L, A.size)
+    if tol >= _FFT_MAX_ERR:
+        # rounding could go wrong: take the exact engine instead
+        hits[:] = CoverageResult(coverage_packed(A, n), n, "packed").covered_mask()
+        return
+    x = np.zeros(L, dtype=np.float64)
+    x[A] = 1.0
+    conv = _self_convolve(x)[: n + 1]
+    hits[conv > 0.5] = 1
+
+    # Rounding guard: exact re-check wherever the result is further from an
+    # integer than the error bound allows
+    suspect = np.flatnonzero(np.abs(conv - np.rint(conv)) > tol)
+    if suspect.size:
+        inA = x[: n + 1] > 0.5
+        for k in suspect:
+            sub = A[: np.searchsorted(A, k, side="right")]
+            hits[k] = 1 if np.any(inA[k - sub]) else 0
+
+
+@_traced("fft")
+def coverage_bitset_fft(A_list: List[int], n: int, out: Optional[PathLike] = None) -> CoverageResult:
+    """
+    Convolution-based coverage: B[k] == 1 iff k in (A + A), computed in O(n log n)
+    via a (py)FFTW/numpy real FFT, whatever the size of A.
+    With `out`, the coverage is written to that packed-bit file and returned memory-mapped.
+    """
+    if n < 1:
+        return _empty_result(n, out)
+    A = np.sort(np.asarray(A_list, dtype=np.int64))
+    hits = np.zeros(n + 1, dtype=np.uint8)
+    _mark_pairs_fft(A, n, hits)
+    return _finish(hits, n, out)
+
+
+# --- Packed-bit shift-OR engine ----------------------------------------------
+# Coverage is kept as little-endian uint64 words: bit k lives in word k >> 6 at
+# position k & 63.  For each a in A the A-bitset shifted left by a is OR-ed into
+# the result, i.e. 64 candidate sums per word operation and n/8 bytes of state.
+_WORD_BITS = 64
+
+
+def _n_words(n: int) -> int:
+    """Number of uint64 words needed for bits 0..n."""
+    return (n + _WORD_BITS) // _WORD_BITS
+
+
+def _pack_bits(A: np.ndarray, n: int) -> np.ndarray:
+    """
+    Pack the elements of A that are <= n into a uint64 word bitset over [0, n],
+    setting the bits in place: n/8 bytes plus O(|A|) temporaries, no byte mask.
+    """
+    words = np.zeros(_n_words(n), dtype=np.uint64)
+    A = np.asarray(A, dtype=np.int64)
+    A = A[(A >= 0) & (A <= n)]
+    np.bitwise_or.at(words, A >> 6, np.left_shift(np.uint64(1), (A & 63).astype(np.uint64)))
+    return words
+
+
+def _mask_tail(words: np.ndarray, n: int) -> None:
+    """Clear the bits above n in the last word."""
+    tail = (n + 1) % _WORD_BITS
+    if tail:
+        words[-1] &= np.uint64((1 << tail) - 1)
+
+
+def _shift_or_numpy(src: np.ndarray, shifts: np.ndarray, out: np.ndarray) -> None:
+    """
+    Pure-numpy fallback: out |= src << a for each a in shifts (bits past the end drop off).
+    """
+    W = out.size
+    for a in shifts.tolist():
+        w, s = a >> 6, a & 63
+        if w >= W:
+            break
+        out[w:] |= src[: W - w] << np.uint64(s)
+        if s and w + 1 < W:
+            out[w + 1 :] |= src[: W - w - 1] >> np.uint64(_WORD_BITS - s)
+
+
+if _NUMBA_AVAILABLE:
+    @nb.njit(fastmath=True, cache=True)
+    def _shift_or_range(src: np.ndarray, shifts: np.ndarray, out: np.ndarray, lo: int, hi: int) -> None:
+        """
+        out[lo:hi] |= (src << a)[lo:hi] for every a in shifts (shifts sorted ascending).
+        """
+        for t in range(shifts.size):
+            a = shifts[t]
+            w = a >> 6
+            if w >= hi:
+                break
+            s = np.uint64(a & 63)
+            i0 = lo if lo > w else w
+            if s == 0:
+                for i in range(i0, hi):
+                    out[i] |= src[i - w]
+            else:
+                r = np.uint64(64) - s
+                for i in range(i0, hi):
+                    j = i - w
+                    v = src[j] << s
+                    if j > 0:
+                        v |= src[j - 1] >> r
+                    out[i] |= v
+
+    @nb.njit(fastmath=True, cache=True)
+    def _shift_or_packed(src: np.ndarray, shifts: np.ndarray, out: np.ndarray) -> None:
+        """
+        Serial shift-OR over the whole word range.
+        """
+        _shift_or_range(src, shifts, out, 0, out.size)
+
+    @nb.njit(parallel=True, fastmath=True, cache=True)
+    def _shift_or_packed_parallel(src: np.ndarray, shifts: np.ndarray, out: np.ndarray, chunk: int = 4096) -> None:
+        """
+        Parallel shift-OR: threads own disjoint chunks of output words, so no two
+        threads ever write the same word and no reduction is needed.
+        """
+        W = out.size
+        nchunks = (W + chunk - 1) // chunk
+        for c in nb.prange(nchunks):
+            lo = c * chunk
+            hi = lo + chunk
+            if hi > W:
+                hi = W
+            _shift_or_range(src, shifts, out, lo, hi)
+
+
+@_traced("packed")
+def coverage_packed(
+    A_list: List[int], n: int, parallel: bool = False, buf: Optional[np.ndarray] = None
+) -> np.ndarray:
+    """
+    Packed-bit coverage: return uint64 words (little-endian bit order) where bit k
+    is set iff k in (A + A) and 0 <= k <= n.  Set parallel=True for the Numba
+    multi-threaded variant.  `buf` is an optional zeroed word buffer to fill
+    (e.g. a memory-mapped coverage file), so the result never exists twice.
+    """
+    n = max(n, 0)
+    A = np.sort(np.asarray(A_list, dtype=np.int64))
+    A = A[(A >= 0) & (A <= n)]
+    src = _pack_bits(A, n)
+    out = np.zeros_like(src) if buf is None else buf
+    if A.size:
+        if _NUMBA_AVAILABLE:
+            if parallel:
+                _shift_or_packed_parallel(src, A, out)
+            else:
+                _shift_or_packed(src, A, out)
+        else:
+            _shift_or_numpy(src, A, out)
+        _mask_tail(out, n)
+    return out
+
+
+# --- Incremental updates for growing A ----------------------------------------
+# When A_new ⊇ A_old, (A_new + A_new) = (A_old + A_old) ∪ (N + A_new) with
+# N = A_new \ A_old, so only sums that involve a new element need marking.
+if _NUMBA_AVAILABLE:
+    @nb.njit(parallel=True, fastmath=True, cache=True)
+    def _mark_cross(N: np.ndarray, A: np.ndarray, n: int, hits: np.ndarray) -> None:
+        """
+        Mark sums s = N[i] + A[j] <= n (A sorted non-decreasing).
+        """
+        for i in nb.prange(N.size):
+            x = N[i]
+            j_max = _upper_bound(A, n - x)
+            for j in range(j_max):
+                hits[x + A[j]] = 1
+
+
+def _mark_cross_numpy(N: np.ndarray, A: np.ndarray, n: int, hits: np.ndarray) -> None:
+    """Pure-numpy fallback for _mark_cross."""
+    for x in N.tolist():
+        j_max = int(np.searchsorted(A, n - x, side="right"))
+        hits[x + A[:j_max]] = 1
+
+
+def extend_coverage(
+    result: CoverageResult, A_old: List[int], A_new_elements: List[int], n: int
+) -> CoverageResult:
+    """
+    Update `result` (the coverage of A_old + A_old on [0, n]) in place so that it
+    covers A_new = A_old ∪ A_new_elements, marking only the new cross sums
+    (A_new_elements + A_old) and the new self-sums.  Cost is O(|added| · |A|)
+    instead of O(|A|²).  Returns `result` for convenience.
+    """
+    if result.n != n:
+        raise ValueError(f"coverage is for n={result.n}, not n={n}")
+    if n < 1:
+        return result
+    A_old_arr = np.asarray(A_old, dtype=np.int64)
+    N = np.setdiff1d(np.asarray(A_new_elements, dtype=np.int64), A_old_arr)
+    N = N[(N >= 0) & (N <= n)]
+    if N.size == 0:
+        return result
+    A = np.union1d(A_old_arr, N)
+    A = A[(A >= 0) & (A <= n)]
+
+    with span("extend_coverage", n=n, A_size=int(A.size), added=int(N.size)) as s:
+        if result.layout == "packed":
+            src = _pack_bits(A, n)
+            if _NUMBA_AVAILABLE:
+                _shift_or_packed(src, N, result.data)
+            else:
+                _shift_or_numpy(src, N, result.data)
+            _mask_tail(result.data, n)
+        elif _NUMBA_AVAILABLE:
+            _mark_cross(N, A, n, result.data)
+        else:
+            _mark_cross_numpy(N, A, n, result.data)
+        if s:
+            s.set(uncovered=result.count_uncovered())
+    return result
+
+
+
+# --- Targeted membership ------------------------------------------------------
+# k ∈ A + A iff A ∩ (k - A) is non-empty; only a <= k/2 needs checking.  Per
+# target we either walk those a and test k - a in the A-bitset (|A ∩ [0, k/2]|
+# lookups) or AND the A-bitset with the bitset of k - A, taken as a shifted
+# window of the reversed A-bitset (k/128 + 1 word operations), whichever is
+# cheaper.  Both stop at the smallest witness a.
+if _NUMBA_AVAILABLE:
+    @nb.njit(fastmath=True, cache=True)
+    def _first_witness(A: np.ndarray, bits: np.ndarray, rbits: np.ndarray, M: int, k: int) -> int:
+        """
+        Smallest a ∈ A with a <= k - a and k - a ∈ A, or -1.  bits is the A-bitset
+        over [0, M], rbits the reversed one (bit i set iff M - i ∈ A) with one
+        spare word, A sorted, 0 <= k <= M.
+        """
+        h = k // 2
+        na = _upper_bound(A, h)
+        nw = h // 64 + 1
+        one = np.uint64(1)
+        if na <= 2 * nw:
+            for i in range(na):
+                b = k - A[i]
+                if (bits[b >> 6] >> np.uint64(b & 63)) & one:
+                    return A[i]
+            return -1
+        # bit b of the window is bit M - k + b of rbits, i.e. k - b ∈ A
+        q = (M - k) >> 6
+        r = np.uint64((M - k) & 63)
+        tail = (h & 63) + 1
+        for w in range(nw):
+            y = rbits[w + q]
+            if r != 0:
+                y = (y >> r) | (rbits[w + q + 1] << (np.uint64(64) - r))
+            v = bits[w] & y
+            if w == nw - 1 and tail < 64:
+                v &= (one << np.uint64(tail)) - one
+            if v != 0:
+                t = 0
+                while ((v >> np.uint64(t)) & one) == 0:
+                    t += 1
+                return w * 64 + t
+        return -1
+
+    @nb.njit(parallel=True, fastmath=True, cache=True)
+    def _witness_targets(
+        A: np.ndarray, bits: np.ndarray, rbits: np.ndarray, M: int, targets: np.ndarray, out: np.ndarray
+    ) -> None:
+        """out[t] = smallest witness a for targets[t] (-1 if none); targets are independent."""
+        for t in nb.prange(targets.size):
+            k = targets[t]
+            out[t] = _first_witness(A, bits, rbits, M, k) if k >= 0 else -1
+
+
+def _witness_targets_numpy(A: np.ndarray, M: int, targets: np.ndarray, out: np.ndarray) -> None:
+    """Pure-numpy fallback: one vectorized k - A lookup per target."""
+    inA = np.zeros(M + 1, dtype=bool)
+    inA[A] = True
+    for t, k in enumerate(targets.tolist()):
+        if k < 0:
+            continue
+        sub = A[: np.searchsorted(A, k // 2, side="right")]
+        hit = np.flatnonzero(inA[k - sub])
+        if hit.size:
+            out[t] = sub[hit[0]]
+
+
+def covered_targets(A_list: List[int], targets) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Decide k ∈ (A + A) for each k in `targets` without computing the full coverage.
+
+    Returns (covered, witness): covered[t] is True iff targets[t] ∈ A + A, and
+    witness[t] = (a, b) with a + b = targets[t], a, b ∈ A and a <= b the smallest
+    such a, or (-1, -1) when targets[t] is not covered.  Targets may come in
+    any order and may repeat; each costs O(min(|A|, k/128)), in parallel over
+    targets when Numba is available.
+    """
+    T = np.asarray(targets, dtype=np.int64).ravel()
+    a = np.full(T.size, -1, dtype=np.int64)
+    M = int(T.max()) if T.size else -1
+    A = np.unique(np.asarray(A_list, dtype=np.int64))
+    A = A[(A >= 0) & (A <= M)]
+
+    with span("covered_targets", targets=int(T.size), A_size=int(A.size)) as s:
+        if A.size:
+            if _NUMBA_AVAILABLE:
+                bits = _pack_bits(A, M)
+                rbits = np.zeros(bits.size + 1, dtype=np.uint64)
+                rbits[:-1] = _pack_bits(M - A, M)
+                _witness_targets(A, bits, rbits, M, T, a)
+            else:
+                _witness_targets_numpy(A, M, T, a)
+        covered = a >= 0
+        witness = np.stack([a, np.where(covered, T - a, -1)], axis=1)
+        if s:
+            s.set(covered=int(np.count_nonzero(covered)))
+    return covered, witness
+
+# coverage_bitset engine names; the legacy TC_COVER_IMPL / TC_COVER_NUMBA_MODE
+# spellings map onto them.
+_IMPL_ALIASES = {"parallel": "mp", "numba_twoptr": "twoptr", "numba_twoptr_tiled": "tiled"}
+_NUMBA_MODES = {"numba_twoptr": "twoptr", "numba_twoptr_tiled": "tiled"}
+
+
+def _auto_engine(A: np.ndarray, n: int) -> str:
+    """Engine picked by tc.calibrate.choose_engine, logged for later audit."""
+    from .calibrate import choose_engine
+
+    with span("engine_choice", n=n) as s:
+        engine, info = choose_engine(A, n)
+        if s:
+            s.set(engine=engine, **info)
+    _log.info(
+        "coverage_bitset n=%d |A|=%d density=%.3g pairs~%d free=%sMB -> %s (coefficients: %s; predicted: %s; "
+        "skipped for memory: %s)",
+        n, info["A_size"], info["density"], info["pairs"], info["free_mb"], engine, info["source"],
+        info["predicted_sec"], info["skipped_memory"] or "none",
+    )
+    return engine
+
+
+@_traced("auto")
+def coverage_bitset(A_list: List[int], n: int, out: Optional[PathLike] = None) -> CoverageResult:
+    """
+    Return a CoverageResult B of length n+1, where B[k] is True iff k ∈ (A + A) and 0 <= k <= n.
+    The result wraps the kernel's buffer; call B.to_bitarray() where a bitarray is required.
 
     Strategy:
-      * Prefer a Numba-jitted loop with early-break (fastest).
+      * By default ("auto") the engine is picked per call from n, |A|, the density
+        |A|/n and the free memory, using the machine's calibration profile
+        (python -m tc.calibrate; see tc.calibrate).  The choice is logged on the
+        "tc.cover" logger and, with telemetry on, as an "engine_choice" span.
       * If Numba is unavailable or JIT errors at runtime, fall back to
         a well-parallelized multiprocessing implementation.
 
     Environment Override:
-      * Set env var TC_COVER_IMPL='parallel' to force the multiprocessing path.
-      * Set env var TC_COVER_IMPL='numba' to force the Numba path (if available).
+      * TC_COVER_IMPL='auto' (default) for the calibrated choice.
+      * TC_COVER_IMPL='pairs', 'twoptr' or 'tiled' for a Numba pair kernel
+        ('numba' is 'pairs', or the kernel named by TC_COVER_NUMBA_MODE).
+      * Set env var TC_COVER_IMPL='parallel' (or 'mp') to force the multiprocessing path
+        (spawned workers need the caller's `if __name__ == "__main__":` guard; see
+        tc.shm.pool_context).
+      * Set env var TC_COVER_IMPL='fft' to use the O(n log n) convolution engine.
+      * Set env var TC_COVER_IMPL='packed' (or 'packed_parallel') for the
+        word-parallel shift-OR engine on uint64 bitsets.
+      * Set env var TC_COVER_IMPL='segmented' to compute the coverage window by
+        window (tc.segment.coverage_segmented), with at most TC_SEGMENT_BUDGET
+        bytes (default 256 MiB) of working memory next to the packed result.
+      * Set env var TC_COVER_IMPL='sharded' for a checkpointed sharded job
+        (tc.shards) under the root TC_SHARD_DIR (default: .tc_shards), one job
+        directory per (n, A).
+
+    Output:
+      * With `out` (a file path), the coverage is stored as a memory-mapped packed-bit
+        file (see tc.result.open_coverage) and the mapped result is returned.
     """
     if n < 1:
-        B = bitarray(1)
-        B.setall(False)
-        return B
+        return _empty_result(n, out)
 
-    # Normalize and sort A for monotonic increases in the inner loop
-    A = np.asarray(sorted(A_list), dtype=np.int32)
+    # Normalize and sort A for monotonic increases in the inner loop; int64, so
+    # values past 2^31 (n >= 2^31) reach the packed, sharded and mp engines intact
+    A = np.sort(np.asarray(A_list, dtype=np.int64))
 
     # Empty A ⇒ no sums
     if A.size == 0:
-        B = bitarray(n + 1)
-        B.setall(False)
-        return B
+        return _empty_result(n, out)
 
     impl = os.environ.get("TC_COVER_IMPL", "").strip().lower()
+    mode = os.environ.get("TC_COVER_NUMBA_MODE", "").strip().lower()
+    if impl == "numba" or (not impl and mode):
+        impl = _NUMBA_MODES.get(mode, "pairs")
+    impl = _IMPL_ALIASES.get(impl, impl)
+    if impl in ("", "auto"):
+        impl = _auto_engine(A[: np.searchsorted(A, n, side="right")], n)
+    current().set(engine=impl)  # the "coverage" span records the engine that ran
 
-    # If user explicitly wants the parallel path
-    if impl == "parallel":
-        return coverage_bitset_parallel(A.tolist(), n)
+    # Checkpointed shards on disk (see tc.shards); a rerun resumes the same job
+    if impl == "sharded":
+        from .shards import coverage_sharded
+
+        return coverage_sharded(A, n, root=os.environ.get("TC_SHARD_DIR") or None, out=out)
+
+    # Window by window under a memory budget (see tc.segment)
+    if impl == "segmented":
+        from .segment import DEFAULT_MEM_BUDGET, coverage_segmented
+
+        budget = int(os.environ.get("TC_SEGMENT_BUDGET") or DEFAULT_MEM_BUDGET)
+        return coverage_segmented(A, n, mem_budget=budget, out=out)
 
-    # Try Numba first (unless explicitly disabled / unavailable)
-    if _NUMBA_AVAILABLE and impl != "parallel":
+    # If user explicitly wants the parallel path
+    if impl == "mp":
+        return coverage_bitset_parallel(A, n, out=out)
+
+    # Convolution engine: cost independent of |A|
+    if impl == "fft":
+        return coverage_bitset_fft(A, n, out=out)
+
+    # Word-parallel shift-OR on packed bitsets
+    if impl in ("packed", "packed_parallel"):
+        parallel = impl == "packed_parallel" and _NUMBA_AVAILABLE
+        if out is None:
+            return CoverageResult(coverage_packed(A, n, parallel=parallel), n)
+        # Shift-OR straight into the mapped file
+        mapped = create_coverage_file(out, n)
+        coverage_packed(A, n, parallel=parallel, buf=mapped.data)
+        mapped.flush()
+        return mapped
+
+    if impl not in ("pairs", "twoptr", "tiled"):
+        raise ValueError(f"unknown coverage engine: {impl!r}")
+
+    # Numba pair kernels (int32 A, their compiled signature, when the values fit)
+    if _NUMBA_AVAILABLE:
+        A_pairs = A.astype(np.int32) if A[-1] <= np.iinfo(np.int32).max else A
         hits = np.zeros(n + 1, dtype=np.uint8)
         try:
-            # Keep the original kernel for backward-compatibility.
-            # You can switch to the two-pointer kernel by setting:
-            #   os.environ["TC_COVER_IMPL"] = "numba_twoptr" or "numba_twoptr_tiled"
-            mode = os.environ.get("TC_COVER_NUMBA_MODE", "").strip().lower()
-            if mode == "numba_twoptr_tiled":
-                _mark_pairs_twoptr_tiled(A, n, hits)
-            elif mode == "numba_twoptr":
-                _mark_pairs_twoptr(A, n, hits)
+            if impl == "tiled":
+                _mark_pairs_twoptr_tiled(A_pairs, n, hits)
+            elif impl == "twoptr":
+                _mark_pairs_twoptr(A_pairs, n, hits)
             else:
-                _mark_pairs(A, n, hits)  # JIT on first call; cached afterwards
+                _mark_pairs(A_pairs, n, hits)  # JIT on first call; cached afterwards
 
-            B = bitarray(n + 1)
-            B.setall(False)
-            idx = np.nonzero(hits)[0]
-            for k in idx:
-                B[k] = True
-            return B
+            return _finish(hits, n, out)
         except Exception:
             # Any JIT/runtime failure: fall back to parallel implementation
             pass
 
     # Fallback: multiprocessing
-    return coverage_bitset_parallel(A.tolist(), n)
-
+    return coverage_bitset_parallel(A, n, out=out)
 
 __all__ = [
     "coverage_bitset",
     "coverage_bitset_parallel",
     "coverage_bitset_njit",
+    "coverage_bitset_fft",
+    "coverage_packed",
+    "extend_coverage",
+    "covered_targets",
 ]
@@ -1,16 +1,190 @@
 from __future__ import annotations
-from collections import defaultdict
-from typing import Dict, List
+import math
+from typing import Dict, List, Optional, Tuple, Union
+
+import numpy as np
 from bitarray import bitarray
 
+from .result import CoverageResult, PathLike, _word_popcounts, longest_run_sorted, open_coverage
+from .telemetry import span
+
+CoverageLike = Union[CoverageResult, bitarray, PathLike]
+
+_WORD_MASK = (1 << 64) - 1
+_BIN_CHUNK = 1 << 22  # packed words scanned per step by uncovered_bins (32 MiB)
 
-def uncovered_indices(B: bitarray, start: int = 2) -> list[int]:
+
+def as_coverage_result(B: CoverageLike) -> CoverageResult:
+    """
+    Accept a CoverageResult, a legacy bitarray, or the path of a packed coverage
+    file (memory-mapped read-only, no copy).
     """
-    Indices k (start..len(B)-1) for which B[k] == 0.
+    if isinstance(B, CoverageResult):
+        return B
+    if isinstance(B, bitarray):
+        return CoverageResult.from_bitarray(B)
+    return open_coverage(B)
+
+
+def uncovered_indices(B: CoverageLike, start: int = 2) -> np.ndarray:
+    """
+    Sorted int64 array of indices k (start..len(B)-1) for which B[k] == 0.
     By default we ignore 1 since A+A with A⊂Z_{>0} can't hit 1 unless 0 in A.
+
+    Changed from a list[int] to an ndarray: test emptiness with .size or
+    len(), not truthiness, and call .tolist() where a list is needed.
+    """
+    with span("uncovered", start=start) as s:
+        unc = as_coverage_result(B).uncovered(start)
+        if s:
+            s.set(uncovered=int(unc.size))
+    return unc
+
+
+def count_uncovered(B: CoverageLike, start: int = 2) -> int:
+    """
+    Number of k in [start, len(B)-1] with B[k] == 0 (popcount on packed/mapped coverage).
+    """
+    return as_coverage_result(B).count_uncovered(start)
+
+
+def _last_set_bit(words: np.ndarray) -> np.ndarray:
+    bits = np.unpackbits(words.astype("<u8").view(np.uint8), bitorder="little").reshape(-1, 64)
+    return 63 - np.argmax(bits[:, ::-1], axis=1)
+
+
+def _first_set_bit(words: np.ndarray) -> np.ndarray:
+    bits = np.unpackbits(words.astype("<u8").view(np.uint8), bitorder="little").reshape(-1, 64)
+    return np.argmax(bits, axis=1)
+
+
+def uncovered_bins(
+    B: CoverageLike, bins: int = 1500, start: int = 2, uncovered: Optional[np.ndarray] = None,
+    chunk: int = _BIN_CHUNK,
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Exact per-bin aggregates of the uncovered k in [start, n], for plotting at
+    any n without sampling.  Returns (edges, counts, first, last): bin i holds
+    k in [edges[i], edges[i+1]), counts[i] of them uncovered, the smallest and
+    largest being first[i] and last[i] (-1 for a bin with none).
+
+    At most `bins` bins; inner edges fall on 64-bit word boundaries, so the
+    counts are word popcounts of the packed coverage (a byte-layout result is
+    packed first) taken `chunk` words at a time, and the cost is O(n / 64).
+    A caller that already holds the sorted uncovered k in [start, n]
+    (B.uncovered(start)) passes them as `uncovered`; the same aggregates are
+    then read off them by binary search at the same edges, without rescanning
+    the coverage.
     """
-    start = max(1, start)
-    return [k for k in range(start, len(B)) if not B[k]]
+    R = as_coverage_result(B)
+    start, stop = max(1, start), R.n + 1
+    if start >= stop:
+        empty = np.zeros(0, dtype=np.int64)
+        return np.array([stop], dtype=np.int64), empty, empty.copy(), empty.copy()
+    with span("uncovered_bins", n=R.n, bins=bins, start=start) as s:
+        w0, w1 = start >> 6, (stop + 63) >> 6
+        m = max(1, min(bins, w1 - w0))
+        wedges = w0 + (np.arange(m + 1, dtype=np.int64) * (w1 - w0)) // m
+        edges = wedges * 64
+        edges[0], edges[-1] = start, stop
+        counts = np.zeros(m, dtype=np.int64)
+        first = np.full(m, -1, dtype=np.int64)
+        last = np.full(m, -1, dtype=np.int64)
+
+        if uncovered is not None:
+            unc = np.asarray(uncovered, dtype=np.int64)
+            cut = np.searchsorted(unc, edges)
+            counts[:] = np.diff(cut)
+            hit = counts > 0
+            first[hit] = unc[cut[:-1][hit]]
+            last[hit] = unc[cut[1:][hit] - 1]
+            if s:
+                s.set(bins=m, uncovered=int(counts.sum()))
+            return edges, counts, first, last
+
+        words = R.to_packed()
+        i = 0
+        while i < m:
+            # bins i..j-1, spanning at most `chunk` words (or one wider bin)
+            j = max(i + 1, int(np.searchsorted(wedges, wedges[i] + chunk, side="right")) - 1)
+            lo, hi = int(wedges[i]), int(wedges[j])
+            unc = ~words[lo:hi].astype("<u8", copy=False)
+            if lo == w0:
+                unc[0] &= np.uint64(_WORD_MASK ^ ((1 << (start - w0 * 64)) - 1))
+            if hi == w1:
+                unc[-1] &= np.uint64(_WORD_MASK >> (w1 * 64 - stop))
+            c = _word_popcounts(unc)
+            local = wedges[i:j] - lo
+            counts[i:j] = np.add.reduceat(c, local)
+            pos = np.flatnonzero(c)
+            if pos.size:
+                b = np.searchsorted(local, pos, side="right") - 1
+                head = np.flatnonzero(np.r_[True, b[1:] != b[:-1]])
+                tail = np.r_[head[1:] - 1, pos.size - 1]
+                fw, lw = pos[head], pos[tail]
+                first[i + b[head]] = (lo + fw) * 64 + _first_set_bit(unc[fw])
+                last[i + b[head]] = (lo + lw) * 64 + _last_set_bit(unc[lw])
+            i = j
+        if s:
+            s.set(bins=m, uncovered=int(counts.sum()))
+    return edges, counts, first, last
+
+
+# Largest modulus histogrammed in one bincount pass of residue_counts
+_RESIDUE_MAX_MODULUS = 1 << 18
+
+
+def _residue_moduli(qmax: int, cap: int = _RESIDUE_MAX_MODULUS) -> List[int]:
+    """
+    Group q = 2..qmax into moduli M <= cap such that every q divides some M
+    (greedy, largest q first; each q joins the group whose lcm grows least).
+    """
+    groups: List[int] = []
+    for q in range(qmax, 1, -1):
+        if any(M % q == 0 for M in groups):
+            continue
+        best = -1
+        for g, M in enumerate(groups):
+            L = M * q // math.gcd(M, q)
+            if L <= cap and (best < 0 or L < groups[best] * q // math.gcd(groups[best], q)):
+                best = g
+        if best < 0:
+            groups.append(q)
+        else:
+            groups[best] = groups[best] * q // math.gcd(groups[best], q)
+    return groups
+
+
+def residue_counts(values, qmax: int = 64) -> np.ndarray:
+    """
+    Dense residue histograms of integers: an int64 array R of shape
+    (qmax + 1, qmax) with R[q, r] = #{v : v % q == r} for 2 <= q <= qmax (rows
+    0 and 1 are zero).  Mixed-radix trick: v % M is histogrammed once per
+    modulus M from _residue_moduli and folded to every q dividing M, so a
+    handful of bincount passes replaces one pass per q.
+    """
+    qmax = max(qmax, 1)
+    R = np.zeros((qmax + 1, qmax), dtype=np.int64)
+    v = np.asarray(values, dtype=np.int64)
+    if v.size == 0 or qmax < 2:
+        return R
+    with span("residue_counts", values=int(v.size), qmax=qmax):
+        for M in _residue_moduli(qmax):
+            h = np.bincount(v % M, minlength=M)
+            for q in range(2, qmax + 1):
+                if M % q == 0 and not R[q].any():
+                    R[q, :q] = h.reshape(M // q, q).sum(axis=0)
+    return R
+
+
+def residue_dicts(R: np.ndarray) -> Dict[int, Dict[int, int]]:
+    """Adapter: residue_counts array -> {q: {r: count}} with only the residues that occur."""
+    out: Dict[int, Dict[int, int]] = {}
+    for q in range(2, R.shape[0]):
+        row = R[q, :q]
+        nz = np.flatnonzero(row)
+        out[q] = dict(zip(nz.tolist(), row[nz].tolist()))
+    return out
 
 
 def residue_hist(uncovered: List[int], qmax: int = 64) -> Dict[int, Dict[int, int]]:
@@ -18,28 +192,11 @@ def residue_hist(uncovered: List[int], qmax: int = 64) -> Dict[int, Dict[int, in
     Count uncovered residues up to small moduli.
     Returns {q: {a: count}} for 2 <= q <= qmax.
     """
-    out: Dict[int, Dict[int, int]] = {}
-    for q in range(2, qmax + 1):
-        d: Dict[int, int] = defaultdict(int)
-        for k in uncovered:
-            d[k % q] += 1
-        out[q] = dict(d)
-    return out
+    return residue_dicts(residue_counts(uncovered, qmax))
 
 
 def longest_uncovered_run(uncovered: List[int]) -> int:
     """
     Length of the longest consecutive run in the sorted uncovered list.
     """
-    if not uncovered:
-        return 0
-    longest = 1
-    curr = 1
-    for i in range(1, len(uncovered)):
-        if uncovered[i] == uncovered[i - 1] + 1:
-            curr += 1
-            if curr > longest:
-                longest = curr
-        else:
-            curr = 1
-    return longest
+    return longest_run_sorted(np.asarray(uncovered, dtype=np.int64))
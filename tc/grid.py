@@ -0,0 +1,245 @@
+# tc/grid.py
+"""
+Process-pool executor for (n, C) grids with resumable CSV output.
+
+The parent sieves largest prime factors once up to max n and publishes the table
+in multiprocessing.shared_memory; workers attach to it (no pickling, no copy)
+and read primes and friables for any n <= max n straight off lpf[:n+1].  One
+task is one n (its C values share a single first-cover map), scheduled largest
+n first so the longest task never starts last.
+
+Each finished row is appended to the CSV with a single O_APPEND write and an
+fsync, so a crash loses at most the rows in flight; a restart skips the rows
+already in the file and drops a torn trailing line (resume=False overwrites
+it instead).  Once every point is in, the file is rewritten sorted by (n, C).
+
+Environment:
+  TC_THREADS    total thread budget shared by all workers (default: cpu count)
+"""
+from __future__ import annotations
+
+import csv
+import math
+import os
+import time
+from multiprocessing import cpu_count, shared_memory
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+import numpy as np
+
+from .cover import _NUMBA_AVAILABLE
+from .shm import ShmSpec, attach_array, pool_context, share_array
+from .telemetry import span
+
+if _NUMBA_AVAILABLE:
+    import numba as nb  # type: ignore
+
+GRID_FIELDS = ["n", "C", "y", "A_size", "uncovered", "time_sec"]
+
+
+def thread_budget(threads: Optional[int] = None) -> int:
+    """Total threads for a run: `threads`, else TC_THREADS, else the cpu count."""
+    if threads is None:
+        threads = int(os.environ.get("TC_THREADS", "0") or 0) or cpu_count()
+    return max(1, threads)
+
+
+# --- Resumable CSV -----------------------------------------------------------
+
+def _check_header(path: str, fields: List[str]) -> None:
+    """Refuse to resume a CSV written with different columns."""
+    with open(path, newline="") as f:
+        header = next(csv.reader(f), None)
+    if header is not None and header != fields:
+        raise ValueError(f"{path!r} has columns {header}, expected {fields}; pass resume=False (run_grid --fresh) to overwrite")
+
+
+def sort_rows(path: str, fields: List[str] = GRID_FIELDS) -> None:
+    """Rewrite the CSV at `path` with its rows sorted by (n, C) (atomic replace)."""
+    with open(path, newline="") as f:
+        rows = list(csv.DictReader(f))
+    rows.sort(key=lambda r: (int(r["n"]), float(r["C"])))
+    tmp = f"{path}.tmp.{os.getpid()}"
+    with open(tmp, "w", newline="") as f:
+        w = csv.DictWriter(f, fieldnames=fields)
+        w.writeheader()
+        w.writerows(rows)
+    os.replace(tmp, path)
+
+
+def completed_points(path: str) -> Set[Tuple[int, float]]:
+    """
+    (n, C) keys already in the CSV at `path`.  A trailing line without a newline
+    (torn by a crash mid-write) is truncated away first.
+    """
+    if not os.path.exists(path):
+        return set()
+    with open(path, "rb+") as f:
+        data = f.read()
+        if data and not data.endswith(b"\n"):
+            f.truncate(data.rfind(b"\n") + 1)
+    done: Set[Tuple[int, float]] = set()
+    with open(path, newline="") as f:
+        for row in csv.DictReader(f):
+            try:
+                done.add((int(row["n"]), float(row["C"])))
+            except (KeyError, TypeError, ValueError):
+                continue
+    return done
+
+
+class RowAppender:
+    """CSV appender that writes each row with one O_APPEND write followed by fsync."""
+
+    def __init__(self, path: str, fields: List[str]) -> None:
+        self.fields = fields
+        self.fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        if os.fstat(self.fd).st_size == 0:
+            self._write(dict(zip(fields, fields)))
+
+    def _write(self, row: Dict[str, Any]) -> None:
+        line = ",".join(str(row[k]) for k in self.fields) + "\n"
+        os.write(self.fd, line.encode())
+        os.fsync(self.fd)
+
+    def append(self, row: Dict[str, Any]) -> None:
+        self._write(row)
+
+    def close(self) -> None:
+        os.close(self.fd)
+
+    def __enter__(self) -> "RowAppender":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+# --- Workers -----------------------------------------------------------------
+
+_LPF: Optional[np.ndarray] = None
+_LPF_SHM: Optional[shared_memory.SharedMemory] = None
+
+
+def _init_worker(spec: ShmSpec, threads: int) -> None:
+    """Attach to the shared sieve and cap this worker's Numba threads."""
+    global _LPF, _LPF_SHM
+    _LPF_SHM, _LPF = attach_array(spec)
+    if _NUMBA_AVAILABLE:
+        nb.set_num_threads(max(1, min(threads, nb.config.NUMBA_NUM_THREADS)))
+
+
+def grid_rows(
+    n: int, Cs: Iterable[float], Y: int, start: int = 2, include_zero: bool = False,
+    lpf: Optional[np.ndarray] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Rows for the points (n, C), C in Cs, off one first-cover map over the friables
+    at Y (>= every probed y; loaded from the on-disk cache when present).
+    time_sec is the point's wall time: its scan plus an equal share of building
+    the map (friables and coverage).
+    """
+    from .cache import cached_first_cover, default_cache
+    from .ymin import uncovered_count_at
+
+    Cs = list(Cs)
+    with span("first_cover", n=n, Y=Y):
+        t0 = time.time()
+        P, ymin = cached_first_cover(n, Y, include_zero, cache=default_cache(), lpf=lpf)
+        share = (time.time() - t0) / max(1, len(Cs))
+    rows = []
+    for C in Cs:
+        with span("grid_point", n=n, C=C) as s:
+            t1 = time.time()
+            y = int((math.log(n)) ** C)
+            row = {
+                "n": n,
+                "C": C,
+                "y": y,
+                "A_size": int(np.count_nonzero(P <= y)),
+                "uncovered": uncovered_count_at(ymin, y, start=start),
+            }
+            row["time_sec"] = round(share + time.time() - t1, 3)
+            if s:
+                s.set(y=y, A_size=row["A_size"], uncovered=row["uncovered"])
+        rows.append(row)
+    return rows
+
+
+def _grid_task(args: Tuple[int, List[float], int, int, bool]) -> List[Dict[str, Any]]:
+    n, Cs, Y, start, include_zero = args
+    assert _LPF is not None
+    return grid_rows(n, Cs, Y, start, include_zero, lpf=_LPF[: n + 1])
+
+
+# --- Driver ------------------------------------------------------------------
+
+def run_grid(
+    Ns: List[int],
+    Cs: List[float],
+    out: str,
+    start: int = 2,
+    include_zero: bool = False,
+    workers: Optional[int] = None,
+    threads: Optional[int] = None,
+    on_row=None,
+    resume: bool = True,
+) -> int:
+    """
+    Evaluate the (n, C) grid into `out`, appending rows as they finish, then
+    sort the file by (n, C).  With `resume` (the default) only points not yet
+    in an existing `out` are evaluated; resume=False overwrites it.
+    `workers` processes split a `threads` budget (see thread_budget) evenly.
+    Calls on_row(row) per appended row; returns the number of rows appended.
+    """
+    from .smooth import lpf_sieve
+
+    if resume and os.path.exists(out):
+        _check_header(out, GRID_FIELDS)
+    elif os.path.exists(out):
+        os.remove(out)
+    done = completed_points(out)
+    tasks = []
+    for n in Ns:
+        pending = [C for C in Cs if (n, float(C)) not in done]
+        if pending:
+            # Y spans the full C range so the cached map is shared with earlier runs
+            Y = max(int((math.log(n)) ** C) for C in Cs)
+            tasks.append((n, pending, Y, start, include_zero))
+    if not tasks:
+        if os.path.exists(out):
+            sort_rows(out)
+        return 0
+    # Largest first: cost grows with n and with |A_Y|
+    tasks.sort(key=lambda t: (t[0], t[2]), reverse=True)
+
+    budget = thread_budget(threads)
+    workers = max(1, min(workers or budget, len(tasks), budget))
+    shm, spec = share_array(lpf_sieve(max(t[0] for t in tasks)))
+    written = 0
+    try:
+        with RowAppender(out, GRID_FIELDS) as app, pool_context().Pool(
+            processes=workers, initializer=_init_worker, initargs=(spec, budget // workers)
+        ) as pool:
+            for rows in pool.imap_unordered(_grid_task, tasks):
+                for row in rows:
+                    app.append(row)
+                    written += 1
+                    if on_row is not None:
+                        on_row(row)
+    finally:
+        shm.close()
+        shm.unlink()
+    sort_rows(out)
+    return written
+
+
+__all__ = [
+    "GRID_FIELDS",
+    "thread_budget",
+    "completed_points",
+    "sort_rows",
+    "RowAppender",
+    "grid_rows",
+    "run_grid",
+]
@@ -0,0 +1,298 @@
+# tc/pipeline.py
+"""
+Incremental in-process DAG runner for artifact builds (scripts/make_all).
+
+A Step names a module whose main(argv) builds some artifacts, the files it
+reads, the files it writes (glob patterns allowed) and the steps it depends on.
+Before a step runs, its fingerprint is taken over
+
+  * the module and argv (the step's parameters),
+  * the source of tc/ and of the step's module (the code hash),
+  * the contents of its input files (upstream artifacts),
+
+and the step is skipped when the state file records the same fingerprint and
+every recorded output still exists with the recorded contents.  A step marked
+`always` (one that appends to its outputs, say) runs on every build.
+
+Steps run in-process, so imports and loaded kernels are paid once.  With a
+core budget above one, independent steps run concurrently in a pool of worker
+processes; each step declares how many cores it uses and the scheduler keeps
+the running total within the budget.  The runner imports every step's module
+before the pool starts, so forked workers (see tc.shm.pool_context) inherit
+the imports and only load the Numba kernels from the on-disk cache the warmup
+step filled.  Where workers are spawned instead (no fork on the platform, or
+this process already ran a parallel kernel) each worker re-imports numpy,
+Numba and tc, about a second per worker; the core budget is then better spent
+as threads with --cores 1.  Steps start in declaration order as their
+dependencies finish, so each step's own output is the same as a sequential
+run's.
+"""
+from __future__ import annotations
+
+import glob
+import hashlib
+import json
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from importlib import import_module
+from importlib.util import find_spec
+from typing import Any, Dict, List, Optional, Sequence
+
+from .shm import pool_context
+
+DEFAULT_STATE = ".tc_pipeline.json"
+_CHUNK = 1 << 20
+
+
+class Step:
+    """One build step: `module`.main(argv) reads `inputs` and writes `outputs`."""
+
+    __slots__ = ("name", "module", "argv", "inputs", "outputs", "deps", "cores", "always")
+
+    def __init__(
+        self,
+        name: str,
+        module: str,
+        argv: Sequence[str] = (),
+        inputs: Sequence[str] = (),
+        outputs: Sequence[str] = (),
+        deps: Sequence[str] = (),
+        cores: int = 1,
+        always: bool = False,
+    ) -> None:
+        self.name = name
+        self.module = module
+        self.argv = [str(a) for a in argv]
+        self.inputs = list(inputs)
+        self.outputs = list(outputs)
+        self.deps = list(deps)
+        self.cores = max(1, cores)
+        self.always = always
+
+    def command(self) -> str:
+        return " ".join(["python", "-m", self.module] + self.argv)
+
+    def __repr__(self) -> str:
+        return f"Step({self.name!r}, {self.command()!r})"
+
+
+# --- Fingerprints --------------------------------------------------------------
+
+def file_digest(path: str) -> str:
+    """SHA-256 of a file's contents."""
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(_CHUNK), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def _module_file(module: str) -> Optional[str]:
+    spec = find_spec(module)
+    return spec.origin if spec is not None and spec.origin and spec.origin.endswith(".py") else None
+
+
+def code_hash(module: str) -> str:
+    """Hash of the source of the tc package plus `module`'s own file."""
+    tc_dir = os.path.dirname(os.path.abspath(__file__))
+    files = sorted(glob.glob(os.path.join(tc_dir, "*.py")))
+    own = _module_file(module)
+    if own is not None and os.path.abspath(own) not in files:
+        files.append(os.path.abspath(own))
+    h = hashlib.sha256()
+    for path in files:
+        h.update(os.path.basename(path).encode())
+        h.update(file_digest(path).encode())
+    return h.hexdigest()
+
+
+def fingerprint(step: Step) -> str:
+    """Fingerprint of the step's parameters, code and input contents."""
+    inputs = {p: file_digest(p) if os.path.exists(p) else None for p in step.inputs}
+    blob = json.dumps(
+        {"module": step.module, "argv": step.argv, "code": code_hash(step.module), "inputs": inputs},
+        sort_keys=True,
+    )
+    return hashlib.sha256(blob.encode()).hexdigest()
+
+
+def _outputs(step: Step) -> Dict[str, str]:
+    """Digest of every existing file matching the step's output patterns."""
+    found: Dict[str, str] = {}
+    for pattern in step.outputs:
+        for path in sorted(glob.glob(pattern)):
+            found[path] = file_digest(path)
+    return found
+
+
+def _current(step: Step, fp: str, record: Optional[Dict[str, Any]]) -> bool:
+    """True if `record` is for fingerprint fp and every output is still as recorded."""
+    if record is None or record.get("fingerprint") != fp:
+        return False
+    outputs = record.get("outputs", {})
+    if step.outputs and not outputs:
+        return False
+    for path, digest in outputs.items():
+        if not os.path.exists(path) or file_digest(path) != digest:
+            return False
+    return True
+
+
+# --- State ----------------------------------------------------------------------
+
+def load_state(path: str = DEFAULT_STATE) -> Dict[str, Any]:
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return {}
+
+
+def _save_state(state: Dict[str, Any], path: str) -> None:
+    tmp = f"{path}.tmp"
+    with open(tmp, "w") as f:
+        json.dump(state, f, indent=1, sort_keys=True)
+    os.replace(tmp, path)
+
+
+# --- Execution --------------------------------------------------------------------
+
+def run_step(module: str, argv: List[str], cores: int = 1) -> None:
+    """
+    Run `module`.main(argv) in this process with a `cores` thread budget
+    (TC_THREADS and the Numba thread count), restored afterwards so later steps
+    and the caller keep their own.  A non-zero SystemExit becomes a
+    RuntimeError so a failed step cannot end the runner's process.
+    """
+    from .cover import _NUMBA_AVAILABLE
+
+    prev_env = os.environ.get("TC_THREADS")
+    prev_threads = None
+    os.environ["TC_THREADS"] = str(cores)
+    try:
+        if _NUMBA_AVAILABLE:
+            import numba as nb  # type: ignore
+
+            prev_threads = nb.get_num_threads()
+            nb.set_num_threads(max(1, min(cores, nb.config.NUMBA_NUM_THREADS)))
+        import_module(module).main(argv)
+    except SystemExit as e:
+        if e.code not in (None, 0):
+            raise RuntimeError(f"{module} exited with status {e.code}") from None
+    finally:
+        if prev_env is None:
+            os.environ.pop("TC_THREADS", None)
+        else:
+            os.environ["TC_THREADS"] = prev_env
+        if prev_threads is not None:
+            nb.set_num_threads(prev_threads)
+
+
+def _check(steps: List[Step]) -> None:
+    names = [s.name for s in steps]
+    if len(set(names)) != len(names):
+        raise ValueError("duplicate step names")
+    seen = set()
+    for s in steps:
+        for d in s.deps:
+            if d not in seen:
+                raise ValueError(f"step {s.name!r} depends on {d!r}, which is not declared before it")
+        seen.add(s.name)
+
+
+def run_pipeline(
+    steps: List[Step],
+    cores: int = 1,
+    state_path: str = DEFAULT_STATE,
+    force: bool = False,
+    verbose: bool = True,
+) -> Dict[str, str]:
+    """
+    Build every step whose outputs are not current, within a `cores` budget;
+    returns {step name: "ran" | "skipped"}.  Steps must be listed after their
+    dependencies.  Raises RuntimeError naming the first failed step; steps
+    already finished keep their records, so a rerun resumes after the fix.
+    """
+    _check(steps)
+    cores = max(1, cores)
+    state = load_state(state_path)
+    status: Dict[str, str] = {}
+    pending = list(steps)
+    running: Dict[Future, tuple] = {}
+    pool: Optional[ProcessPoolExecutor] = None
+    in_use = 0
+
+    def finish(step: Step, fp: str, t0: float) -> None:
+        state[step.name] = {
+            "fingerprint": fp,
+            "outputs": _outputs(step),
+            "built": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "time_sec": round(time.time() - t0, 3),
+        }
+        _save_state(state, state_path)
+        status[step.name] = "ran"
+
+    try:
+        while pending or running:
+            launched = False
+            for step in list(pending):
+                if any(status.get(d) is None for d in step.deps):
+                    continue  # dependency still pending or running
+                fp = fingerprint(step)
+                if not force and not step.always and _current(step, fp, state.get(step.name)):
+                    pending.remove(step)
+                    status[step.name] = "skipped"
+                    if verbose:
+                        print(f"\n[skip] {step.name}: up to date ({step.command()})", flush=True)
+                    launched = True
+                    continue
+                need = min(step.cores, cores)
+                if running and in_use + need > cores:
+                    continue
+                pending.remove(step)
+                if verbose:
+                    print("\n>> " + step.command(), flush=True)
+                t0 = time.time()
+                if cores == 1:
+                    try:
+                        run_step(step.module, step.argv, need)
+                    except Exception as e:
+                        raise RuntimeError(f"step {step.name!r} failed: {e}") from e
+                    finish(step, fp, t0)
+                else:
+                    if pool is None:
+                        for s in steps:
+                            import_module(s.module)  # inherited by forked workers
+                        pool = ProcessPoolExecutor(max_workers=cores, mp_context=pool_context())
+                    running[pool.submit(run_step, step.module, step.argv, need)] = (step, fp, t0, need)
+                    in_use += need
+                launched = True
+            if running and not launched:
+                done, _ = wait(list(running), return_when=FIRST_COMPLETED)
+                for fut in done:
+                    step, fp, t0, need = running.pop(fut)
+                    in_use -= need
+                    try:
+                        fut.result()
+                    except Exception as e:
+                        raise RuntimeError(f"step {step.name!r} failed: {e}") from e
+                    finish(step, fp, t0)
+            elif not running and not launched and pending:
+                raise RuntimeError(f"steps cannot run: {[s.name for s in pending]}")
+    finally:
+        if pool is not None:
+            pool.shutdown(wait=True, cancel_futures=True)
+    return status
+
+
+__all__ = [
+    "DEFAULT_STATE",
+    "Step",
+    "file_digest",
+    "code_hash",
+    "fingerprint",
+    "load_state",
+    "run_step",
+    "run_pipeline",
+]
@@ -0,0 +1,74 @@
+# tc/plotting.py
+"""
+Coverage plots whose drawing cost does not depend on n.
+
+The coverage of [start, n] is reduced to one bin per horizontal pixel by
+diagnose.uncovered_bins (word popcounts over the packed coverage) and each bin
+is drawn by its min/max: the covered? band spans 0..1 in a bin that holds both
+covered and uncovered k, and the first and last uncovered k of every bin are
+marked.  Nothing is sampled, so an isolated uncovered k always shows, and the
+figure carries at most 2 * bins markers however large n is.
+"""
+from __future__ import annotations
+
+from typing import Optional, Tuple
+
+import numpy as np
+
+from .diagnose import CoverageLike, uncovered_bins
+
+
+def plot_coverage(
+    B: CoverageLike,
+    out: str,
+    title: str,
+    start: int = 2,
+    uncovered: Optional[np.ndarray] = None,
+    bins: Optional[int] = None,
+    figsize: Tuple[float, float] = (10, 2.6),
+    dpi: int = 150,
+) -> int:
+    """
+    Save the min/max coverage plot of [start, n] to `out`; `bins` defaults to
+    the figure's width in pixels.  Pass the sorted uncovered k in [start, n] as
+    `uncovered` when they are already computed, so the coverage is not scanned
+    again (see uncovered_bins).  Returns the number of uncovered k.
+    """
+    import matplotlib.pyplot as plt  # only plotting runs pay for matplotlib
+
+    if bins is None:
+        bins = int(figsize[0] * dpi)
+    edges, counts, first, last = uncovered_bins(B, bins, start, uncovered)
+    n = int(edges[-1]) - 1
+
+    fig = plt.figure(figsize=figsize)
+    if counts.size:
+        # min and max of covered? over each bin, as post-steps along the edges
+        cmin = (counts == 0).astype(np.float64)
+        cmax = (counts < np.diff(edges)).astype(np.float64)
+        cmin, cmax = np.r_[cmin, cmin[-1]], np.r_[cmax, cmax[-1]]
+        plt.fill_between(edges, cmin, cmax, step="post", color="#206eff", alpha=0.25, linewidth=0)
+        plt.step(edges, cmax, where="post", lw=0.8, color="#206eff", label="coverage (min/max per pixel)")
+        plt.step(edges, cmin, where="post", lw=0.8, color="#206eff")
+
+        hit = counts > 0
+        if hit.any():
+            xs = np.unique(np.r_[first[hit], last[hit]])
+            plt.scatter(xs, np.zeros(xs.size), s=8, color="#d62728", alpha=0.85,
+                        label="uncovered (first/last per pixel)")
+
+    plt.ylim(-0.1, 1.1)
+    plt.xlim(0, n)
+    plt.yticks([0, 1], ["no", "yes"])
+    plt.xlabel("k")
+    plt.ylabel("covered?")
+    plt.title(title)
+    plt.grid(alpha=0.25, linewidth=0.6)
+    plt.legend(loc="lower right", frameon=False)
+    plt.tight_layout()
+    fig.savefig(out, dpi=dpi)
+    plt.close(fig)
+    return int(counts.sum())
+
+
+__all__ = ["plot_coverage"]
@@ -0,0 +1,167 @@
+# tc/reps.py
+"""
+Representation counts r(k) = #{(a, b) ∈ A × A : a + b = k} for 0 <= k <= n.
+
+Pairs are ordered, so a + b with a != b counts twice and a + a once; this is
+exactly the self-convolution of the indicator of A.  Counts saturate at `cap`
+and are stored in the smallest unsigned dtype holding it (uint8 for cap <= 255,
+uint16 for cap <= 65535), which is enough to see which targets hang on one or
+two pairs without paying for full-width counters.
+
+k ∈ A + A iff r(k) > 0, so covered_from_counts() derives the coverage from the
+counts (zero-copy for uint8 counts) instead of running a second kernel.
+
+Engines (engine= or env TC_REPS_IMPL):
+  "pairs"   Numba pair kernel over disjoint target windows (numpy fallback)
+  "fft"     O(n log n) convolution, rounded, with an exact re-check of any value
+            that is not close to an integer
+"""
+from __future__ import annotations
+
+import os
+from typing import List, Optional
+
+import numpy as np
+
+from .cover import _FFT_MAX_ERR, _NUMBA_AVAILABLE, _fft_error_bound, _next_fast_len, _self_convolve
+from .result import CoverageResult
+
+if _NUMBA_AVAILABLE:
+    import numba as nb  # type: ignore
+    from .cover import _window_span
+
+DEFAULT_CAP = 255
+
+
+def counts_dtype(cap: int) -> np.dtype:
+    """Smallest unsigned dtype that holds `cap`."""
+    for dt in (np.uint8, np.uint16, np.uint32):
+        if cap <= np.iinfo(dt).max:
+            return np.dtype(dt)
+    raise ValueError(f"cap={cap} does not fit in uint32")
+
+
+if _NUMBA_AVAILABLE:
+    @nb.njit(parallel=True, fastmath=True, cache=True)
+    def _count_pairs_windows(A: np.ndarray, n: int, counts: np.ndarray, cap: int, window: int) -> None:
+        """
+        counts[s] += 2 for every pair i < j with s = A[i] + A[j] <= n (1 for i == j),
+        saturating at cap.  Threads own disjoint target windows [L, R), so the
+        increments never race.
+        """
+        m = A.size
+        nwin = (n + window) // window
+        for w in nb.prange(nwin):
+            L = w * window
+            R = L + window
+            if R > n + 1:
+                R = n + 1
+            for i in range(m):
+                a = A[i]
+                if 2 * a >= R:
+                    break  # pairs with j >= i all sum to >= R
+                j0, j1 = _window_span(A, i, L, R)
+                for j in range(j0, j1):
+                    s = a + A[j]
+                    v = counts[s] + (1 if j == i else 2)
+                    if v > cap:
+                        v = cap
+                    counts[s] = v
+
+
+def _count_pairs_numpy(A: np.ndarray, n: int, counts: np.ndarray, cap: int) -> None:
+    """Pure-numpy fallback: one vectorized saturating add per a (sums are distinct per a)."""
+    for i in range(A.size):
+        a = int(A[i])
+        if 2 * a > n:
+            break
+        j1 = int(np.searchsorted(A, n - a, side="right"))
+        s = a + A[i:j1]
+        inc = np.full(s.size, 2, dtype=np.int64)
+        inc[0] = 1
+        counts[s] = np.minimum(counts[s].astype(np.int64) + inc, cap)
+
+
+def _count_pairs_fft(A: np.ndarray, n: int, counts: np.ndarray, cap: int) -> None:
+    """
+    r(k) as the rounded self-convolution of 1_A.  A must be sorted non-decreasing
+    with 0 <= A <= n.  Rounding is trusted within the FFT error bound (see
+    tc.cover); past _FFT_MAX_ERR the pairs are counted exactly instead.
+    """
+    # L > 2*max(A) keeps wrap-around sums out of [0, n]
+    L = _next_fast_len(max(n + 1, 2 * int(A[-1]) + 1))
+    tol = _fft_error_bound(L, A.size)
+    if tol >= _FFT_MAX_ERR:
+        _count_pairs_numpy(A, n, counts, cap)
+        return
+    x = np.zeros(L, dtype=np.float64)
+    x[A] = 1.0
+    conv = _self_convolve(x)[: n + 1]
+    r = np.rint(conv)
+
+    # Rounding guard: exact recount wherever the result is further from an
+    # integer than the error bound allows
+    suspect = np.flatnonzero(np.abs(conv - r) > tol)
+    if suspect.size:
+        inA = x[: n + 1] > 0.5
+        for k in suspect:
+            sub = A[: np.searchsorted(A, k, side="right")]
+            r[k] = np.count_nonzero(inA[k - sub])
+    np.minimum(r, cap, out=r)
+    counts[:] = r.astype(counts.dtype)
+
+
+def representation_counts(
+    A_list: List[int], n: int, cap: int = DEFAULT_CAP, engine: Optional[str] = None, window: int = 1 << 16
+) -> np.ndarray:
+    """
+    Return r (length n+1, dtype counts_dtype(cap)) with r[k] = min(cap, #{(a, b): a + b = k})
+    over ordered pairs from A.  `engine` is "pairs" or "fft" (default: TC_REPS_IMPL,
+    else "pairs").
+    """
+    if cap < 1:
+        raise ValueError("cap must be >= 1")
+    n = max(n, 0)
+    counts = np.zeros(n + 1, dtype=counts_dtype(cap))
+    A = np.unique(np.asarray(A_list, dtype=np.int64))
+    A = A[(A >= 0) & (A <= n)]
+    if A.size == 0:
+        return counts
+
+    impl = (engine or os.environ.get("TC_REPS_IMPL", "") or "pairs").strip().lower()
+    if impl == "fft":
+        _count_pairs_fft(A, n, counts, cap)
+    elif impl == "pairs":
+        if _NUMBA_AVAILABLE:
+            _count_pairs_windows(A, n, counts, cap, window)
+        else:
+            _count_pairs_numpy(A, n, counts, cap)
+    else:
+        raise ValueError(f"unknown representation-count engine: {impl!r}")
+    return counts
+
+
+def covered_from_counts(counts: np.ndarray) -> CoverageResult:
+    """
+    Coverage (k ∈ A + A iff r(k) > 0) from representation counts.  uint8 counts
+    are wrapped as a byte-layout result without a copy; wider counts take one
+    comparison pass.
+    """
+    hits = counts if counts.dtype == np.uint8 else (counts != 0).view(np.uint8)
+    return CoverageResult(hits, counts.size - 1, "bytes")
+
+
+def fragile_targets(counts: np.ndarray, max_reps: int = 2, start: int = 2) -> np.ndarray:
+    """Sorted int64 k in [start, n] with 0 < r(k) <= max_reps (covered, but by few pairs)."""
+    start = max(0, start)
+    r = counts[start:]
+    return np.flatnonzero((r > 0) & (r <= max_reps)).astype(np.int64) + start
+
+
+__all__ = [
+    "DEFAULT_CAP",
+    "counts_dtype",
+    "representation_counts",
+    "covered_from_counts",
+    "fragile_targets",
+]
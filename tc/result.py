@@ -0,0 +1,236 @@
+# tc/result.py
+from __future__ import annotations
+
+import os
+from typing import Optional, Union
+
+import numpy as np
+from bitarray import bitarray
+
+_WORD_BITS = 64
+
+# On-disk packed coverage: a 64-byte header followed by little-endian uint64
+# words (bit k in word k >> 6), memory-mapped so readers need no copy.
+#   bytes 0..7   magic b"TCCOV\x00\x01\x00" (format version 1)
+#   bytes 8..15  n (uint64, little-endian)
+#   bytes 16..23 number of words (uint64, little-endian)
+#   bytes 24..63 reserved (zero)
+_FILE_MAGIC = b"TCCOV\x00\x01\x00"
+_HEADER_BYTES = 64
+_PACK_CHUNK = 1 << 26  # targets packed per step when writing byte-layout results
+
+PathLike = Union[str, "os.PathLike[str]"]
+
+
+def _popcount(words: np.ndarray) -> int:
+    """Total number of set bits in a uint64 word array."""
+    if hasattr(np, "bitwise_count"):
+        return int(np.bitwise_count(words).sum(dtype=np.int64))
+    table = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+    return int(table[words.view(np.uint8)].sum(dtype=np.int64))
+
+
+def _word_popcounts(words: np.ndarray) -> np.ndarray:
+    """Number of set bits in each word of a uint64 array (int64 array)."""
+    if hasattr(np, "bitwise_count"):
+        return np.bitwise_count(words).astype(np.int64)
+    table = np.array([bin(i).count("1") for i in range(256)], dtype=np.int64)
+    return table[words.view(np.uint8)].reshape(-1, 8).sum(axis=1)
+
+
+def longest_run_sorted(idx: np.ndarray) -> int:
+    """
+    Length of the longest run of consecutive integers in a sorted index array.
+    """
+    idx = np.asarray(idx)
+    if idx.size == 0:
+        return 0
+    breaks = np.flatnonzero(np.diff(idx) != 1)
+    ends = np.concatenate((breaks, [idx.size - 1]))
+    starts = np.concatenate(([0], breaks + 1))
+    return int((ends - starts).max()) + 1
+
+
+class CoverageResult:
+    """
+    Coverage of [0, n] by A + A, wrapping the kernel's numpy buffer without copying.
+
+    Layouts:
+      * "bytes":  uint8 array of length n+1; a nonzero byte means k is covered
+                  (pair kernels, FFT engine).
+      * "packed": uint64 words, little-endian bit order; bit k lives in word k >> 6
+                  (shift-OR engine).
+
+    Indexing (R[k]) and len(R) behave like the bitarray previously returned by
+    coverage_bitset; to_bitarray() converts for code that still needs one.
+    """
+
+    __slots__ = ("data", "n", "layout")
+
+    def __init__(self, data: np.ndarray, n: int, layout: Optional[str] = None) -> None:
+        if layout is None:
+            layout = "packed" if data.dtype == np.uint64 else "bytes"
+        if layout not in ("bytes", "packed"):
+            raise ValueError(f"unknown coverage layout: {layout!r}")
+        self.data = data
+        self.n = int(n)
+        self.layout = layout
+
+    @classmethod
+    def from_bitarray(cls, B: bitarray) -> "CoverageResult":
+        """Wrap a legacy bitarray (one vectorized unpack, no Python loop)."""
+        hits = np.frombuffer(B.unpack(), dtype=np.uint8)
+        return cls(hits, len(B) - 1, "bytes")
+
+    def __len__(self) -> int:
+        return self.n + 1
+
+    def __getitem__(self, k: int) -> bool:
+        k = int(k)
+        if k < 0:
+            k += self.n + 1
+        if not 0 <= k <= self.n:
+            raise IndexError("coverage index out of range")
+        if self.layout == "packed":
+            return bool((int(self.data[k >> 6]) >> (k & 63)) & 1)
+        return bool(self.data[k])
+
+    def __repr__(self) -> str:
+        return f"CoverageResult(n={self.n}, layout={self.layout!r})"
+
+    def copy(self) -> "CoverageResult":
+        """In-memory copy (a mapped file is read into RAM)."""
+        return CoverageResult(np.array(self.data), self.n, self.layout)
+
+    def flush(self) -> None:
+        """Write pending changes of a memory-mapped result to disk (no-op otherwise)."""
+        if isinstance(self.data, np.memmap):
+            self.data.flush()
+
+    def covered_mask(self, start: int = 0, stop: Optional[int] = None) -> np.ndarray:
+        """
+        Boolean array over k in [start, stop) (stop defaults to n+1).
+        """
+        stop = self.n + 1 if stop is None else min(stop, self.n + 1)
+        start = max(0, start)
+        if start >= stop:
+            return np.zeros(0, dtype=bool)
+        if self.layout == "packed":
+            w0, w1 = start >> 6, (stop + _WORD_BITS - 1) >> 6
+            words = self.data[w0:w1].astype("<u8", copy=False)
+            bits = np.unpackbits(words.view(np.uint8), bitorder="little")
+            off = start - w0 * _WORD_BITS
+            return bits[off : off + (stop - start)].view(bool)
+        return self.data[start:stop] != 0
+
+    def uncovered(self, start: int = 2) -> np.ndarray:
+        """
+        Sorted int64 array of k in [start, n] with k not in A + A.
+        By default we ignore 1 since A+A with A⊂Z_{>0} can't hit 1 unless 0 in A.
+        """
+        start = max(1, start)
+        return np.flatnonzero(~self.covered_mask(start)).astype(np.int64) + start
+
+    def count_uncovered(self, start: int = 2) -> int:
+        """Number of k in [start, n] with k not in A + A."""
+        start = max(1, start)
+        if start > self.n:
+            return 0
+        if self.layout == "packed":
+            # bits above n are always clear, so count everything and drop [0, start)
+            covered = _popcount(self.data) - int(np.count_nonzero(self.covered_mask(0, start)))
+        else:
+            covered = int(np.count_nonzero(self.data[start:]))
+        return (self.n + 1 - start) - covered
+
+    def longest_run(self, start: int = 2) -> int:
+        """Length of the longest run of consecutive uncovered k in [start, n]."""
+        return longest_run_sorted(self.uncovered(start))
+
+    def to_bitarray(self) -> bitarray:
+        """Copy into a bitarray of length n+1 (C-level pack, no per-bit loop)."""
+        if self.layout == "packed":
+            buf = self.data.astype("<u8", copy=False).view(np.uint8)
+            return bitarray(buffer=buf, endian="little")[: self.n + 1]
+        B = bitarray()
+        B.pack(np.ascontiguousarray(self.data, dtype=np.uint8).tobytes())
+        return B
+
+    def to_packed(self) -> np.ndarray:
+        """Return the coverage as packed uint64 words (no copy if already packed)."""
+        if self.layout == "packed":
+            return self.data
+        W = (self.n + _WORD_BITS) // _WORD_BITS
+        words = np.zeros(W, dtype=np.uint64)
+        _pack_into(words, self.data)
+        return words
+
+
+def _pack_into(words: np.ndarray, hits: np.ndarray) -> None:
+    """
+    Pack a byte-per-target hit vector into uint64 words, _PACK_CHUNK targets at a
+    time so the temporaries stay bounded for large n.
+    """
+    total = hits.size
+    for lo in range(0, total, _PACK_CHUNK):
+        hi = min(lo + _PACK_CHUNK, total)
+        chunk = np.zeros(-(-(hi - lo) // _WORD_BITS) * _WORD_BITS, dtype=np.uint8)
+        chunk[: hi - lo] = hits[lo:hi] != 0
+        packed = np.packbits(chunk, bitorder="little").view("<u8")
+        w0 = lo // _WORD_BITS
+        words[w0 : w0 + packed.size] = packed
+
+
+def create_coverage_file(path: PathLike, n: int) -> CoverageResult:
+    """
+    Create a zeroed packed coverage file for [0, n] and return it memory-mapped
+    (mode "r+"), so an engine can write its result straight to disk.
+    """
+    n = max(int(n), 0)
+    W = (n + _WORD_BITS) // _WORD_BITS
+    header = bytearray(_HEADER_BYTES)
+    header[:8] = _FILE_MAGIC
+    header[8:16] = n.to_bytes(8, "little")
+    header[16:24] = W.to_bytes(8, "little")
+    with open(path, "wb") as f:
+        f.write(header)
+        f.truncate(_HEADER_BYTES + 8 * W)
+    words = np.memmap(path, dtype="<u8", mode="r+", offset=_HEADER_BYTES, shape=(W,))
+    return CoverageResult(words, n, "packed")
+
+
+def open_coverage(path: PathLike, mode: str = "r") -> CoverageResult:
+    """
+    Memory-map a packed coverage file written by save_coverage/create_coverage_file.
+    No data is read until it is used; mode "r+" allows in-place updates.
+    """
+    with open(path, "rb") as f:
+        header = f.read(_HEADER_BYTES)
+    if len(header) != _HEADER_BYTES or header[:8] != _FILE_MAGIC:
+        raise ValueError(f"{os.fspath(path)!r} is not a tc coverage file")
+    n = int.from_bytes(header[8:16], "little")
+    W = int.from_bytes(header[16:24], "little")
+    words = np.memmap(path, dtype="<u8", mode=mode, offset=_HEADER_BYTES, shape=(W,))
+    return CoverageResult(words, n, "packed")
+
+
+def save_coverage(result: CoverageResult, path: PathLike) -> CoverageResult:
+    """
+    Write `result` to a packed coverage file and return the memory-mapped copy.
+    """
+    mapped = create_coverage_file(path, result.n)
+    if result.layout == "packed":
+        mapped.data[:] = result.data
+    else:
+        _pack_into(mapped.data, result.data)
+    mapped.flush()
+    return mapped
+
+
+__all__ = [
+    "CoverageResult",
+    "longest_run_sorted",
+    "create_coverage_file",
+    "open_coverage",
+    "save_coverage",
+]
@@ -0,0 +1,289 @@
+# tc/segment.py
+"""
+Segmented (windowed) coverage for n beyond RAM.
+
+Targets are processed in windows [L, R) in increasing order; for each a in A only
+the b with L - a <= b < R - a are visited, so only one window of hit bytes is
+alive at a time.  Per-window results (uncovered count, optional uncovered
+indices, runs) are streamed, and the longest uncovered run is tracked across
+window boundaries.  A is held as int64, so n >= 2^31 is supported.
+"""
+from __future__ import annotations
+
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from .cover import _NUMBA_AVAILABLE, _empty_result, _n_words, _traced
+from .result import CoverageResult, PathLike, _pack_into, create_coverage_file, longest_run_sorted
+
+if _NUMBA_AVAILABLE:
+    import numba as nb  # type: ignore
+    from .cover import _upper_bound, _window_span
+
+# Default memory budget for one window (hit bytes + uncovered indices)
+DEFAULT_MEM_BUDGET = 256 * 1024 * 1024
+_MIN_WINDOW = 1 << 12
+_RUN_CHUNK = 1 << 22  # hit bytes per step of the numpy run scan
+
+
+if _NUMBA_AVAILABLE:
+    @nb.njit(parallel=True, fastmath=True, cache=True)
+    def _mark_window(A: np.ndarray, L: int, R: int, hits: np.ndarray) -> None:
+        """
+        hits[s - L] = 1 for every s = A[i] + A[j] in [L, R) with i <= j
+        (A sorted non-decreasing, int64).
+        """
+        i_max = _upper_bound(A, (R - 1) // 2)
+        for i in nb.prange(i_max):
+            a = A[i]
+            j0, j1 = _window_span(A, i, L, R)
+            for j in range(j0, j1):
+                hits[a + A[j] - L] = 1
+
+
+    @nb.njit(cache=True)
+    def _longest_zero_run(h: np.ndarray) -> int:
+        """Length of the longest run of zero bytes in h (one pass, no allocation)."""
+        best = 0
+        run = 0
+        for k in range(h.size):
+            if h[k] == 0:
+                run += 1
+                if run > best:
+                    best = run
+            else:
+                run = 0
+        return best
+
+
+def _longest_zero_run_numpy(h: np.ndarray) -> int:
+    """Pure-numpy _longest_zero_run, in _RUN_CHUNK steps so temporaries stay bounded."""
+    best = run = 0
+    for lo in range(0, h.size, _RUN_CHUNK):
+        c = h[lo : lo + _RUN_CHUNK]
+        hit = np.flatnonzero(c)
+        if hit.size == 0:
+            run += c.size
+            best = max(best, run)
+            continue
+        best = max(best, run + int(hit[0]))
+        if hit.size > 1:
+            best = max(best, int(np.diff(hit).max()) - 1)
+        run = c.size - 1 - int(hit[-1])
+        best = max(best, run)
+    return best
+
+
+def longest_zero_run(h: np.ndarray) -> int:
+    """Length of the longest run of zero bytes in a hit-byte window, without index arrays."""
+    if _NUMBA_AVAILABLE:
+        return int(_longest_zero_run(h))
+    return _longest_zero_run_numpy(h)
+
+
+def _mark_window_numpy(A: np.ndarray, L: int, R: int, hits: np.ndarray) -> None:
+    """Pure-numpy fallback for _mark_window."""
+    i_max = int(np.searchsorted(A, (R - 1) // 2, side="right"))
+    for i in range(i_max):
+        a = int(A[i])
+        j0 = max(i, int(np.searchsorted(A, L - a, side="left")))
+        j1 = int(np.searchsorted(A, R - 1 - a, side="right"))
+        hits[A[j0:j1] + (a - L)] = 1
+
+
+def mark_window(A: np.ndarray, L: int, R: int, hits: np.ndarray) -> None:
+    """hits[s - L] = 1 for every s in A + A within [L, R) (A sorted int64); Numba or numpy."""
+    if A.size == 0:
+        return
+    if _NUMBA_AVAILABLE:
+        _mark_window(A, L, R, hits)
+    else:
+        _mark_window_numpy(A, L, R, hits)
+
+
+def iter_windows(lo: int, hi: int, window: int) -> Iterator[Tuple[int, int]]:
+    """Consecutive target windows [L, R) of at most `window` targets covering [lo, hi]."""
+    L = lo
+    while L <= hi:
+        R = min(L + window, hi + 1)
+        yield L, R
+        L = R
+
+
+def window_for_budget(mem_budget: int, A_size: int, with_indices: bool = True) -> int:
+    """
+    Largest window (number of targets) that fits in `mem_budget` bytes next to A:
+    1 hit byte + 1 mask byte per target, plus up to 8 bytes per target for the
+    uncovered indices of the window when they are requested.  Raises ValueError
+    when not even a minimal window (_MIN_WINDOW targets) fits.
+    """
+    per_target = 10 if with_indices else 2
+    avail = mem_budget - 8 * A_size
+    if avail // per_target < _MIN_WINDOW:
+        need = 8 * A_size + per_target * _MIN_WINDOW
+        raise ValueError(
+            f"mem_budget={mem_budget} bytes cannot hold |A|={A_size} and a {_MIN_WINDOW}-target window "
+            f"(need at least {need} bytes)"
+        )
+    return avail // per_target
+
+
+class WindowResult:
+    """
+    Coverage of one target window [L, R).
+
+    Fields:
+      L, R          window bounds (targets L..R-1)
+      count         uncovered targets in the window
+      uncovered     sorted int64 uncovered targets (None if not requested)
+      longest       longest uncovered run inside the window
+      open_run      uncovered run ending at R-1, including earlier windows
+      longest_so_far longest uncovered run over [start, R), across boundaries
+    """
+
+    __slots__ = ("L", "R", "count", "uncovered", "longest", "open_run", "longest_so_far")
+
+    def __init__(self, L, R, count, uncovered, longest, open_run, longest_so_far) -> None:
+        self.L = L
+        self.R = R
+        self.count = count
+        self.uncovered = uncovered
+        self.longest = longest
+        self.open_run = open_run
+        self.longest_so_far = longest_so_far
+
+    def __repr__(self) -> str:
+        return (
+            f"WindowResult(L={self.L}, R={self.R}, count={self.count}, "
+            f"longest={self.longest}, longest_so_far={self.longest_so_far})"
+        )
+
+
+def iter_coverage_windows(
+    A_list: List[int],
+    n: int,
+    start: int = 2,
+    window: Optional[int] = None,
+    mem_budget: int = DEFAULT_MEM_BUDGET,
+    with_indices: bool = True,
+) -> Iterator[WindowResult]:
+    """
+    Stream coverage of [start, n] by A + A window by window, in increasing order.
+    The window size is `window` if given, else the largest that fits `mem_budget`.
+    With with_indices=False only counts and runs are computed (no index arrays).
+    """
+    start = max(1, start)
+    A = np.sort(np.asarray(A_list, dtype=np.int64))
+    A = A[(A >= 0) & (A <= n)]
+    if window is None:
+        window = window_for_budget(mem_budget, A.size, with_indices)
+
+    open_run = 0
+    longest_so_far = 0
+    hits = np.zeros(min(window, max(n + 1 - start, 0)), dtype=np.uint8)
+    for L, R in iter_windows(start, n, window):
+        h = hits[: R - L]
+        h[:] = 0
+        mark_window(A, L, R, h)
+
+        count = (R - L) - int(np.count_nonzero(h))
+        if with_indices:
+            unc_local = np.flatnonzero(h == 0)
+            longest = longest_run_sorted(unc_local)
+        else:
+            longest = longest_zero_run(h)
+        if count == R - L:
+            open_run += count
+        else:
+            lead = int(np.argmax(h))  # first covered target
+            longest_so_far = max(longest_so_far, open_run + lead)
+            open_run = int(np.argmax(h[::-1]))  # uncovered tail after the last covered
+        longest_so_far = max(longest_so_far, longest, open_run)
+
+        yield WindowResult(
+            L, R, count,
+            (unc_local + L) if with_indices else None,
+            longest, open_run, longest_so_far,
+        )
+
+
+@_traced("segmented")
+def coverage_segmented(
+    A_list: List[int],
+    n: int,
+    window: Optional[int] = None,
+    mem_budget: int = DEFAULT_MEM_BUDGET,
+    out: Optional[PathLike] = None,
+) -> CoverageResult:
+    """
+    Full packed coverage of [0, n], computed window by window: next to the result
+    (n/8 bytes, or the `out` file) only one window of hit bytes is alive, sized
+    from `mem_budget` unless `window` is given.  Windows are whole words, so each
+    one packs straight into its slice of the result.  coverage_bitset engine
+    "segmented".
+    """
+    if n < 1:
+        return _empty_result(n, out)
+    A = np.sort(np.asarray(A_list, dtype=np.int64))
+    A = A[(A >= 0) & (A <= n)]
+    if window is None:
+        window = window_for_budget(mem_budget, A.size, with_indices=False)
+    window = max(64, window // 64 * 64)
+
+    if out is not None:
+        result = create_coverage_file(out, n)
+    else:
+        result = CoverageResult(np.zeros(_n_words(n), dtype=np.uint64), n, "packed")
+    hits = np.zeros(min(window, n + 1), dtype=np.uint8)
+    for L, R in iter_windows(0, n, window):
+        h = hits[: R - L]
+        h[:] = 0
+        mark_window(A, L, R, h)
+        _pack_into(result.data[L // 64 :], h)
+    if out is not None:
+        result.flush()
+    return result
+
+
+def segmented_coverage_summary(
+    A_list: List[int],
+    n: int,
+    start: int = 2,
+    window: Optional[int] = None,
+    mem_budget: int = DEFAULT_MEM_BUDGET,
+    max_indices: int = 0,
+) -> Dict[str, object]:
+    """
+    Run all windows and return {"uncovered", "longest_run", "windows", "first_uncovered"}.
+    Up to `max_indices` uncovered targets are kept (in order); memory stays bounded.
+    """
+    total = 0
+    longest = 0
+    windows = 0
+    first: List[int] = []
+    for w in iter_coverage_windows(A_list, n, start, window, mem_budget, with_indices=max_indices > 0):
+        total += w.count
+        longest = w.longest_so_far
+        windows += 1
+        if w.uncovered is not None and len(first) < max_indices:
+            first.extend(w.uncovered[: max_indices - len(first)].tolist())
+    return {
+        "uncovered": total,
+        "longest_run": longest,
+        "windows": windows,
+        "first_uncovered": first,
+    }
+
+
+__all__ = [
+    "DEFAULT_MEM_BUDGET",
+    "WindowResult",
+    "window_for_budget",
+    "longest_zero_run",
+    "mark_window",
+    "iter_windows",
+    "iter_coverage_windows",
+    "coverage_segmented",
+    "segmented_coverage_summary",
+]
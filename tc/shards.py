@@ -0,0 +1,457 @@
+# tc/shards.py
+"""
+Checkpointed, sharded coverage for n too large for one uninterrupted run.
+
+The target range [0, n] is cut into word-aligned shards [L, R).  A job lives in
+a directory on a filesystem every worker can see:
+
+  manifest.json        n, start, shard bounds and the SHA-256 of A
+  A.npy                sorted int64 A (entries in [0, n])
+  shard_00012.lock     claim: host, pid and time of the worker computing shard 12
+  shard_00012.lock.takeover.*
+                       marks a stale claim as taken over (one per dead owner;
+                       removed once the shard is done)
+  shard_00012.json     the shard's uncovered count and runs (written first)
+  shard_00012.cov      the shard's packed-bit coverage (tc.result file format,
+                       local bit k - L); its presence marks the shard done
+
+Workers, in any number of processes or hosts, claim shards by creating the
+lock file with O_CREAT | O_EXCL, compute them with the windowed pair kernel,
+and publish results with an atomic rename.  A lock whose owner died on this
+host, or that is older than --stale-after, may be taken over by whichever
+worker first creates that owner's takeover file (O_EXCL).  Rerunning a job
+only computes shards without a .cov file.  merge_shards() copies the shard
+words into one coverage (optionally a memory-mapped file) and composes the
+uncovered count and the longest uncovered run across shard boundaries.
+
+Usage:
+  python -m tc.shards run JOB --n 1e9 --C 1.6 --workers 4     # init + work + merge
+  python -m tc.shards init JOB --n 1e9 --C 1.6                # coordinator only
+  python -m tc.shards work JOB                                # on every host
+  python -m tc.shards merge JOB --out cov_1e9.tccov
+  python -m tc.shards status JOB
+"""
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import math
+import os
+import socket
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from .cover import _NUMBA_AVAILABLE
+from .result import (
+    CoverageResult, PathLike, _pack_into, create_coverage_file, open_coverage,
+)
+from .segment import longest_zero_run, mark_window
+from .shm import pool_context
+from .telemetry import span
+
+if _NUMBA_AVAILABLE:
+    import numba as nb  # type: ignore
+
+MANIFEST_VERSION = 1
+DEFAULT_SHARD_SIZE = 1 << 27  # targets per shard: 128 MiB of hit bytes while computing
+DEFAULT_STALE_AFTER = 24 * 3600.0
+_WORD_BITS = 64
+
+
+# --- Job layout --------------------------------------------------------------
+
+def _path(job_dir: str, name: str) -> str:
+    return os.path.join(job_dir, name)
+
+
+def _shard_name(i: int, ext: str) -> str:
+    return f"shard_{i:05d}.{ext}"
+
+
+def _write_json_atomic(path: str, data: Any) -> None:
+    tmp = f"{path}.tmp.{os.getpid()}"
+    with open(tmp, "w") as f:
+        json.dump(data, f, indent=1)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+def plan_shards(n: int, shard_size: int = DEFAULT_SHARD_SIZE) -> List[Tuple[int, int]]:
+    """Word-aligned bounds [L, R) covering [0, n], each at most shard_size targets."""
+    size = max(_WORD_BITS, shard_size // _WORD_BITS * _WORD_BITS)
+    return [(L, min(L + size, n + 1)) for L in range(0, n + 1, size)]
+
+
+def default_job_dir(A: np.ndarray, n: int, root: str = ".tc_shards") -> str:
+    """Job directory derived from (n, A), so a restarted run finds its shards."""
+    return os.path.join(root, f"n{n}-{_digest(A)[:16]}")
+
+
+def _digest(A: np.ndarray) -> str:
+    return hashlib.sha256(np.ascontiguousarray(A, dtype="<i8").tobytes()).hexdigest()
+
+
+def init_job(
+    job_dir: str, A_list: List[int], n: int, start: int = 2, shard_size: int = DEFAULT_SHARD_SIZE
+) -> Dict[str, Any]:
+    """
+    Write the manifest and A for a job (the coordinator's part) and return the
+    manifest.  An existing job for the same (n, A, start) is reused as is;
+    one for different inputs raises ValueError.
+    """
+    A = np.unique(np.asarray(A_list, dtype=np.int64))
+    A = A[(A >= 0) & (A <= n)]
+    digest = _digest(A)
+    existing = load_manifest(job_dir) if os.path.exists(_path(job_dir, "manifest.json")) else None
+    if existing is not None:
+        if (existing["n"], existing["A_sha256"], existing["start"]) != (n, digest, start):
+            raise ValueError(f"{job_dir!r} holds a job for different inputs (n={existing['n']})")
+        return existing
+
+    os.makedirs(job_dir, exist_ok=True)
+    tmp = _path(job_dir, f"A.tmp.{os.getpid()}.npy")
+    np.save(tmp, A)
+    os.replace(tmp, _path(job_dir, "A.npy"))
+    manifest = {
+        "version": MANIFEST_VERSION,
+        "n": int(n),
+        "start": int(start),
+        "A_size": int(A.size),
+        "A_sha256": digest,
+        "shard_size": int(shard_size),
+        "shards": plan_shards(n, shard_size),
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+    }
+    _write_json_atomic(_path(job_dir, "manifest.json"), manifest)
+    return manifest
+
+
+def load_manifest(job_dir: str) -> Dict[str, Any]:
+    with open(_path(job_dir, "manifest.json")) as f:
+        manifest = json.load(f)
+    if manifest.get("version") != MANIFEST_VERSION:
+        raise ValueError(f"unsupported shard manifest version in {job_dir!r}")
+    return manifest
+
+
+def shard_done(job_dir: str, i: int) -> bool:
+    return os.path.exists(_path(job_dir, _shard_name(i, "cov")))
+
+
+def pending_shards(job_dir: str) -> List[int]:
+    """Indices of the shards without a finished coverage file."""
+    manifest = load_manifest(job_dir)
+    return [i for i in range(len(manifest["shards"])) if not shard_done(job_dir, i)]
+
+
+# --- Claims ------------------------------------------------------------------
+
+def _stale_owner(path: str, stale_after: float) -> Optional[Dict[str, Any]]:
+    """
+    The lock's owner record if that owner died on this host or the lock is
+    older than stale_after, else None.
+    """
+    try:
+        with open(path) as f:
+            owner = json.load(f)
+        age = time.time() - os.stat(path).st_mtime
+    except (OSError, ValueError):
+        return None  # vanished or being written; look again next round
+    if owner.get("host") == socket.gethostname():
+        try:
+            os.kill(int(owner["pid"]), 0)
+        except ProcessLookupError:
+            return owner
+        except (OSError, KeyError, ValueError):
+            pass
+    return owner if age > stale_after else None
+
+
+def _claim(job_dir: str, i: int, stale_after: float) -> bool:
+    """
+    Atomically take shard i.  A stale lock is removed only by the worker that
+    creates the takeover file named after its dead owner (O_EXCL), so one taker
+    wins; a worker acting on an outdated view of that lock finds the takeover
+    file taken and backs off instead of removing its successor's lock.
+    """
+    lock = _path(job_dir, _shard_name(i, "lock"))
+    for _ in range(2):
+        try:
+            fd = os.open(lock, os.O_CREAT | os.O_EXCL | os.O_WRONLY, 0o644)
+        except FileExistsError:
+            owner = _stale_owner(lock, stale_after)
+            if owner is None:
+                return False
+            take = f"{lock}.takeover.{owner.get('host')}.{owner.get('pid')}.{owner.get('ts')}"
+            try:
+                os.close(os.open(take, os.O_CREAT | os.O_EXCL | os.O_WRONLY, 0o644))
+            except FileExistsError:
+                return False  # another worker took it over
+            try:
+                os.remove(lock)
+            except FileNotFoundError:
+                pass
+            continue
+        with os.fdopen(fd, "w") as f:
+            json.dump({"host": socket.gethostname(), "pid": os.getpid(), "ts": time.time()}, f)
+        if shard_done(job_dir, i):  # finished between the listing and the claim
+            _release(job_dir, i)
+            return False
+        return True
+    return False
+
+
+def _release(job_dir: str, i: int) -> None:
+    lock = _path(job_dir, _shard_name(i, "lock"))
+    try:
+        os.remove(lock)
+    except FileNotFoundError:
+        pass
+    if shard_done(job_dir, i):
+        # no claim can matter any more, so the takeover markers may go
+        for name in os.listdir(job_dir):
+            if name.startswith(os.path.basename(lock) + ".takeover."):
+                try:
+                    os.remove(_path(job_dir, name))
+                except FileNotFoundError:
+                    pass
+
+
+# --- Work --------------------------------------------------------------------
+
+def _run_stats(h: np.ndarray) -> Dict[str, int]:
+    """
+    Uncovered count and runs of a hit-byte window (leading, trailing, longest),
+    streamed over the bytes: no uncovered-index array is built.
+    """
+    uncovered = int(h.size) - int(np.count_nonzero(h))
+    if uncovered == h.size:
+        return {"size": int(h.size), "uncovered": int(h.size), "lead": int(h.size),
+                "tail": int(h.size), "longest": int(h.size)}
+    return {
+        "size": int(h.size),
+        "uncovered": uncovered,
+        "lead": int(np.argmax(h)),
+        "tail": int(np.argmax(h[::-1])),
+        "longest": longest_zero_run(h),
+    }
+
+
+def compute_shard(A: np.ndarray, L: int, R: int, start: int = 2) -> Tuple[np.ndarray, Dict[str, int]]:
+    """(hit bytes for targets [L, R), run statistics over [max(L, start), R))."""
+    hits = np.zeros(R - L, dtype=np.uint8)
+    mark_window(A, L, R, hits)
+    return hits, _run_stats(hits[max(start, L) - L :])
+
+
+def work(
+    job_dir: str, max_shards: Optional[int] = None, stale_after: float = DEFAULT_STALE_AFTER, verbose: bool = False
+) -> int:
+    """
+    Claim and compute pending shards of the job until none are left (or
+    `max_shards` are done); returns the number of shards this worker finished.
+    """
+    manifest = load_manifest(job_dir)
+    A = np.load(_path(job_dir, "A.npy"))
+    start = manifest["start"]
+    done = 0
+    for i in pending_shards(job_dir):
+        if max_shards is not None and done >= max_shards:
+            break
+        if not _claim(job_dir, i, stale_after):
+            continue
+        try:
+            L, R = manifest["shards"][i]
+            with span("shard", index=i, L=L, R=R) as s:
+                t0 = time.time()
+                hits, stats = compute_shard(A, L, R, start)
+                stats["time_sec"] = round(time.time() - t0, 3)
+                cov = _path(job_dir, _shard_name(i, "cov"))
+                tmp = f"{cov}.tmp.{os.getpid()}"
+                mapped = create_coverage_file(tmp, R - L - 1)
+                _pack_into(mapped.data, hits)
+                mapped.flush()
+                del mapped
+                _write_json_atomic(_path(job_dir, _shard_name(i, "json")), stats)
+                os.replace(tmp, cov)  # the shard counts as done from here on
+                if s:
+                    s.set(uncovered=stats["uncovered"])
+            done += 1
+            if verbose:
+                print(f"[shards] {job_dir}: shard {i} [{L:,}, {R:,}) uncovered={stats['uncovered']} "
+                      f"time={stats['time_sec']}s")
+        finally:
+            _release(job_dir, i)
+    return done
+
+
+def _init_worker(threads: int) -> None:
+    if _NUMBA_AVAILABLE:
+        nb.set_num_threads(max(1, min(threads, nb.config.NUMBA_NUM_THREADS)))
+
+
+def _work_task(args: Tuple[str, float, bool]) -> int:
+    job_dir, stale_after, verbose = args
+    return work(job_dir, stale_after=stale_after, verbose=verbose)
+
+
+def run_workers(
+    job_dir: str, workers: int = 1, threads: Optional[int] = None,
+    stale_after: float = DEFAULT_STALE_AFTER, verbose: bool = False,
+) -> int:
+    """Run `workers` local worker processes on the job, sharing a `threads` budget."""
+    from .grid import thread_budget
+
+    budget = thread_budget(threads)
+    workers = max(1, min(workers, budget))
+    if workers == 1:
+        _init_worker(budget)
+        return work(job_dir, stale_after=stale_after, verbose=verbose)
+    # Workers read everything from the job directory
+    with pool_context().Pool(
+        processes=workers, initializer=_init_worker, initargs=(budget // workers,)
+    ) as pool:
+        return sum(pool.map(_work_task, [(job_dir, stale_after, verbose)] * workers))
+
+
+# --- Merge -------------------------------------------------------------------
+
+def combine_stats(stats: List[Dict[str, int]]) -> Dict[str, int]:
+    """Uncovered count and longest uncovered run over consecutive shards' statistics."""
+    total = 0
+    longest = 0
+    open_run = 0
+    for st in stats:
+        if st["size"] == 0:
+            continue
+        total += st["uncovered"]
+        if st["uncovered"] == st["size"]:
+            open_run += st["size"]
+        else:
+            longest = max(longest, open_run + st["lead"])
+            open_run = st["tail"]
+        longest = max(longest, st["longest"], open_run)
+    return {"uncovered": total, "longest_run": longest}
+
+
+def merge_shards(job_dir: str, out: Optional[PathLike] = None) -> Tuple[CoverageResult, Dict[str, Any]]:
+    """
+    Assemble the finished shards into the coverage of [0, n] (a memory-mapped
+    packed file at `out`, else in memory) and return it with the job summary
+    {"n", "A_size", "shards", "uncovered", "longest_run"}, also written to
+    summary.json.  Raises RuntimeError while shards are still pending.
+    """
+    manifest = load_manifest(job_dir)
+    missing = pending_shards(job_dir)
+    if missing:
+        raise RuntimeError(f"{len(missing)} of {len(manifest['shards'])} shards unfinished (first: {missing[0]})")
+    n = manifest["n"]
+    if out is not None:
+        result = create_coverage_file(out, n)
+    else:
+        result = CoverageResult(np.zeros((n + _WORD_BITS) // _WORD_BITS, dtype=np.uint64), n, "packed")
+    stats = []
+    with span("merge_shards", n=n, shards=len(manifest["shards"])):
+        for i, (L, R) in enumerate(manifest["shards"]):
+            part = open_coverage(_path(job_dir, _shard_name(i, "cov")))
+            w0 = L // _WORD_BITS
+            result.data[w0 : w0 + part.data.size] = part.data
+            with open(_path(job_dir, _shard_name(i, "json"))) as f:
+                stats.append(json.load(f))
+        result.flush()
+    summary = {"n": n, "A_size": manifest["A_size"], "shards": len(stats), **combine_stats(stats)}
+    _write_json_atomic(_path(job_dir, "summary.json"), summary)
+    return result, summary
+
+
+def coverage_sharded(
+    A_list: List[int], n: int, job_dir: Optional[str] = None, out: Optional[PathLike] = None,
+    workers: int = 1, threads: Optional[int] = None, shard_size: int = DEFAULT_SHARD_SIZE,
+    start: int = 2, root: Optional[str] = None,
+) -> CoverageResult:
+    """
+    coverage_bitset as a checkpointed sharded job: init (or resume) the job in
+    `job_dir` (default: default_job_dir under `root`, so each (n, A) gets its
+    own directory), compute the pending shards with `workers` local processes
+    and merge.  Other hosts may join with `python -m tc.shards work JOB` while
+    it runs.
+    """
+    A = np.unique(np.asarray(A_list, dtype=np.int64))
+    A = A[(A >= 0) & (A <= n)]
+    job_dir = job_dir or default_job_dir(A, n, root or ".tc_shards")
+    init_job(job_dir, A, n, start=start, shard_size=shard_size)
+    run_workers(job_dir, workers=workers, threads=threads)
+    # Shards still claimed by workers elsewhere: wait for them to land
+    while pending_shards(job_dir):
+        run_workers(job_dir, workers=1, threads=threads)
+        time.sleep(1.0)
+    return merge_shards(job_dir, out)[0]
+
+
+# --- CLI ---------------------------------------------------------------------
+
+def _friables_for(n: int, C: float) -> np.ndarray:
+    from .smooth import friables, lpf_sieve
+
+    return friables(n, int((math.log(n)) ** C), lpf_sieve(n))
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="Checkpointed sharded coverage jobs.")
+    ap.add_argument("cmd", choices=["init", "work", "merge", "status", "run"])
+    ap.add_argument("job", help="Job directory (shared by every worker)")
+    ap.add_argument("--n", type=float, default=None, help="Upper target (init/run)")
+    ap.add_argument("--C", type=float, default=None, help="A = friables with y=(log n)^C (init/run)")
+    ap.add_argument("--A", default=None, help="Alternatively, a .npy file holding A (init/run)")
+    ap.add_argument("--start", type=int, default=2, help="Coverage lower bound for the diagnostics")
+    ap.add_argument("--shard-size", type=float, default=DEFAULT_SHARD_SIZE, help="Targets per shard")
+    ap.add_argument("--workers", type=int, default=1, help="Local worker processes (work/run)")
+    ap.add_argument("--threads", type=int, default=None, help="Total thread budget (default: TC_THREADS or cpu count)")
+    ap.add_argument("--stale-after", type=float, default=DEFAULT_STALE_AFTER, help="Seconds before a lock may be taken over")
+    ap.add_argument("--out", default=None, help="Merged packed coverage file (merge/run)")
+    args = ap.parse_args()
+
+    if args.cmd in ("init", "run"):
+        if args.n is None or (args.C is None and args.A is None):
+            ap.error(f"{args.cmd} needs --n and one of --C / --A")
+        n = int(args.n)
+        A = np.load(args.A) if args.A else _friables_for(n, args.C)
+        m = init_job(args.job, A, n, start=args.start, shard_size=int(args.shard_size))
+        print(f"[shards] {args.job}: n={n:,} |A|={m['A_size']:,} shards={len(m['shards'])}")
+    if args.cmd in ("work", "run"):
+        done = run_workers(args.job, args.workers, args.threads, args.stale_after, verbose=True)
+        print(f"[shards] {args.job}: finished {done} shards, {len(pending_shards(args.job))} pending")
+    if args.cmd in ("merge", "run"):
+        _, summary = merge_shards(args.job, args.out)
+        print(f"[shards] {args.job}: uncovered={summary['uncovered']:,} longest_run={summary['longest_run']:,}"
+              + (f" -> {args.out}" if args.out else ""))
+    if args.cmd == "status":
+        m = load_manifest(args.job)
+        pending = pending_shards(args.job)
+        claimed = [i for i in pending if os.path.exists(_path(args.job, _shard_name(i, "lock")))]
+        print(f"[shards] {args.job}: n={m['n']:,} shards={len(m['shards'])} done={len(m['shards']) - len(pending)} "
+              f"running={len(claimed)} pending={len(pending) - len(claimed)}")
+
+
+__all__ = [
+    "DEFAULT_SHARD_SIZE",
+    "plan_shards",
+    "default_job_dir",
+    "init_job",
+    "load_manifest",
+    "pending_shards",
+    "compute_shard",
+    "work",
+    "run_workers",
+    "combine_stats",
+    "merge_shards",
+    "coverage_sharded",
+]
+
+
+if __name__ == "__main__":
+    main()
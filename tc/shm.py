@@ -0,0 +1,67 @@
+# tc/shm.py
+"""
+Numpy arrays in multiprocessing.shared_memory, so worker processes attach to
+the parent's data by name instead of receiving pickled copies, and the start
+method every tc worker pool uses.
+"""
+from __future__ import annotations
+
+import sys
+from multiprocessing import get_all_start_methods, get_context, shared_memory
+from typing import Optional, Tuple
+
+import numpy as np
+
+# (shared memory name, shape, dtype) of an array published by the parent
+ShmSpec = Tuple[str, Tuple[int, ...], str]
+
+
+def _numba_threads_started() -> bool:
+    """True once this process has launched Numba's parallel threading layer."""
+    parallel = sys.modules.get("numba.np.ufunc.parallel")
+    return bool(getattr(parallel, "_is_initialized", False))
+
+
+def pool_context(fresh: bool = False):
+    """
+    multiprocessing context for tc's worker pools.  Forked where the platform
+    allows it, so workers inherit the loaded modules and compiled kernels and
+    an unguarded script works; spawned once this process has run a parallel
+    Numba kernel (a fork after that can hang Numba's TBB threading layer), on
+    platforms without fork, or with fresh=True (a clean interpreter, e.g. for
+    measurements).  Spawned workers re-import __main__, so a script that can
+    reach a spawned pool needs an `if __name__ == "__main__":` guard.
+    """
+    if not fresh and "fork" in get_all_start_methods() and not _numba_threads_started():
+        return get_context("fork")
+    return get_context("spawn")
+
+
+def share_array(
+    arr: Optional[np.ndarray] = None, shape: Tuple[int, ...] = (), dtype=None
+) -> Tuple[shared_memory.SharedMemory, ShmSpec]:
+    """
+    Copy `arr` into a new shared memory block, or allocate a zeroed one of
+    (shape, dtype) when arr is None.  The caller closes and unlinks it.
+    """
+    if arr is not None:
+        shape, dtype = arr.shape, arr.dtype
+    dtype = np.dtype(dtype)
+    nbytes = int(np.prod(shape, dtype=np.int64)) * dtype.itemsize
+    shm = shared_memory.SharedMemory(create=True, size=max(nbytes, 1))
+    view = np.ndarray(shape, dtype=dtype, buffer=shm.buf)
+    if arr is not None:
+        view[...] = arr
+    else:
+        view[...] = 0
+    return shm, (shm.name, tuple(shape), dtype.str)
+
+
+def attach_array(spec: ShmSpec) -> Tuple[shared_memory.SharedMemory, np.ndarray]:
+    """Map a block published with share_array (keep the handle alive while using the view)."""
+    name, shape, dtype = spec
+    shm = shared_memory.SharedMemory(name=name)
+    return shm, np.ndarray(shape, dtype=np.dtype(dtype), buffer=shm.buf)
+
+
+__all__ = ["ShmSpec", "pool_context", "share_array", "attach_array"]
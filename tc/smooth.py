@@ -1,7 +1,19 @@
 from __future__ import annotations
-from typing import List, Tuple
+from typing import List, Optional, Tuple
 import heapq
 
+import numpy as np
+
+from .telemetry import span
+
+# Optional Numba path for the largest-prime-factor sieve (numpy fallback below)
+_NUMBA_AVAILABLE = False
+try:
+    import numba as nb  # type: ignore
+    _NUMBA_AVAILABLE = True
+except Exception:
+    _NUMBA_AVAILABLE = False
+
 
 def primes_upto(m: int) -> list[int]:
     """
@@ -9,15 +21,19 @@ def primes_upto(m: int) -> list[int]:
     """
     if m < 2:
         return []
-    sieve = bytearray(b"\x01") * (m + 1)
-    sieve[:2] = b"\x00\x00"
-    limit = int(m**0.5)
-    for p in range(2, limit + 1):
-        if sieve[p]:
-            start = p * p
-            step = p
-            sieve[start : m + 1 : step] = b"\x00" * (((m - start) // step) + 1)
-    return [i for i, b in enumerate(sieve) if b]
+    with span("primes", m=m) as s:
+        sieve = bytearray(b"\x01") * (m + 1)
+        sieve[:2] = b"\x00\x00"
+        limit = int(m**0.5)
+        for p in range(2, limit + 1):
+            if sieve[p]:
+                start = p * p
+                step = p
+                sieve[start : m + 1 : step] = b"\x00" * (((m - start) // step) + 1)
+        primes = [i for i, b in enumerate(sieve) if b]
+        if s:
+            s.set(primes=len(primes))
+    return primes
 
 
 def generate_friables(n: int, y_primes: List[int]) -> list[int]:
@@ -27,21 +43,153 @@ def generate_friables(n: int, y_primes: List[int]) -> list[int]:
     """
     if n < 1:
         return []
-    A: list[int] = []
-    # Each heap item is (value, min_prime_index_allowed)
-    heap: list[Tuple[int, int]] = [(1, 0)]
-    seen = {1}
-    while heap:
-        val, idx = heapq.heappop(heap)
-        A.append(val)
-        # Multiply by any allowed prime at j >= idx (non-decreasing prime sequence)
-        for j in range(idx, len(y_primes)):
-            p = y_primes[j]
-            nv = val * p
-            if nv > n:
-                break
-            if nv not in seen:
-                seen.add(nv)
-                heapq.heappush(heap, (nv, j))
-    A.sort()
+    with span("friables", engine="heap", n=n, primes=len(y_primes)) as s:
+        A: list[int] = []
+        # Each heap item is (value, min_prime_index_allowed)
+        heap: list[Tuple[int, int]] = [(1, 0)]
+        seen = {1}
+        while heap:
+            val, idx = heapq.heappop(heap)
+            A.append(val)
+            # Multiply by any allowed prime at j >= idx (non-decreasing prime sequence)
+            for j in range(idx, len(y_primes)):
+                p = y_primes[j]
+                nv = val * p
+                if nv > n:
+                    break
+                if nv not in seen:
+                    seen.add(nv)
+                    heapq.heappush(heap, (nv, j))
+        A.sort()
+        if s:
+            s.set(A_size=len(A))
     return A
+
+
+if _NUMBA_AVAILABLE:
+    @nb.njit(cache=True)
+    def _friables_dfs(n: int, primes: np.ndarray, out: np.ndarray, fill: bool) -> int:
+        """
+        Depth-first walk over products of primes with non-decreasing prime index,
+        so every y-smooth value <= n is reached exactly once (1 included).
+        Returns the count; with fill=True also writes the values into out.
+        """
+        m = primes.size
+        # depth <= log2(n) + 1 <= 64 for int64 n
+        val = np.empty(65, dtype=np.int64)
+        nxt = np.empty(65, dtype=np.int64)
+        if fill:
+            out[0] = 1
+        count = 1
+        depth = 0
+        val[0] = 1
+        nxt[0] = 0
+        while depth >= 0:
+            j = nxt[depth]
+            v = val[depth]
+            if j < m and primes[j] <= n // v:
+                nxt[depth] = j + 1
+                c = v * primes[j]
+                if fill:
+                    out[count] = c
+                count += 1
+                depth += 1
+                val[depth] = c
+                nxt[depth] = j  # children may reuse p_j, never smaller primes
+            else:
+                depth -= 1
+        return count
+
+
+def generate_friables_njit(n: int, y_primes: List[int]) -> np.ndarray:
+    """
+    Compiled, allocation-free counterpart of generate_friables for sparse regimes
+    where a sieve up to n does not fit in memory: one counting DFS pass, one fill
+    pass into a preallocated int64 array, then a sort.  Output matches
+    generate_friables (sorted, 1 included).  Falls back to the heap version
+    without Numba.
+    """
+    if n < 1:
+        return np.zeros(0, dtype=np.int64)
+    if not _NUMBA_AVAILABLE:
+        return np.asarray(generate_friables(n, y_primes), dtype=np.int64)
+    with span("friables", engine="njit", n=n, primes=len(y_primes)) as s:
+        P = np.asarray(sorted(y_primes), dtype=np.int64)
+        count = _friables_dfs(n, P, np.empty(0, dtype=np.int64), False)
+        out = np.empty(count, dtype=np.int64)
+        _friables_dfs(n, P, out, True)
+        out.sort()
+        if s:
+            s.set(A_size=int(count))
+    return out
+
+
+if _NUMBA_AVAILABLE:
+    @nb.njit(cache=True)
+    def _lpf_fill(lpf: np.ndarray) -> None:
+        """
+        Every p still at 0 when reached is prime; ascending p overwrites
+        multiples, so each entry ends with its largest prime factor.
+        """
+        n = lpf.size - 1
+        for p in range(2, n + 1):
+            if lpf[p] == 0:
+                for m in range(p, n + 1, p):
+                    lpf[m] = p
+
+
+def _lpf_fill_numpy(lpf: np.ndarray) -> None:
+    """Pure-numpy fallback for _lpf_fill: one strided assignment per prime."""
+    n = lpf.size - 1
+    is_p = np.ones(n + 1, dtype=bool)
+    is_p[:2] = False
+    for p in range(2, int(n**0.5) + 1):
+        if is_p[p]:
+            is_p[p * p :: p] = False
+    for p in np.flatnonzero(is_p).tolist():
+        lpf[p::p] = p
+
+
+def lpf_sieve(n: int) -> np.ndarray:
+    """
+    Largest-prime-factor table up to n (uint32, length n+1):
+    lpf[k] = P+(k) for k >= 2, lpf[1] = 1 and lpf[0] = 0.
+    Then the y-smooth integers <= n are exactly the k >= 1 with lpf[k] <= y.
+    """
+    n = max(n, 0)
+    lpf = np.zeros(n + 1, dtype=np.uint32)
+    if n >= 1:
+        lpf[1] = 1
+    if n >= 2:
+        with span("lpf_sieve", n=n):
+            if _NUMBA_AVAILABLE:
+                _lpf_fill(lpf)
+            else:
+                _lpf_fill_numpy(lpf)
+    return lpf
+
+
+def friables_in_band(n: int, y_lo: int, y_hi: int, lpf: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    Sorted integers 1 <= k <= n with y_lo < P+(k) <= y_hi (P+(1) = 1), read off
+    the sieve.  E.g. the augmentation halo is friables_in_band(n, yA, yH, lpf).
+    Pass a precomputed `lpf` (covering at least n) to reuse it across calls.
+    """
+    if n < 1:
+        return np.zeros(0, dtype=np.int64)
+    if lpf is None:
+        lpf = lpf_sieve(n)
+    with span("friables", engine="sieve", n=n, y_lo=y_lo, y_hi=y_hi) as s:
+        tab = lpf[1 : n + 1]
+        idx = np.flatnonzero((tab > y_lo) & (tab <= y_hi)) + 1
+        if s:
+            s.set(A_size=int(idx.size))
+    return idx.astype(np.int64, copy=False)
+
+
+def friables(n: int, y: int, lpf: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    All y-smooth integers <= n as a sorted int64 array (so k - A and a + b
+    cannot wrap), including 1 by convention: the vectorized counterpart of generate_friables.
+    """
+    return friables_in_band(n, 0, max(y, 1), lpf)
@@ -0,0 +1,188 @@
+# tc/telemetry.py
+"""
+Stage telemetry: context-manager spans around the pipeline stages.
+
+    with span("coverage", n=n) as s:
+        ...
+        if s:  # false when telemetry is off, so item counts cost nothing then
+            s.set(A_size=A.size, uncovered=B.count_uncovered())
+
+Each finished span writes one JSON line with its name, parent span, wall and
+CPU seconds, memory in MB and any item counts set on it.  Memory is the current
+RSS at exit (rss_mb), the process-lifetime peak RSS (process_peak_rss_mb) and
+how far that peak rose while the span ran (peak_rss_growth_mb): a span whose
+own peak stayed below an earlier one shows 0 growth, so the growth is a lower
+bound on the span's extra memory, not its peak.
+
+With telemetry off, span() returns a shared no-op object.  The call itself
+still costs a function call and its keyword dict (well under a microsecond),
+so spans belong around stages, not inside per-element loops; the coverage
+engine wrapper checks enabled() first and skips even that.
+
+Environment:
+  TC_TELEMETRY    path of the JSON-lines sink (appended to); unset or empty = off
+"""
+from __future__ import annotations
+
+import json
+import os
+import sys
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+_SINK: Optional[str] = os.environ.get("TC_TELEMETRY") or None
+_LOCK = threading.Lock()
+_STACK = threading.local()  # open spans of the current thread
+
+
+def enable(path: str) -> None:
+    """Send spans to the JSON-lines file at `path` (as TC_TELEMETRY=path would)."""
+    global _SINK
+    _SINK = path
+    os.environ["TC_TELEMETRY"] = path  # child processes inherit the sink
+
+
+def disable() -> None:
+    """Stop recording spans."""
+    global _SINK
+    _SINK = None
+    os.environ.pop("TC_TELEMETRY", None)
+
+
+def enabled() -> bool:
+    return _SINK is not None
+
+
+def _memory_mb() -> Dict[str, float]:
+    """Current RSS and process-lifetime peak RSS in MB (keys missing if unreadable)."""
+    out: Dict[str, float] = {}
+    try:
+        import psutil
+
+        info = psutil.Process().memory_info()
+        out["rss_mb"] = round(info.rss / 2**20, 2)
+        peak = getattr(info, "peak_wset", None)  # Windows
+        if peak is not None:
+            out["process_peak_rss_mb"] = round(peak / 2**20, 2)
+    except Exception:
+        pass
+    if "process_peak_rss_mb" not in out:
+        try:
+            import resource
+
+            kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+            out["process_peak_rss_mb"] = round(kb / (2**20 if sys.platform == "darwin" else 2**10), 2)
+        except Exception:
+            pass
+    return out
+
+
+class _NullSpan:
+    """Stand-in returned while telemetry is off; falsy so counts can be skipped."""
+
+    __slots__ = ()
+
+    def __enter__(self) -> "_NullSpan":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        return None
+
+    def __bool__(self) -> bool:
+        return False
+
+    def set(self, **items: Any) -> None:
+        return None
+
+
+_NULL = _NullSpan()
+
+
+class Span:
+    """One timed stage; item counts are attached with set()."""
+
+    __slots__ = ("name", "items", "_wall", "_cpu", "_parent", "_peak0")
+
+    def __init__(self, name: str, items: Dict[str, Any]) -> None:
+        self.name = name
+        self.items = items
+
+    def set(self, **items: Any) -> None:
+        self.items.update(items)
+
+    def __enter__(self) -> "Span":
+        stack: List[Span] = _STACK.__dict__.setdefault("spans", [])
+        self._parent = stack[-1].name if stack else None
+        stack.append(self)
+        self._peak0 = _memory_mb().get("process_peak_rss_mb")
+        self._cpu = time.process_time()
+        self._wall = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        wall = time.perf_counter() - self._wall
+        cpu = time.process_time() - self._cpu
+        _STACK.spans.pop()
+        mem = _memory_mb()
+        if self._peak0 is not None and "process_peak_rss_mb" in mem:
+            mem["peak_rss_growth_mb"] = round(mem["process_peak_rss_mb"] - self._peak0, 2)
+        rec = {
+            "span": self.name,
+            "parent": self._parent,
+            "ts": round(time.time(), 3),
+            "pid": os.getpid(),
+            "wall_sec": round(wall, 6),
+            "cpu_sec": round(cpu, 6),
+            **mem,
+            **self.items,
+        }
+        if exc_type is not None:
+            rec["error"] = exc_type.__name__
+        _emit(rec)
+
+
+def _emit(rec: Dict[str, Any]) -> None:
+    sink = _SINK
+    if sink is None:
+        return
+    line = json.dumps(rec, default=_jsonable) + "\n"
+    with _LOCK:
+        with open(sink, "a") as f:
+            f.write(line)
+
+
+def _jsonable(x: Any) -> Any:
+    """numpy scalars and other stragglers in item counts."""
+    try:
+        return x.item()
+    except AttributeError:
+        return str(x)
+
+
+def span(name: str, **items: Any):
+    """A span named `name` with initial item counts, or a no-op when telemetry is off."""
+    if _SINK is None:
+        return _NULL
+    return Span(name, items)
+
+
+def current():
+    """The innermost open span of this thread, or the no-op when there is none."""
+    stack = _STACK.__dict__.get("spans")
+    return stack[-1] if stack else _NULL
+
+
+def read_spans(path: str) -> List[Dict[str, Any]]:
+    """All span records in a JSON-lines sink (torn lines are skipped)."""
+    out = []
+    with open(path) as f:
+        for line in f:
+            try:
+                out.append(json.loads(line))
+            except ValueError:
+                continue
+    return out
+
+
+__all__ = ["span", "Span", "current", "enable", "disable", "enabled", "read_spans"]
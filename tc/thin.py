@@ -1,14 +1,24 @@
 from __future__ import annotations
-from typing import Iterable, List, Dict, Tuple
-import random
-from collections import defaultdict
+from typing import List, Optional, Sequence
 
+import numpy as np
 
-def _residue_counts(A: List[int], q: int) -> Dict[int, int]:
-    d: Dict[int, int] = defaultdict(int)
-    for a in A:
-        d[a % q] += 1
-    return d
+from .diagnose import residue_counts
+from .telemetry import span
+
+
+def thinning_weights(A: np.ndarray, qmax_thin: int = 64) -> np.ndarray:
+    """
+    Per-element weight min over 2 <= q <= qmax_thin of (|A| / q) / #{a' in A : a' ≡ a mod q},
+    clipped to [1e-6, 10].  A is a sorted int64 array.
+    """
+    n = A.size
+    R = residue_counts(A, qmax_thin)
+    w = np.ones(n, dtype=np.float64)
+    for q in range(2, qmax_thin + 1):
+        # every a's own residue class is non-empty, so the count is >= 1
+        np.minimum(w, (n / q) / R[q, A % q], out=w)
+    return np.clip(w, 1e-6, 10.0)
 
 
 def residue_balanced_thin(
@@ -16,7 +26,8 @@ def residue_balanced_thin(
     qmax_thin: int = 64,
     keep_ratio: float = 1.0,
     seed: int | None = 12345,
-) -> List[int]:
+    seeds: Optional[Sequence[int]] = None,
+) -> List[int] | List[List[int]]:
     """
     Residue-balanced thinning:
     - For each 2 <= q <= qmax_thin, we want residues to be roughly uniform.
@@ -24,40 +35,27 @@ def residue_balanced_thin(
     - Then keep each element independently with probability lambda * weight, with lambda tuned
       so expected retained size ~= keep_ratio * |A|.
 
-    Returns a new list A' (subset of A).
-    """
-    if seed is not None:
-        random.seed(seed)
-
-    if not A:
-        return []
-
-    A_sorted = list(A)
-    A_sorted.sort()
-    n = len(A_sorted)
+    Draws come from a local numpy.random.Generator seeded with `seed` (global RNG
+    state is left alone), so the same seed gives the same subset.  Pass `seeds`
+    to get one thinned subset per seed from a single weight computation.
 
-    counts_by_q: Dict[int, Dict[int, int]] = {}
-    for q in range(2, qmax_thin + 1):
-        counts_by_q[q] = _residue_counts(A_sorted, q)
-
-    weights: List[float] = []
-    for a in A_sorted:
-        w = 1.0
-        for q in range(2, qmax_thin + 1):
-            cnt = counts_by_q[q].get(a % q, 0)
-            if cnt > 0:
-                target = n / q
-                w = min(w, float(target) / float(cnt))
-        w = max(1e-6, min(w, 10.0))  # clip for stability
-        weights.append(w)
-
-    total_w = sum(weights)
-    lam = (keep_ratio * n) / total_w if total_w > 0 else 1.0
-
-    A_thin: List[int] = []
-    for a, w in zip(A_sorted, weights):
+    Returns a new sorted list A' (subset of A), or a list of them when `seeds` is given.
+    """
+    A_sorted = np.sort(np.asarray(A, dtype=np.int64))
+    batch = [seed] if seeds is None else list(seeds)
+    if A_sorted.size == 0:
+        return [] if seeds is None else [[] for _ in batch]
+
+    with span("thinning", A_size=int(A_sorted.size), qmax_thin=qmax_thin, seeds=len(batch)) as sp:
+        w = thinning_weights(A_sorted, qmax_thin)
+        total_w = float(w.sum())
+        lam = (keep_ratio * A_sorted.size) / total_w if total_w > 0 else 1.0
         p = lam * w
-        if p >= 1.0 or random.random() < p:
-            A_thin.append(a)
 
-    return A_thin
+        out = []
+        for s in batch:
+            u = np.random.default_rng(s).random(A_sorted.size)
+            out.append(A_sorted[(p >= 1.0) | (u < p)].tolist())
+        if sp:
+            sp.set(kept=[len(x) for x in out])
+    return out[0] if seeds is None else out
@@ -0,0 +1,146 @@
+# tc/warmup.py
+"""
+Ahead-of-time warmup for the Numba kernels.
+
+Every kernel is jitted with cache=True, so its machine code is stored next to
+the module in __pycache__ the first time each signature is compiled.  Running
+
+    python -m tc.warmup
+
+once calls every kernel on tiny inputs with the argument types the engines use
+(int32 and int64 A for the cover kernels), so later processes, e.g. the steps
+make_all spawns, load compiled code instead of paying the JIT.
+
+    python -m tc.warmup --startup
+
+also measures the import (startup) time of `tc` and of each script.
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+_A_DTYPES = ("int32", "int64")
+
+
+def _kernels() -> List[Tuple[str, Callable[[], None]]]:
+    """(name, call) for every kernel signature the engines use."""
+    import numpy as np
+
+    from . import augment, cover, reps, segment, smooth, ymin
+
+    n = 64
+    A64 = np.array([1, 2, 3, 5, 8, 13], dtype=np.int64)
+    src = cover._pack_bits(A64, n)
+
+    def hits() -> np.ndarray:
+        return np.zeros(n + 1, dtype=np.uint8)
+
+    def words() -> np.ndarray:
+        return np.zeros_like(src)
+
+    calls: List[Tuple[str, Callable[[], None]]] = []
+    for dt in _A_DTYPES:
+        A = A64.astype(dt)
+        calls += [
+            (f"cover._mark_pairs[{dt}]", lambda A=A: cover._mark_pairs(A, n, hits())),
+            (f"cover._mark_pairs_twoptr[{dt}]", lambda A=A: cover._mark_pairs_twoptr(A, n, hits())),
+            (f"cover._mark_pairs_twoptr_tiled[{dt}]", lambda A=A: cover._mark_pairs_twoptr_tiled(A, n, hits())),
+            (f"cover._mark_cross[{dt}]", lambda A=A: cover._mark_cross(A[:2], A, n, hits())),
+            (f"cover._shift_or_packed[{dt}]", lambda A=A: cover._shift_or_packed(src, A, words())),
+            (f"cover._shift_or_packed_parallel[{dt}]",
+             lambda A=A: cover._shift_or_packed_parallel(src, A, words())),
+            (f"cover._shift_or_range[{dt}]", lambda A=A: cover._shift_or_range(src, A, words(), 0, src.size)),
+        ]
+
+    P = np.array([1, 2, 3, 5, 2, 13], dtype=np.uint32)
+    calls += [
+        ("cover._witness_targets", lambda: cover._witness_targets(
+            A64, src, np.append(src, np.uint64(0)), n, np.arange(n + 1, dtype=np.int64),
+            np.zeros(n + 1, np.int64))),
+        ("segment._mark_window[int64]", lambda: segment._mark_window(A64, 0, n + 1, np.zeros(n + 1, np.uint8))),
+        ("segment._longest_zero_run", lambda: segment._longest_zero_run(hits())),
+        ("ymin._first_cover_windows", lambda: ymin._first_cover_windows(
+            A64, P, n, np.full(n + 1, ymin.UNCOVERED, np.uint32), 16)),
+        ("reps._count_pairs_windows[uint8]", lambda: reps._count_pairs_windows(A64, n, hits(), 255, 16)),
+        ("reps._count_pairs_windows[uint16]", lambda: reps._count_pairs_windows(
+            A64, n, np.zeros(n + 1, np.uint16), 65535, 16)),
+        ("smooth._lpf_fill", lambda: smooth._lpf_fill(np.zeros(n + 1, np.uint32))),
+        ("smooth._friables_dfs", lambda: smooth._friables_dfs(
+            n, np.array([2, 3], np.int64), np.zeros(0, np.int64), False)),
+        ("augment._pair_hits", lambda: augment._pair_hits(
+            A64, A64, True, src, src, A64, np.arange(A64.size, dtype=np.int32),
+            np.zeros(0, np.int32), np.zeros(0, np.int32), False)),
+    ]
+    return calls
+
+
+def warm_kernels(verbose: bool = True) -> Dict[str, float]:
+    """Compile (or load from cache) every kernel signature; returns seconds per kernel."""
+    from .cover import _NUMBA_AVAILABLE
+
+    if not _NUMBA_AVAILABLE:
+        if verbose:
+            print("[warmup] Numba is not available; nothing to compile.")
+        return {}
+    timings: Dict[str, float] = {}
+    for name, call in _kernels():
+        t0 = time.perf_counter()
+        call()
+        timings[name] = time.perf_counter() - t0
+        if verbose:
+            print(f"[warmup] {name:<44} {timings[name]:7.2f}s")
+    return timings
+
+
+def _script_modules(root: str) -> List[str]:
+    scripts = os.path.join(root, "scripts")
+    names = sorted(f[:-3] for f in os.listdir(scripts) if f.endswith(".py") and f != "__init__.py")
+    return [f"scripts.{name}" for name in names]
+
+
+def startup_times(modules: List[str], repeats: int = 3) -> Dict[str, float]:
+    """
+    Median wall time (s) of `python -c "import <module>"` in a fresh process;
+    NaN when the import fails (e.g. an optional plotting dependency is missing).
+    """
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    out: Dict[str, float] = {}
+    for mod in modules:
+        samples = []
+        for _ in range(repeats):
+            t0 = time.perf_counter()
+            rc = subprocess.call(
+                [sys.executable, "-c", f"import {mod}"], cwd=root, stderr=subprocess.DEVNULL
+            )
+            samples.append(time.perf_counter() - t0)
+            if rc != 0:
+                break
+        out[mod] = statistics.median(samples) if rc == 0 else float("nan")
+    return out
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    ap = argparse.ArgumentParser(description="Compile and cache the tc Numba kernels.")
+    ap.add_argument("--startup", action="store_true", help="Also report import time of tc and each script")
+    ap.add_argument("--repeats", type=int, default=3, help="Fresh processes per startup measurement")
+    args = ap.parse_args(argv)
+
+    t0 = time.perf_counter()
+    timings = warm_kernels()
+    print(f"[warmup] {len(timings)} kernel signatures ready (t={time.perf_counter() - t0:.2f}s)")
+
+    if args.startup:
+        root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        for mod, sec in startup_times(["tc"] + _script_modules(root), args.repeats).items():
+            shown = "import failed" if sec != sec else f"{sec * 1000:8.0f} ms"
+            print(f"[startup] {mod:<40} {shown}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+# tc/ymin.py
+"""
+Minimal smoothness per target ("first cover y").
+
+For k <= n, ymin[k] = min over a + b = k (a, b in A_Y) of max(P+(a), P+(b)),
+where P+ is the largest prime factor (P+(1) = P+(0) = 1).  Then k ∈ A_y + A_y
+iff ymin[k] <= y, so one pass over the friables at the largest Y of interest
+answers every threshold probe y <= Y with a single array comparison.
+"""
+from __future__ import annotations
+
+from typing import List
+
+import numpy as np
+
+from .cover import _NUMBA_AVAILABLE
+from .telemetry import span
+
+if _NUMBA_AVAILABLE:
+    import numba as nb  # type: ignore
+
+# Sentinel for targets that are not in A_Y + A_Y at all
+UNCOVERED = np.iinfo(np.uint32).max
+
+
+def largest_prime_factors(A: List[int], primes: List[int]) -> np.ndarray:
+    """
+    P+(a) for every a in A (uint32), assuming A is smooth over `primes`.
+    0 and 1 get 1, so they are present at every y.
+    """
+    rem = np.asarray(A, dtype=np.int64).copy()
+    P = np.ones(rem.size, dtype=np.uint32)
+    rem[rem == 0] = 1
+    for p in primes:
+        m = rem % p == 0
+        while m.any():
+            P[m] = p
+            rem[m] //= p
+            m = rem % p == 0
+    return P
+
+
+if _NUMBA_AVAILABLE:
+    from .cover import _window_span
+
+    @nb.njit(parallel=True, fastmath=True, cache=True)
+    def _first_cover_windows(A: np.ndarray, P: np.ndarray, n: int, ymin: np.ndarray, window: int) -> None:
+        """
+        ymin[s] = min(ymin[s], max(P[i], P[j])) over pairs i <= j with s = A[i] + A[j] <= n.
+        Threads own disjoint target windows [L, R), so the min-updates never race.
+        """
+        m = A.size
+        nwin = (n + window) // window
+        for w in nb.prange(nwin):
+            L = w * window
+            R = L + window
+            if R > n + 1:
+                R = n + 1
+            for i in range(m):
+                a = A[i]
+                if 2 * a >= R:
+                    break  # pairs with j >= i all sum to >= R
+                j0, j1 = _window_span(A, i, L, R)
+                pi = P[i]
+                for j in range(j0, j1):
+                    v = P[j]
+                    if pi > v:
+                        v = pi
+                    s = a + A[j]
+                    if v < ymin[s]:
+                        ymin[s] = v
+
+
+def _first_cover_numpy(A: np.ndarray, P: np.ndarray, n: int, ymin: np.ndarray) -> None:
+    """Pure-numpy fallback: one vectorized min-update per a (sums are distinct per a)."""
+    for i in range(A.size):
+        a = int(A[i])
+        if 2 * a > n:
+            break
+        j1 = int(np.searchsorted(A, n - a, side="right"))
+        s = a + A[i:j1]
+        v = np.maximum(P[i], P[i:j1])
+        ymin[s] = np.minimum(ymin[s], v)
+
+
+def first_cover_map(A: List[int], P: np.ndarray, n: int, window: int = 1 << 16) -> np.ndarray:
+    """
+    Return ymin (uint32, length n+1): the smallest y with k ∈ A_y + A_y, where A_y is
+    the subset of A with P+ <= y; UNCOVERED where k ∉ A + A.  P[i] = P+(A[i]).
+    """
+    n = max(n, 0)
+    A_arr = np.asarray(A, dtype=np.int64)
+    P_arr = np.asarray(P, dtype=np.uint32)
+    order = np.argsort(A_arr, kind="stable")
+    A_arr, P_arr = A_arr[order], P_arr[order]
+    keep = (A_arr >= 0) & (A_arr <= n)
+    A_arr, P_arr = A_arr[keep], P_arr[keep]
+
+    ymin = np.full(n + 1, UNCOVERED, dtype=np.uint32)
+    if A_arr.size == 0:
+        return ymin
+    with span("first_cover_map", n=n, A_size=int(A_arr.size)):
+        if _NUMBA_AVAILABLE:
+            _first_cover_windows(A_arr, P_arr, n, ymin, window)
+        else:
+            _first_cover_numpy(A_arr, P_arr, n, ymin)
+    return ymin
+
+
+def uncovered_count_at(ymin: np.ndarray, y: int, start: int = 2) -> int:
+    """Number of k in [start, n] with k ∉ A_y + A_y."""
+    start = max(1, start)
+    return int(np.count_nonzero(ymin[start:] > y))
+
+
+def uncovered_at(ymin: np.ndarray, y: int, start: int = 2) -> np.ndarray:
+    """Sorted int64 array of k in [start, n] with k ∉ A_y + A_y."""
+    start = max(1, start)
+    return np.flatnonzero(ymin[start:] > y).astype(np.int64) + start
+
+
+__all__ = [
+    "UNCOVERED",
+    "largest_prime_factors",
+    "first_cover_map",
+    "uncovered_count_at",
+    "uncovered_at",
+]